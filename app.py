@@ -1,8 +1,6 @@
 # app.py (modified)
 from flask import Flask, render_template, request, redirect, url_for
 import logging
-from io import StringIO, BytesIO
-import csv
 import os
 from urllib.parse import urlparse
 import re
@@ -10,6 +8,8 @@ import re
 # Import the functions from the separate files
 import src.utils.sitemap_extractor as sitemap_extractor
 import src.utils.csv_processor as csv_processor
+import src.utils.crawl_state as crawl_state
+import src.utils.url_sampler as url_sampler
 import src.spiders.scrapy_spider as scrapy_spider
 import src.scraping.get_keywords as get_keywords
 import src.scraping.search_competitor as search_competitor
@@ -19,14 +19,21 @@ import src.llm_analysis.query_writer as query_writer
 import src.llm_analysis.compare_intent as compare_intent  # Import the new compare_intent module
 import src.llm_analysis.missing_topic_finder as missing_topic_finder #missing topic finder
 import src.similarity.similarity_with_HyDE as similarity_with_HyDE #HyDE similarity
+import src.similarity.model_registry as model_registry
+import src.similarity.page_index as page_index
+from src.utils.task_graph import TaskGraph
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 app = Flask(__name__)
 
 # --- Configuration ---
-SCRAPY_OUTPUT_FILENAME = "output_scrapy.csv"  # Temporary file name
 CSV_ENCODING = 'utf-8'
+CRAWL_BUDGET_PAGES = url_sampler.CRAWL_BUDGET_PAGES  # Pages crawled per analysis (stratified sample)
+CRAWL_BUDGET_SECONDS = None  # Optional time budget for the crawl, e.g. 120
+PAGE_MATCHES_SHOWN = 50  # Site pages listed with their closest competitor pages
+WARMUP_MODELS = True  # Load the embedding model at startup instead of on the first analysis
+ANALYSIS_WORKERS = 6  # Analysis steps (LLM calls, searches, similarity) run at once
 
 
 def create_filename(url):
@@ -47,27 +54,90 @@ def create_filename(url):
     return filename
 
 
-def filter_rows_with_meta_keywords(csv_data):
+def sample_seed(url):
+    """Returns the URL sample seed of a site: its host, without "www."."""
+    hostname = urlparse(url).netloc.lower()
+    return hostname[4:] if hostname.startswith("www.") else hostname
+
+
+def filter_rows_with_meta_keywords(rows):
+    """
+    Filters rows where the 'Meta Keywords' field is empty or null.
+
+    Args:
+        rows (list): Scraped items (PageRecords) returned by the spider.
+
+    Returns:
+        list: The rows that have meta keywords.
+    """
+    return [row for row in rows if (row.get("Meta Keywords") or "").strip()]
+
+
+def split_competitor_keywords(competitor_keywords_string):
+    """Converts the aggregated competitor keywords into a list."""
+    if not competitor_keywords_string:
+        logging.warning("No competitor keywords found.")
+        return []  # An empty list, to avoid errors downstream
+    return [k.strip() for k in competitor_keywords_string.split(",")]
+
+
+def score_keyword_similarity(website_keywords, competitor_keywords):
     """
-    Filters rows where the 'Meta Keywords' column is empty or null.
+    TF-IDF similarity of the site and competitor keywords (over the whole corpus).
+
+    Returns:
+        tuple: (similarity score, the terms contributing most to it as a comma separated string).
     """
-    csv_rows = list(csv.reader(StringIO(csv_data)))
-    headers = csv_rows[0]
-    data = csv_rows[1:]
+    website_keywords_list = [k.strip() for k in website_keywords.split()]
+    similarity_matrix, pair_terms = measure_similarity.compare_documents(
+        [" ".join(website_keywords_list)], [" ".join(competitor_keywords)]
+    )
+    shared_terms = ", ".join(term for term, contribution in pair_terms.get((0, 0), []))
+    return float(similarity_matrix[0, 0]), shared_terms
 
-    # Find the index of the 'Meta Keywords' column
-    meta_keywords_index = headers.index("Meta Keywords")
 
-    # Filter rows where 'Meta Keywords' is not empty
-    filtered_data = [row for row in data if row[meta_keywords_index].strip()]
+def match_competitor_pages(crawled_rows, competitor_pages):
+    """Matches every crawled page against the competitor pages (title + description embeddings)."""
+    try:
+        return page_index.match_pages(crawled_rows, competitor_pages)[:PAGE_MATCHES_SHOWN]
+    except Exception as e:
+        logging.error(f"Error matching pages: {e}")
+        return []
 
-    # Combine headers and filtered data
-    filtered_csv = StringIO()
-    csv_writer = csv.writer(filtered_csv)
-    csv_writer.writerow(headers)
-    csv_writer.writerows(filtered_data)
 
-    return filtered_csv.getvalue()
+def build_analysis_graph():
+    """
+    Builds the analysis steps that follow keyword extraction as a task graph.
+
+    The graph takes the 'website_keywords' and 'crawled_rows' inputs; the website intent,
+    missing topics and search query only need the site keywords, so they run together,
+    and the competitor searches run while the LLM calls are in flight.
+
+    Returns:
+        TaskGraph: The graph.
+    """
+    graph = TaskGraph(inputs=('website_keywords', 'crawled_rows'))
+    # 7. Generate search query using query_writer.py
+    graph.add('search_query', query_writer.search_query_writer, ['website_keywords'])
+    # 8. Search competitors and aggregate keywords (and list their pages for step 14)
+    graph.add('competitor_keywords', search_competitor.search_and_aggregate_keywords, ['search_query'])
+    graph.add('competitor_keywords_list', split_competitor_keywords, ['competitor_keywords'])
+    graph.add('competitor_pages', search_competitor.search_competitor_pages, ['search_query'])
+    # 9. Analyze intents
+    graph.add('website_intent', intent_analyser.analyze_intent, ['website_keywords'])
+    graph.add('competitor_intent', intent_analyser.analyze_intent, ['competitor_keywords'])
+    # 10. Calculate similarity score (and the terms contributing most to it)
+    graph.add('similarity', score_keyword_similarity, ['website_keywords', 'competitor_keywords_list'])
+    # 11. Compare and consolidate intents using compare_intent.py
+    graph.add('overall_intent', compare_intent.compare_intents, ['competitor_intent', 'website_intent'])
+    # 12. Find missing Topics
+    graph.add('missing_topics', missing_topic_finder.find_missing_topics, ['website_keywords'])
+    # 13. Run similarity with HyDE paragraphs similarity_with_HyDE.py
+    graph.add('hyde_similarity_score', similarity_with_HyDE.calculate_paragraph_similarity,
+              ['website_keywords', 'competitor_keywords'])
+    # 14. Match every crawled page against the competitor pages
+    graph.add('page_matches', match_competitor_pages, ['crawled_rows', 'competitor_pages'])
+    return graph
 
 
 @app.route('/', methods=['GET', 'POST'])
@@ -85,96 +155,79 @@ def process_website(website_url):
     else:
         query = None
 
-    # 1. Extract Sitemap URLs
-    sitemap_urls = sitemap_extractor.extract_sitemap_urls(website_url)
+    # 1. Extract Sitemap URLs (with lastmod/changefreq/priority for the incremental crawl)
+    sitemap_urls = sitemap_extractor.extract_sitemap_urls(website_url, concurrent=True, with_metadata=True)
 
     if not sitemap_urls:
         return render_template('error.html', message="No sitemap URLs found for this website.")
 
-    # 2. Convert URLs to CSV data (in memory)
-    csv_output = StringIO()
-    csv_writer = csv.writer(csv_output)
-    csv_writer.writerow(['Parent Sitemap', 'URL'])  # Header
-    csv_writer.writerows(sitemap_urls)  # Data
-    csv_data = csv_output.getvalue()
-
-    # 3. Process CSV data (filter 'en' URLs)
-    filtered_csv_data = csv_processor.process_csv_data(csv_data)
+    # 2. Keep the 'en' version of every page. The SitemapUrl records flow through
+    #    every stage as they are; CSV is only written for the final export.
+    filtered_records = csv_processor.filter_url_records(sitemap_urls)
 
-    if not filtered_csv_data:
+    if not filtered_records:
         return render_template('error.html', message="No URLs remaining after filtering.")
 
-    # 4. Run Scrapy spider directly on the filtered data
-    final_csv_data = scrapy_spider.run_scrapy_spider(filtered_csv_data)
+    # 3. Sample the URLs down to the crawl budget (stratified by sitemap and path, weighted by priority).
+    #    The sample is seeded with the site host, so repeated analyses crawl the same pages
+    #    (reproducible results, and the crawl state can serve the unchanged ones).
+    sampled_records, sample_report = url_sampler.sample_records(
+        filtered_records, CRAWL_BUDGET_PAGES, CRAWL_BUDGET_SECONDS, seed=sample_seed(website_url)
+    )
+    crawl_coverage = url_sampler.format_report(sample_report)
+
+    # 4. Run Scrapy spider on the sample, fetching only pages that are new or changed
+    #    since the last analysis of this site (the rest comes from the crawl state)
+    crawled_rows = scrapy_spider.run_incremental_crawl(
+        sampled_records, crawl_state.get_crawl_state(website_url)
+    )
 
-    if not final_csv_data:
+    if crawled_rows is None:
         return render_template('error.html', message="Error running Scrapy spider.")
 
     # 5. Filter rows with empty 'Meta Keywords'
-    final_csv_data = filter_rows_with_meta_keywords(final_csv_data)
+    crawled_rows = filter_rows_with_meta_keywords(crawled_rows)
 
     # 6. Extract top keywords from all Meta Keywords
-    website_keywords = get_keywords.top_keywords_from_csv(
-        csv_filepath=StringIO(final_csv_data),  # Pass CSV data in memory
+    website_keywords = get_keywords.top_keywords_from_rows(
+        crawled_rows,  # Items straight from the spider, no CSV round-trip
         column_name='Meta Keywords'
     )
 
-    # 7. Generate search query using query_writer.py
-    search_query = query_writer.search_query_writer(website_keywords)
-
-    # 8. Search competitors and aggregate keywords
-    competitor_keywords_string = search_competitor.search_and_aggregate_keywords(search_query)
-
-    if not competitor_keywords_string:
-        competitor_keywords = [] #assign an empty list, to avoid error
-        logging.warning("No competitor keywords found.") #or handle differently
-
-    else:
-        competitor_keywords = [k.strip() for k in competitor_keywords_string.split(",")] #Convert to a list
-
-    website_keywords_list = [k.strip() for k in website_keywords.split()]  #Split into a list
-
-    # 9. Analyze intents
-    website_intent = intent_analyser.analyze_intent(website_keywords)
-    competitor_intent = intent_analyser.analyze_intent(competitor_keywords_string)
-
-    # 10. Calculate similarity score
-    similarity_score = measure_similarity.calculate_cosine_similarity(
-        website_keywords_list, competitor_keywords
+    # 7-14. LLM analysis, competitor search and similarity scoring, run as a task graph:
+    #       every step starts as soon as its inputs are ready, so independent LLM calls
+    #       and searches overlap and the latency is the critical path, not the sum.
+    results = build_analysis_graph().run(
+        {'website_keywords': website_keywords, 'crawled_rows': crawled_rows}, max_workers=ANALYSIS_WORKERS
     )
 
-    # 11. Compare and consolidate intents using compare_intent.py
-    overall_intent = compare_intent.compare_intents(competitor_intent, website_intent)
-
-    # 12. Find missing Topics
-    missing_topics = missing_topic_finder.find_missing_topics(website_keywords)
-
-    # 13. Run similarity with HyDE paragraphs similarity_with_HyDE.py
-    hyde_similarity_score = similarity_with_HyDE.calculate_paragraph_similarity(website_keywords, competitor_keywords_string)
-    # 14. Save the final CSV data to a file
+    # 15. Save the final CSV data to a file
     output_filename = create_filename(website_url)  # Generate filename
     try:
         with open(output_filename, 'w', encoding=CSV_ENCODING) as output_file:
-            output_file.write(final_csv_data)
+            output_file.write(scrapy_spider.items_to_csv(crawled_rows))
         logging.info(f"Saved final CSV data to {output_filename}")
     except Exception as e:
         logging.error(f"Error saving CSV file: {e}")
         return render_template("error.html", message="Error saving CSV file.")
 
-    # 15. Render the template with analysis results
+    # 16. Render the template with analysis results
     return render_template(
         'display_csv.html',
         website_url=website_url,
         query=query,
         website_keywords=website_keywords,
-        search_query=search_query,
-        competitor_keywords=competitor_keywords_string,
-        website_intent=website_intent,
-        competitor_intent=competitor_intent,
-        similarity_score=similarity_score,
-        overall_intent=overall_intent,
-        missing_topics = missing_topics,
-        hyde_similarity_score = hyde_similarity_score
+        search_query=results['search_query'],
+        competitor_keywords=results['competitor_keywords'],
+        website_intent=results['website_intent'],
+        competitor_intent=results['competitor_intent'],
+        similarity_score=results['similarity'][0],
+        overall_intent=results['overall_intent'],
+        missing_topics = results['missing_topics'],
+        hyde_similarity_score = results['hyde_similarity_score'],
+        crawl_coverage = crawl_coverage,
+        page_matches = results['page_matches'],
+        shared_terms = results['similarity'][1]
     )
 
 
@@ -184,4 +237,7 @@ def internal_server_error(e):
 
 
 if __name__ == '__main__':
+    # The debug reloader serves the app from a child process (WERKZEUG_RUN_MAIN set), warm the models there
+    if WARMUP_MODELS and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        model_registry.warmup(background=True)
     app.run(debug=True)
\ No newline at end of file
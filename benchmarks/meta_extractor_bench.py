@@ -0,0 +1,125 @@
+# meta_extractor_bench.py
+"""
+Micro-benchmark: MetaExtractor vs. the five XPath queries TopicSpider used to run per page.
+
+Usage (from the repository root):
+    python -m benchmarks.meta_extractor_bench
+    python -m benchmarks.meta_extractor_bench --corpus path/to/html_pages --repeat 20
+
+Without --corpus a synthetic corpus is generated (varied head layouts, entities, comments,
+scripts, Open Graph tags and large bodies). Both extractors are also checked for agreement
+on every page.
+"""
+import argparse
+import os
+import random
+import time
+
+from parsel import Selector
+
+from src.spiders.meta_extractor import MetaExtractor
+
+XPATH_QUERIES = {
+    'Topic': '//title/text()',
+    'Meta Description': '//meta[@name="description"]/@content',
+    'Meta Keywords': '//meta[@name="keywords"]/@content',
+    'Meta Robots': '//meta[@name="robots"]/@content',
+    'Meta Author': '//meta[@name="author"]/@content',
+}
+
+SYNTHETIC_PAGES = 200
+SYNTHETIC_SEED = 42
+
+
+def extract_with_xpath(document):
+    """The previous TopicSpider.parse implementation: a full DOM parse plus one XPath query per field."""
+    selector = Selector(text=document)
+    return {field: selector.xpath(query).get() for field, query in XPATH_QUERIES.items()}
+
+
+def synthetic_corpus(count=SYNTHETIC_PAGES, seed=SYNTHETIC_SEED):
+    """Generates `count` HTML pages with realistic heads and bodies of varying size."""
+    rng = random.Random(seed)
+    pages = []
+    for i in range(count):
+        head_parts = [
+            '<meta charset="utf-8">',
+            '<meta name="viewport" content="width=device-width, initial-scale=1">',
+            f'<title>Page {i} &amp; friends</title>',
+            f'<meta name="description" content="Description of page {i} with &quot;quotes&quot;">',
+            f"<meta name='keywords' content='alpha, beta, page{i}'>",
+            '<meta name="robots" content="index, follow">',
+            f'<meta name="author" content="Author {i % 7}">',
+            f'<meta property="og:title" content="OG page {i}">',
+            f'<link rel="canonical" href="https://example.com/en/page-{i}/">',
+            '<link rel="stylesheet" href="/static/site.css">',
+            '<!-- <meta name="description" content="commented out"> -->',
+            '<script>window.dataLayer = window.dataLayer || []; var s = "<meta name=x>";</script>',
+        ]
+        head_parts += [f'<link rel="alternate" hreflang="{lang}" href="https://example.com/{lang}/page-{i}/">'
+                       for lang in ('en', 'fr', 'de', 'es')]
+        if rng.random() < 0.2:
+            head_parts = [part for part in head_parts if 'keywords' not in part]
+        rng.shuffle(head_parts)
+
+        paragraphs = "".join(
+            f"<p>Paragraph {n} of page {i}: " + "lorem ipsum dolor sit amet " * rng.randint(5, 40) + "</p>"
+            for n in range(rng.randint(20, 400))
+        )
+        pages.append(f"<!DOCTYPE html><html><head>{''.join(head_parts)}</head>"
+                     f"<body><nav><a href='/'>Home</a></nav>{paragraphs}</body></html>")
+    return pages
+
+
+def load_corpus(directory):
+    """Reads every .html/.htm file of a directory."""
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(('.html', '.htm')):
+            with open(os.path.join(directory, name), 'r', encoding='utf-8', errors='replace') as f:
+                pages.append(f.read())
+    return pages
+
+
+def time_extractor(function, pages, repeat):
+    """Returns the best wall-clock time (seconds) of `repeat` passes over the corpus."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            function(page)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help="Directory of HTML files (default: synthetic corpus)")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed passes per extractor (best is reported)")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not pages:
+        parser.error("The corpus is empty.")
+    extractor = MetaExtractor()
+
+    mismatches = 0
+    for page in pages:
+        expected = extract_with_xpath(page)
+        actual = extractor.extract(page)
+        if any(actual[field] != expected[field] for field in XPATH_QUERIES):
+            mismatches += 1
+
+    total_bytes = sum(len(page) for page in pages)
+    xpath_seconds = time_extractor(extract_with_xpath, pages, args.repeat)
+    scan_seconds = time_extractor(extractor.extract, pages, args.repeat)
+
+    print(f"Pages: {len(pages)} ({total_bytes / 1024 / 1024:.1f} MB)")
+    print(f"XPath (5 queries):   {xpath_seconds * 1e6 / len(pages):10.1f} us/page")
+    print(f"MetaExtractor:       {scan_seconds * 1e6 / len(pages):10.1f} us/page")
+    print(f"Speedup:             {xpath_seconds / scan_seconds:10.1f}x")
+    print(f"Pages with differing fields: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
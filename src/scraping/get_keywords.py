@@ -1,22 +1,49 @@
 import csv
+import os
 import re
 from nltk.corpus import stopwords
 import nltk
 from collections import Counter
-from io import StringIO
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 
 # Download NLTK stopwords if not already downloaded
 nltk.download('stopwords', quiet=True)
 
-def top_keywords_from_csv(csv_filepath, column_name, num_keywords=25):
+# English stopwords, loaded once per process
+STOP_WORDS = frozenset(stopwords.words('english'))
+
+KEYWORD_WORKERS = int(os.getenv("KEYWORD_WORKERS", "1"))  # Processes counting keywords (1 counts in-process)
+ROWS_PER_SHARD = 5000  # Rows counted by one worker task
+NGRAM_RANGE = (1, 1)  # Shortest and longest keyword phrases, in words
+
+# Relative weight of each field when keywords are counted over several fields
+FIELD_WEIGHTS = {
+    'Topic': 2.0,
+    'Meta Keywords': 1.0,
+    'Meta Description': 0.5,
+}
+
+# Keyword lists are separated by commas, semicolons, pipes or line breaks; phrases never span them
+SEGMENT_PATTERN = re.compile(r"[,;|\n]")
+# Words are separated by whitespace
+WORD_PATTERN = re.compile(r"\S+")
+# Words with special characters are ignored
+SPECIAL_CHAR_PATTERN = re.compile(r"[^a-z0-9]")
+
+
+def top_keywords_from_csv(csv_filepath, column_name, num_keywords=25, **options):
     """
     Reads a CSV file (or StringIO object), extracts text from a specified column,
     cleans the keywords, and returns a single string of the top N unique cleaned keywords.
 
+    The file is streamed row by row, so memory depends on the vocabulary, not the file size.
+
     Args:
         csv_filepath (str): The path to the CSV file.
         column_name (str): The name of the column to analyze.
         num_keywords (int): The number of top keywords to return. Defaults to 25.
+        **options: Passed to top_keywords_from_rows (fields, ngram_range, workers).
 
     Returns:
         str: A single string containing the top N unique cleaned keywords, separated by spaces.
@@ -26,54 +53,139 @@ def top_keywords_from_csv(csv_filepath, column_name, num_keywords=25):
     try:
         # Check if csv_filepath is a string (file path) or a StringIO object
         if isinstance(csv_filepath, str):
-            with open(csv_filepath, 'r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-        else:  # Assume it's a StringIO object
-            csvfile = csv_filepath
-            reader = csv.DictReader(csvfile)
+            with open(csv_filepath, 'r', encoding='utf-8', newline='') as csvfile:
+                return _top_keywords_from_reader(csv.DictReader(csvfile), column_name, num_keywords, **options)
+        # Assume it's a StringIO object
+        return _top_keywords_from_reader(csv.DictReader(csv_filepath), column_name, num_keywords, **options)
 
-        if column_name not in reader.fieldnames:
-            print(f"Error: Column '{column_name}' not found in the CSV file.")
-            return ""
+    except FileNotFoundError:
+        print(f"Error: File not found at '{csv_filepath}'")
+        return ""
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return ""
 
-        text_data = []
-        for row in reader:
-            text = row[column_name]
-            if text:
-                text_data.append(text)
 
-        # Combine all text into a single string
-        all_text = ' '.join(text_data)
+def _top_keywords_from_reader(reader, column_name, num_keywords, **options):
+    if not reader.fieldnames or column_name not in reader.fieldnames:
+        print(f"Error: Column '{column_name}' not found in the CSV file.")
+        return ""
+    return top_keywords_from_rows(reader, column_name, num_keywords, **options)
 
-        # Tokenize the text into keywords
-        keywords = all_text.split()
 
-        # Clean keywords
-        cleaned_keywords = clean_keywords(keywords)
+def top_keywords_from_rows(rows, column_name='Meta Keywords', num_keywords=25, fields=None,
+                           ngram_range=NGRAM_RANGE, workers=KEYWORD_WORKERS):
+    """
+    Extracts the top N unique cleaned keywords from in-memory or streamed rows
+    (e.g. the items returned by the Scrapy spider, or a csv.DictReader).
 
-        # Count keyword frequencies
-        keyword_counts = Counter(cleaned_keywords)
+    Args:
+        rows (iterable): Dicts keyed by column name; consumed lazily.
+        column_name (str): The name of the column to analyze (ignored if `fields` is given).
+        num_keywords (int): The number of top keywords to return. Defaults to 25.
+        fields (dict): Field name -> weight, to count several fields (see FIELD_WEIGHTS).
+        ngram_range (tuple): (min, max) number of words per keyword.
+        workers (int): Processes to shard the counting across (1 counts in-process).
 
-        # Get the top N keywords
-        top_keywords = [keyword for keyword, count in keyword_counts.most_common(num_keywords)]
+    Returns:
+        str: A single string containing the top N unique cleaned keywords, separated by spaces.
+    """
+    fields = fields or {column_name: 1.0}
+    keyword_counts = count_keywords(rows, fields, ngram_range, workers)
 
-        # Ensure uniqueness while preserving order of top keywords
-        unique_top_keywords = []
-        seen = set()
-        for keyword in top_keywords:
-            if keyword not in seen:
-                unique_top_keywords.append(keyword)
-                seen.add(keyword)
+    # Get the top N keywords (Counter keys are already unique)
+    top_keywords = [keyword for keyword, count in keyword_counts.most_common(num_keywords)]
 
-        # Return a single string of unique top keywords
-        return " ".join(unique_top_keywords)
+    # Return a single string of unique top keywords
+    return " ".join(top_keywords)
 
-    except FileNotFoundError:
-        print(f"Error: File not found at '{csv_filepath}'")
-        return ""
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        return ""
+
+def count_keywords(rows, fields, ngram_range=NGRAM_RANGE, workers=KEYWORD_WORKERS, rows_per_shard=ROWS_PER_SHARD):
+    """
+    Counts weighted keywords over a stream of rows.
+
+    With more than one worker the rows are cut into shards of `rows_per_shard`, counted in
+    separate processes and the partial counts merged; only a few shards are in flight at
+    a time, so the stream is never materialised.
+
+    Args:
+        rows (iterable): Dicts keyed by field name.
+        fields (dict): Field name -> weight.
+        ngram_range (tuple): (min, max) number of words per keyword.
+        workers (int): Number of processes.
+        rows_per_shard (int): Rows per worker task.
+
+    Returns:
+        Counter: Keyword -> weighted count.
+    """
+    field_weights = list(fields.items())
+    # Only the counted fields are kept (and sent to the workers)
+    values = (tuple(row.get(field) for field, _ in field_weights) for row in rows)
+    weights = [weight for _, weight in field_weights]
+
+    if workers <= 1:
+        return _count_shard(values, weights, ngram_range)
+
+    keyword_counts = Counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        while True:
+            shard = list(islice(values, rows_per_shard))
+            if shard:
+                pending.append(executor.submit(_count_shard, shard, weights, ngram_range))
+            # Bound the shards held in memory: wait for the oldest once enough are queued
+            while pending and (len(pending) >= 2 * workers or not shard):
+                keyword_counts.update(pending.pop(0).result())
+            if not shard:
+                return keyword_counts
+
+
+def _count_shard(values, weights, ngram_range):
+    """Counts the keywords of (field values tuple) rows; runs in a worker process when sharded."""
+    keyword_counts = Counter()
+    for row in values:
+        for text, weight in zip(row, weights):
+            if not text:
+                continue
+            for keyword in extract_keywords(text, ngram_range):
+                keyword_counts[keyword] += weight
+    return keyword_counts
+
+
+def extract_keywords(text, ngram_range=NGRAM_RANGE):
+    """
+    Tokenises a field value into cleaned keywords and keyword phrases.
+
+    Phrases are built from consecutive clean words within one segment of the text (see
+    SEGMENT_PATTERN); a stop word or a word with special characters ends a phrase.
+
+    Args:
+        text (str): The field value.
+        ngram_range (tuple): (min, max) number of words per keyword.
+
+    Yields:
+        str: Keywords (phrases joined by single spaces).
+    """
+    min_n, max_n = ngram_range
+    for segment in SEGMENT_PATTERN.split(text.lower()):
+        run = []  # Consecutive clean words
+        for word in WORD_PATTERN.findall(segment):
+            if word in STOP_WORDS or SPECIAL_CHAR_PATTERN.search(word):
+                yield from _ngrams(run, min_n, max_n)
+                run = []
+            else:
+                run.append(word)
+        yield from _ngrams(run, min_n, max_n)
+
+
+def _ngrams(words, min_n, max_n):
+    if max_n == 1:
+        if min_n <= 1:
+            yield from words
+        return
+    for n in range(min_n, max_n + 1):
+        for start in range(len(words) - n + 1):
+            yield " ".join(words[start:start + n])
 
 
 def clean_keywords(keywords):
@@ -86,19 +198,13 @@ def clean_keywords(keywords):
     Returns:
         list: A list of cleaned keywords.
     """
-    # Get English stopwords
-    stop_words = set(stopwords.words('english'))
-
-    # Define a regex pattern to match words with special characters
-    special_char_pattern = re.compile(r'[^a-zA-Z0-9]')
-
     cleaned_keywords = []
     for word in keywords:
         # Convert to lowercase
         word_lower = word.lower()
 
         # Remove stopwords and words with special characters
-        if word_lower not in stop_words and not special_char_pattern.search(word_lower):
+        if word_lower not in STOP_WORDS and not SPECIAL_CHAR_PATTERN.search(word_lower):
             cleaned_keywords.append(word_lower)
 
-    return cleaned_keywords
\ No newline at end of file
+    return cleaned_keywords
@@ -0,0 +1,103 @@
+import numpy as np
+from scipy import sparse
+
+MIN_DOCUMENT_FREQUENCY = 2  # A keyword must appear on at least this many pages (relaxed for tiny corpora)
+# Terms on more than this share of pages are dropped. Competitor pages share their topic, so the
+# default keeps everything; lower it to drop boilerplate found on (nearly) every page.
+MAX_DOCUMENT_RATIO = 1.0
+MIN_PAGES_FOR_MAX_RATIO = 5  # The maximum ratio only applies from this many pages on
+BM25_K1 = 1.2  # Term frequency saturation
+BM25_B = 0.75  # Document length normalisation
+RANKING_METHODS = ("bm25", "tfidf")
+
+
+def build_term_matrix(documents):
+    """
+    Builds a sparse document-term matrix from per-page term counts.
+
+    Args:
+        documents (list): One dict (term -> count) per page.
+
+    Returns:
+        tuple: (scipy.sparse.csr_matrix of shape (pages, terms), list of terms by column)
+    """
+    vocabulary = {}
+    rows, columns, values = [], [], []
+    for row, counts in enumerate(documents):
+        for term, count in counts.items():
+            rows.append(row)
+            columns.append(vocabulary.setdefault(term, len(vocabulary)))
+            values.append(count)
+
+    matrix = sparse.csr_matrix(
+        (np.asarray(values, dtype=np.float64), (np.asarray(rows, dtype=np.int64), np.asarray(columns, dtype=np.int64))),
+        shape=(len(documents), len(vocabulary)),
+    )
+    matrix.sum_duplicates()
+    return matrix, list(vocabulary)
+
+
+def rank_terms(documents, num_keywords=25, method="bm25", min_df=MIN_DOCUMENT_FREQUENCY,
+               max_df_ratio=MAX_DOCUMENT_RATIO, k1=BM25_K1, b=BM25_B):
+    """
+    Ranks terms across a corpus of pages by corpus-aware weights.
+
+    Every page contributes its own (saturated, length-normalised) weight per term, so a
+    long page cannot dominate the ranking, and terms outside the document frequency
+    window (single-page noise, site-wide boilerplate) are dropped. Scores are the sum of
+    the per-page weights, so terms used by many pages rank first; the smoothed idf only
+    tempers that, since the pages are all about the same query.
+
+    Args:
+        documents (list): One dict (term -> count) per page.
+        num_keywords (int): Number of terms to return.
+        method (str): 'bm25' (BM25 tf saturation and length normalisation x smoothed idf)
+            or 'tfidf' (sublinear tf x smoothed idf, L2-normalised per page).
+        min_df (int): Minimum number of pages a term must appear on.
+        max_df_ratio (float): Maximum share of pages a term may appear on.
+        k1 (float): BM25 term frequency saturation.
+        b (float): BM25 length normalisation.
+
+    Returns:
+        list: The top terms, best first.
+    """
+    if method not in RANKING_METHODS:
+        raise ValueError(f"Unknown ranking method: {method}")
+    documents = [counts for counts in documents if counts]
+    if not documents:
+        return []
+
+    matrix, terms = build_term_matrix(documents)
+    num_pages = matrix.shape[0]
+    document_frequency = np.diff(matrix.tocsc().indptr)
+
+    # Document frequency window
+    keep = document_frequency >= min(min_df, num_pages)
+    if max_df_ratio < 1 and num_pages >= MIN_PAGES_FOR_MAX_RATIO:
+        keep &= document_frequency <= max_df_ratio * num_pages
+    if not keep.any():
+        keep[:] = True  # Nothing survives the window, rank everything rather than nothing
+
+    # Row index of every stored value
+    row_of = np.repeat(np.arange(num_pages), np.diff(matrix.indptr))
+    tf = matrix.data
+    idf = np.log((1 + num_pages) / (1 + document_frequency)) + 1
+    if method == "bm25":
+        lengths = np.asarray(matrix.sum(axis=1)).ravel()
+        norm = k1 * (1 - b + b * lengths / lengths.mean())
+        weights = tf * (k1 + 1) / (tf + norm[row_of]) * idf[matrix.indices]
+    else:
+        weights = (1 + np.log(tf)) * idf[matrix.indices]
+        row_norms = np.sqrt(np.bincount(row_of, weights=weights ** 2, minlength=num_pages))
+        weights = weights / row_norms[row_of]
+
+    weighted = sparse.csr_matrix((weights, matrix.indices, matrix.indptr), shape=matrix.shape)
+    scores = np.asarray(weighted.sum(axis=0)).ravel()
+    scores[~keep] = -np.inf
+
+    count = min(num_keywords, int(keep.sum()))
+    if count <= 0:
+        return []
+    top = np.argpartition(-scores, count - 1)[:count]
+    top = top[np.lexsort((top, -scores[top]))]  # Best first, ties in first-seen order
+    return [terms[index] for index in top]
@@ -0,0 +1,137 @@
+import codecs
+import heapq
+import re
+from html.parser import HTMLParser
+from operator import itemgetter
+
+MAX_PAGE_BYTES = 2 * 1024 * 1024  # Competitor pages are truncated after this many (decoded) bytes
+MAX_TRACKED_TERMS = 20000  # Distinct words counted per page before the rarest are pruned
+TOP_KEYWORDS_PER_PAGE = 50
+MIN_WORD_LENGTH = 4
+
+# Elements whose text is boilerplate or code rather than page content
+SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "nav", "footer"}
+
+WORD_PATTERN = re.compile(r"\b\w+\b")
+DIGIT_PATTERN = re.compile(r"\d")
+TRAILING_WORD_PATTERN = re.compile(r"\w+$")
+
+
+class PageTokenizer(HTMLParser):
+    """
+    Incremental HTML tokenizer for keyword extraction.
+
+    Feed it the page chunk by chunk as it downloads: text outside SKIPPED_TAGS is split
+    into lowercase words and counted in a bounded dictionary (once it holds more than
+    `max_terms` words the least frequent half is dropped), and `<meta name="keywords">`
+    is captured on the way. A word split across two chunks or tags is joined back
+    together, as with `get_text()`.
+    """
+
+    def __init__(self, stop_words=(), min_length=MIN_WORD_LENGTH, max_terms=MAX_TRACKED_TERMS):
+        super().__init__(convert_charrefs=True)
+        self.stop_words = stop_words
+        self.min_length = min_length
+        self.max_terms = max_terms
+        self.counts = {}
+        self.meta_keywords = None
+        self.in_body = False
+        self._skip_depth = 0
+        self._carry = ""  # Trailing partial word of the previous text chunk
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag == "body":
+            self.in_body = True
+        elif tag == "meta" and self.meta_keywords is None:
+            attributes = dict(attrs)
+            if (attributes.get("name") or "").lower() == "keywords" and attributes.get("content"):
+                self.meta_keywords = attributes["content"]
+
+    def handle_startendtag(self, tag, attrs):
+        if tag not in SKIPPED_TAGS:  # <svg/> and friends have no content to skip
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        text = self._carry + data.lower()
+        match = TRAILING_WORD_PATTERN.search(text)
+        if match:
+            self._carry = match.group()
+            text = text[:match.start()]
+        else:
+            self._carry = ""
+        for word in WORD_PATTERN.findall(text):
+            self._count(word)
+
+    def close(self):
+        super().close()
+        if self._carry:
+            self._count(self._carry)
+            self._carry = ""
+
+    def _count(self, word):
+        # Ignore short words, stop words and numeric words
+        if len(word) < self.min_length or word in self.stop_words or DIGIT_PATTERN.search(word):
+            return
+        counts = self.counts
+        counts[word] = counts.get(word, 0) + 1
+        if len(counts) > self.max_terms:
+            self._prune()
+
+    def _prune(self):
+        """Keeps the most frequent half of the tracked words."""
+        keep = heapq.nlargest(self.max_terms // 2, self.counts.items(), key=itemgetter(1))
+        self.counts = dict(keep)
+
+    def top_keywords(self, k=TOP_KEYWORDS_PER_PAGE):
+        """
+        Returns the k most frequent words (ties keep first-seen order).
+
+        Args:
+            k (int): Number of words to return.
+
+        Returns:
+            list: The words, most frequent first.
+        """
+        return [word for word, _ in heapq.nlargest(k, self.counts.items(), key=itemgetter(1))]
+
+
+def tokenize_stream(chunks, encoding=None, stop_words=(), max_bytes=MAX_PAGE_BYTES, stop_at_meta=True):
+    """
+    Runs a PageTokenizer over a stream of byte chunks.
+
+    Args:
+        chunks (iterable): Raw body chunks.
+        encoding (str): Charset of the body (utf-8 if unknown).
+        stop_words (set): Words never counted.
+        max_bytes (int): Input is truncated after this many bytes.
+        stop_at_meta (bool): Stop reading once the body starts and meta keywords were found
+            (the content words would not be used).
+
+    Returns:
+        PageTokenizer: The closed tokenizer.
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    tokenizer = PageTokenizer(stop_words=stop_words)
+    received = 0
+    for chunk in chunks:
+        chunk = chunk[:max(0, max_bytes - received)]
+        received += len(chunk)
+        tokenizer.feed(decoder.decode(chunk))
+        if received >= max_bytes or (stop_at_meta and tokenizer.meta_keywords and tokenizer.in_body):
+            break
+    else:
+        tokenizer.feed(decoder.decode(b"", final=True))
+    tokenizer.close()
+    return tokenizer
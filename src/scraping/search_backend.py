@@ -0,0 +1,359 @@
+import abc
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "duckduckgo")  # 'duckduckgo' or 'fixture'
+SEARCH_FIXTURES = os.getenv("SEARCH_FIXTURES", os.path.join("benchmarks", "search_fixtures.json"))
+SEARCH_CACHE_PATH = os.path.join("search_cache", "results.sqlite")
+SEARCH_CACHE_TTL_SECONDS = 24 * 3600  # Results older than this are searched again
+DEFAULT_FIXTURE_KEY = "*"  # Fixture entry served for queries without their own results
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    backend TEXT,
+    query TEXT,
+    max_results INTEGER,
+    results TEXT,
+    fetched_at REAL,
+    PRIMARY KEY (backend, query)
+)
+"""
+
+
+def normalize_query(query):
+    """
+    Normalises a search query for cache lookups: Unicode NFKC, case folded, whitespace collapsed.
+
+    Args:
+        query (str): The query as generated.
+
+    Returns:
+        str: The cache key of the query.
+    """
+    query = unicodedata.normalize("NFKC", query or "").casefold()
+    return WHITESPACE_PATTERN.sub(" ", query).strip()
+
+
+class SearchBackend(abc.ABC):
+    """
+    Interface of a web search backend.
+
+    `search` returns a list of result dicts in the duckduckgo_search format:
+    {'title': ..., 'href': ..., 'body': ...}.
+    """
+
+    name = None
+
+    @abc.abstractmethod
+    def search(self, query, max_results=10):
+        """
+        Searches the web.
+
+        Args:
+            query (str): The search query.
+            max_results (int): Maximum number of results.
+
+        Returns:
+            list: Result dicts.
+        """
+
+
+class DuckDuckGoBackend(SearchBackend):
+    """Live DuckDuckGo text search."""
+
+    name = "duckduckgo"
+
+    def search(self, query, max_results=10):
+        # Imported here so the fixture backend works without duckduckgo_search installed
+        from duckduckgo_search import DDGS
+
+        with DDGS() as ddgs:
+            return list(ddgs.text(query, max_results=max_results))
+
+
+class FixtureBackend(SearchBackend):
+    """
+    Offline backend serving recorded results from a JSON file, for benchmarks and tests.
+
+    The file maps queries to result lists (keys are normalised on load); the
+    DEFAULT_FIXTURE_KEY entry, if present, answers every other query. A fixture file can
+    be produced from real searches with `SearchCache.export_fixtures`.
+    """
+
+    name = "fixture"
+
+    def __init__(self, path=SEARCH_FIXTURES):
+        """
+        Args:
+            path (str): Path of the fixture file.
+
+        Raises:
+            ValueError: If the file is missing or is not a JSON object of result lists.
+        """
+        self.path = path
+        try:
+            with open(path, encoding='utf-8') as f:
+                fixtures = json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f"Search fixture file not found: {path} (set SEARCH_FIXTURES to a fixture file, "
+                             f"e.g. one written by SearchCache.export_fixtures)") from None
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Search fixture file {path} is not valid JSON: {e}") from None
+        if not isinstance(fixtures, dict):
+            raise ValueError(f"Search fixture file {path} must map queries to result lists")
+        self.fixtures = {normalize_query(query): results for query, results in fixtures.items()}
+        self.default = fixtures.get(DEFAULT_FIXTURE_KEY, [])
+
+    def search(self, query, max_results=10):
+        return list(self.fixtures.get(normalize_query(query), self.default))[:max_results]
+
+
+class SearchCache:
+    """
+    Persistent search result cache (SQLite), keyed by backend and normalised query.
+
+    An entry answers any request for at most as many results as were fetched for it,
+    until it is older than `ttl`. Expired entries are kept so they can still be served
+    when the backend fails (e.g. when DuckDuckGo rate limits a batch run).
+    """
+
+    def __init__(self, path=SEARCH_CACHE_PATH, ttl=SEARCH_CACHE_TTL_SECONDS):
+        """
+        Args:
+            path (str): Path of the SQLite database (created if missing).
+            ttl (float): Seconds a result list stays fresh.
+        """
+        self.path = path
+        self.ttl = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by the request threads, serialized by the lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(SCHEMA)
+
+    def get(self, backend, query, max_results, allow_stale=False, now=None):
+        """
+        Looks up the results of a query.
+
+        Args:
+            backend (str): Name of the backend the results came from.
+            query (str): The search query.
+            max_results (int): Number of results wanted.
+            allow_stale (bool): Also return entries older than the TTL.
+            now (float): Current time (defaults to time.time()).
+
+        Returns:
+            list: Up to `max_results` results, or None on a miss.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT max_results, results, fetched_at FROM results WHERE backend = ? AND query = ?",
+                (backend, normalize_query(query)),
+            ).fetchone()
+        if row is None:
+            return None
+        fetched_for, results, fetched_at = row
+        results = json.loads(results)
+        # A shorter list than requested is complete if the backend had no more results
+        if max_results > fetched_for and len(results) >= fetched_for:
+            return None
+        if not allow_stale and now - fetched_at > self.ttl:
+            return None
+        return results[:max_results]
+
+    def put(self, backend, query, max_results, results, now=None):
+        """
+        Stores the results of a query.
+
+        Args:
+            backend (str): Name of the backend the results came from.
+            query (str): The search query.
+            max_results (int): Number of results that were requested.
+            results (list): The results returned by the backend.
+            now (float): Current time (defaults to time.time()).
+        """
+        now = time.time() if now is None else now
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results (backend, query, max_results, results, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (backend, normalize_query(query), max_results, json.dumps(results), now),
+            )
+
+    def purge(self, now=None):
+        """Deletes the expired entries and returns how many were removed."""
+        now = time.time() if now is None else now
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM results WHERE fetched_at < ?", (now - self.ttl,)
+            )
+            return cursor.rowcount
+
+    def export_fixtures(self, path, backend=DuckDuckGoBackend.name):
+        """
+        Writes the cached results of a backend as a FixtureBackend file.
+
+        Args:
+            path (str): Path of the fixture file to write.
+            backend (str): Name of the backend whose results are exported.
+
+        Returns:
+            int: The number of queries written.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT query, results FROM results WHERE backend = ? ORDER BY query", (backend,)
+            ).fetchall()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({query: json.loads(results) for query, results in rows}, f, indent=2)
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class CachedSearch:
+    """
+    A search backend behind the persistent result cache.
+
+    Fresh cached results are returned without a search; on a miss the backend is queried
+    and its results stored. If the backend fails, an expired entry is served instead
+    when there is one. Concurrent misses for the same query share one backend search.
+    """
+
+    def __init__(self, backend, cache):
+        """
+        Args:
+            backend (SearchBackend): The backend answering cache misses.
+            cache (SearchCache): The result cache, or None to always search.
+        """
+        self.backend = backend
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self._in_flight = {}  # (normalised query, max_results) -> Future of the running search
+        self._lock = threading.Lock()
+
+    def search(self, query, max_results=10):
+        """
+        Searches through the cache.
+
+        Args:
+            query (str): The search query.
+            max_results (int): Maximum number of results.
+
+        Returns:
+            list: Result dicts ('title', 'href', 'body').
+
+        Raises:
+            Exception: Whatever the backend raises, if nothing is cached for the query.
+        """
+        if self.cache is not None:
+            results = self.cache.get(self.backend.name, query, max_results)
+            if results is not None:
+                self.hits += 1
+                logging.info(f"Search cache hit for '{normalize_query(query)}'")
+                return results
+
+        key = (normalize_query(query), max_results)
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is None:
+                future = self._in_flight[key] = Future()
+                owner = True
+                self.misses += 1
+            else:
+                owner = False
+                self.hits += 1
+        if not owner:
+            logging.info(f"Search for '{key[0]}' already running, waiting for its results")
+            return future.result()
+
+        try:
+            results = self._search_backend(query, max_results)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(results)
+            return results
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def _search_backend(self, query, max_results):
+        """Answers a cache miss from the backend (or from an expired entry if the backend fails)."""
+        try:
+            results = self.backend.search(query, max_results=max_results)
+        except Exception as e:
+            stale = self.cache.get(self.backend.name, query, max_results, allow_stale=True) if self.cache else None
+            if stale is None:
+                raise
+            logging.warning(f"Search for '{normalize_query(query)}' failed ({e}), serving expired cached results")
+            return stale
+
+        if self.cache is not None:
+            self.cache.put(self.backend.name, query, max_results, results)
+        return results
+
+
+_search = None
+_search_lock = threading.Lock()
+
+
+def create_backend(name=SEARCH_BACKEND):
+    """
+    Creates a search backend by name.
+
+    Args:
+        name (str): 'duckduckgo' or 'fixture' (reads SEARCH_FIXTURES).
+
+    Returns:
+        SearchBackend: The backend.
+    """
+    if name == DuckDuckGoBackend.name:
+        return DuckDuckGoBackend()
+    if name == FixtureBackend.name:
+        return FixtureBackend()
+    raise ValueError(f"Unknown search backend: {name}")
+
+
+def get_search():
+    """Returns the process-wide CachedSearch for SEARCH_BACKEND (fixture results are not cached)."""
+    global _search
+    with _search_lock:
+        if _search is None:
+            backend = create_backend(SEARCH_BACKEND)
+            cache = SearchCache() if backend.name != FixtureBackend.name else None
+            _search = CachedSearch(backend, cache)
+        return _search
+
+
+def search(query, max_results=10):
+    """
+    Searches the web through the configured, cached backend.
+
+    Args:
+        query (str): The search query.
+        max_results (int): Maximum number of results.
+
+    Returns:
+        list: Result dicts ('title', 'href', 'body').
+    """
+    return get_search().search(query, max_results=max_results)
@@ -1,94 +1,267 @@
 import re
-from bs4 import BeautifulSoup
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 import requests
-from duckduckgo_search import DDGS
 
-def scrape_keywords(url):
+from src.scraping.keyword_ranking import rank_terms
+from src.scraping.search_backend import search
+from src.scraping.page_tokenizer import tokenize_stream, TOP_KEYWORDS_PER_PAGE, MAX_PAGE_BYTES
+from src.utils.host_limiter import HostLimiter
+from src.utils.robots import get_robots
+from src.utils.transport import Transport
+
+REQUEST_TIMEOUT = 10  # Seconds allowed for one competitor page
+MAX_CONCURRENT_SCRAPES = 16  # Competitor pages fetched at the same time
+MAX_SCRAPES_PER_HOST = 2  # Simultaneous fetches against one competitor host
+SCRAPE_DEADLINE_SECONDS = 30  # Global deadline for the whole scraping stage
+ENOUGH_PAGES = 30  # Stop waiting once this many pages have returned keywords
+AGGREGATION_MODE = "bm25"  # 'count' (keyword list frequency), 'bm25' or 'tfidf' (corpus-weighted)
+CHARSET_PATTERN = re.compile(r"charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+
+# Competitor pages are fetched without retries: a retried page would outlive the scraping
+# deadline, and a failed page is simply left out of the aggregation
+COMPETITOR_TRANSPORT = Transport(max_retries=0)
+
+
+def scrape_page(url, timeout=REQUEST_TIMEOUT, cancelled=None):
+    """
+    Downloads a page and tokenizes it while it streams in (see page_tokenizer.py): at most
+    MAX_PAGE_BYTES are read, script/style/nav text is skipped, and the download stops
+    early once the meta keywords are known.
+
+    Args:
+        url: The URL to scrape.
+        timeout: Seconds allowed for the whole page (reading robots.txt, connecting, and
+            reading the body).
+        cancelled: Optional threading.Event; once set, the download stops at the next chunk.
+
+    Returns:
+        The closed PageTokenizer, or None if the page is disallowed, could not be fetched
+        in time or was cancelled.
+    """
+    deadline = time.monotonic() + timeout
+    if not get_robots(url, timeout=timeout).can_fetch(url, requests.utils.default_user_agent()):
+        print(f"Skipping {url}: disallowed by robots.txt")
+        return None
+
+    time_left = deadline - time.monotonic()
+    if time_left <= 0 or (cancelled is not None and cancelled.is_set()):
+        return None  # robots.txt used up the page's time
+    try:
+        # Keep-alive transport, the body is streamed into the tokenizer
+        with COMPETITOR_TRANSPORT.get(url, timeout=time_left, stream=True) as response:
+            response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
+            charset = CHARSET_PATTERN.search(response.headers.get('Content-Type', ''))
+            tokenizer = tokenize_stream(
+                _until(COMPETITOR_TRANSPORT.iter_content(response, incremental=True), deadline, cancelled),
+                encoding=charset.group(1) if charset else None,
+                stop_words=stop_words,
+                max_bytes=MAX_PAGE_BYTES,
+            )
+        if time.monotonic() >= deadline or (cancelled is not None and cancelled.is_set()):
+            return None  # Cut off, the partial page is not used
+        return tokenizer
+
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching or processing {url}: {e}")
+        return None
+    except Exception as e:
+        print(f"Error scraping {url}: {e}")
+        return None
+
+
+def _until(chunks, deadline, cancelled=None):
+    """Passes body chunks through until the deadline (a time.monotonic() value) or cancellation."""
+    for chunk in chunks:
+        yield chunk
+        if time.monotonic() >= deadline or (cancelled is not None and cancelled.is_set()):
+            return
+
+
+def scrape_keywords(url, timeout=REQUEST_TIMEOUT, num_keywords=TOP_KEYWORDS_PER_PAGE, cancelled=None):
     """
     Scrapes metadata keywords or content keywords from a URL.
 
     Args:
         url: The URL to scrape.
+        timeout: Seconds allowed for the whole page.
+        num_keywords: Number of content keywords to return when the page has no meta keywords.
+        cancelled: Optional threading.Event that abandons the download (see scrape_page).
 
     Returns:
         A list of keywords (strings), or None if no keywords were found.
     """
+    tokenizer = scrape_page(url, timeout, cancelled)
+    if tokenizer is None:
+        return None
+
+    # Try to get keywords from meta tag
+    if tokenizer.meta_keywords:
+        return [k.strip() for k in tokenizer.meta_keywords.split(",")]
+
+    # If no meta keywords, use the most frequent words of the page content
+    content_keywords = tokenizer.top_keywords(num_keywords)
+
+    if content_keywords:
+        return content_keywords
+
+    return None # No keywords found
+
+
+def scrape_term_counts(url, timeout=REQUEST_TIMEOUT, cancelled=None):
+    """
+    Scrapes the term counts of a page for corpus-weighted aggregation.
+
+    Args:
+        url: The URL to scrape.
+        timeout: Seconds allowed for the whole page.
+        cancelled: Optional threading.Event that abandons the download (see scrape_page).
+
+    Returns:
+        A dict (term -> count): each meta keyword once, or else the page's word counts.
+        None if the page yielded no terms.
+    """
+    tokenizer = scrape_page(url, timeout, cancelled)
+    if tokenizer is None:
+        return None
+    if tokenizer.meta_keywords:
+        keywords = (k.strip() for k in tokenizer.meta_keywords.split(","))
+        return dict.fromkeys((k for k in keywords if k), 1) or None
+    return tokenizer.counts or None
+
+
+def scrape_keywords_concurrently(urls, deadline=SCRAPE_DEADLINE_SECONDS, enough_pages=ENOUGH_PAGES,
+                                 max_workers=MAX_CONCURRENT_SCRAPES, per_host_limit=MAX_SCRAPES_PER_HOST,
+                                 scraper=scrape_keywords):
+    """
+    Scrapes many pages in a thread pool and yields their keywords as soon as each one responds.
+
+    Fetches are capped per host, every page (connection and body) is bounded by what is
+    left of the global deadline, and the stage stops early once `enough_pages` pages have
+    returned keywords. Pages still in flight when the stage ends are cancelled: their
+    downloads stop at the next chunk and queued pages are never requested.
+
+    Args:
+        urls: The URLs to scrape.
+        deadline: Seconds after which no more results are waited for.
+        enough_pages: Number of pages with keywords after which the stage stops.
+        max_workers: Size of the thread pool.
+        per_host_limit: Maximum simultaneous fetches against one host.
+        scraper: Function (url, timeout=..., cancelled=...) run for every page, e.g. scrape_term_counts.
+
+    Yields:
+        (url, keywords) tuples in completion order; keywords is None for pages without any.
+    """
+    started = time.monotonic()
+    host_limiter = HostLimiter(per_host_limit)
+    cancelled = threading.Event()
+
+    def remaining():
+        return deadline - (time.monotonic() - started)
+
+    def scrape(url):
+        with host_limiter.limit(url):
+            time_left = remaining()
+            if time_left <= 0 or cancelled.is_set():
+                return None
+            return scraper(url, timeout=min(REQUEST_TIMEOUT, time_left), cancelled=cancelled)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
     try:
-        response = requests.get(url, timeout=10)  # Add timeout to prevent hanging
-        response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Try to get keywords from meta tag
-        meta_keywords = soup.find("meta", attrs={"name": "keywords"})
-        if meta_keywords:
-            keywords = meta_keywords.get("content")
+        futures = {executor.submit(scrape, url): url for url in dict.fromkeys(urls)}
+        pages_with_keywords = 0
+        for future in as_completed(futures, timeout=max(remaining(), 0)):
+            keywords = future.result()
+            yield futures[future], keywords
             if keywords:
-                return [k.strip() for k in keywords.split(",")]
+                pages_with_keywords += 1
+                if pages_with_keywords >= enough_pages:
+                    print(f"Collected keywords from {pages_with_keywords} pages, skipping the remaining results")
+                    return
+    except FuturesTimeoutError:
+        print(f"Competitor scraping deadline of {deadline}s reached, using the pages fetched so far")
+    finally:
+        # Don't wait for slow pages: queued ones are cancelled, running ones stop reading
+        cancelled.set()
+        executor.shutdown(wait=False, cancel_futures=True)
 
-        # If no meta keywords, extract common words from page content
-        text = soup.get_text()
-        words = re.findall(r'\b\w+\b', text.lower())  # Extract words, convert to lowercase
-        word_counts = {}
-        for word in words:
-            if len(word) > 3 and word not in stop_words and not re.search(r'\d', word): # Ignore short words, stop words and numeric words
-                word_counts[word] = word_counts.get(word, 0) + 1
 
-        # Get the most frequent words as keywords
-        sorted_words = sorted(word_counts.items(), key=lambda item: item[1], reverse=True)
-        content_keywords = [word for word, count in sorted_words] #Get all of the words
+def search_competitor_pages(query, num_results=50):
+    """
+    Returns the competitor pages of a search as page records for page-level matching.
 
-        if content_keywords:
-            return content_keywords
+    The title and snippet of each result stand in for the page's title and meta
+    description, so no page is fetched. The search is shared with
+    search_and_aggregate_keywords for the same query: a cache hit, or the same
+    in-flight search when both run at once.
 
-        return None # No keywords found
+    Args:
+        query: The search query.
+        num_results: The number of top results.
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching or processing {url}: {e}")
-        return None
+    Returns:
+        A list of dicts with 'URL', 'Topic' and 'Meta Description' keys (empty on error).
+    """
+    try:
+        search_results = search(query, max_results=num_results)
     except Exception as e:
-        print(f"Error scraping {url}: {e}")
-        return None
+        print(f"An error occurred during the search: {e}")
+        return []
+    return [
+        {'URL': result['href'], 'Topic': result.get('title'), 'Meta Description': result.get('body')}
+        for result in search_results if result.get('href')
+    ]
 
 
-def search_and_aggregate_keywords(query, num_results=50):
+def search_and_aggregate_keywords(query, num_results=50, mode=AGGREGATION_MODE):
     """
-    Performs a DuckDuckGo search, retrieves the top results, and aggregates
-    the top 25 most frequent keywords into a single string.
+    Performs a web search (see search_backend.py), retrieves the top results, and aggregates
+    the top 25 keywords into a single string.
 
     Args:
         query: The search query.
         num_results: The number of top results to fetch and scrape.
+        mode: 'count' ranks keywords by how many page keyword lists contain them;
+            'bm25' / 'tfidf' rank the terms of a document-term matrix over the pages
+            by corpus-aware weights (see keyword_ranking.py).
 
     Returns:
-        A single string containing the top 25 most frequent keywords,
+        A single string containing the top 25 keywords,
         separated by commas.  Returns an empty string if any error occurs
         during the process or if no keywords are found.
     """
 
-    all_keywords = []
+    keyword_counts = Counter()
+    page_terms = []
+    scraper = scrape_keywords if mode == "count" else scrape_term_counts
     try:
-        with DDGS() as ddgs:
-            search_results = list(ddgs.text(query, max_results=num_results))
-
-            for result in search_results:
-                url = result.get('href')  # Correct key to access URL
-                if url:
-                    keywords = scrape_keywords(url)
-                    if keywords:
-                        all_keywords.extend(keywords)  # Add keywords to the overall list
-                    else:
-                        print(f"No keywords found for {url}")
-                else:
-                    print("URL not found in result.")
-
-        # Count keyword frequencies across all pages
-        keyword_counts = {}
-        for keyword in all_keywords:
-            keyword_counts[keyword] = keyword_counts.get(keyword, 0) + 1
-
-        # Get the top 25 most frequent keywords
-        sorted_keywords = sorted(keyword_counts.items(), key=lambda item: item[1], reverse=True)
-        top_25_keywords = [keyword for keyword, count in sorted_keywords[:25]]
+        # Cached per normalised query, repeated queries skip the search round-trip
+        search_results = search(query, max_results=num_results)
+
+        urls = []
+        for result in search_results:
+            url = result.get('href')  # Correct key to access URL
+            if url:
+                urls.append(url)
+            else:
+                print("URL not found in result.")
+
+        # Pages are fetched concurrently and collected as they arrive
+        for url, keywords in scrape_keywords_concurrently(urls, scraper=scraper):
+            if not keywords:
+                print(f"No keywords found for {url}")
+            elif mode == "count":
+                keyword_counts.update(keywords)  # Count keyword frequencies across all pages
+            else:
+                page_terms.append(keywords)
+
+        # Get the top 25 keywords
+        if mode == "count":
+            top_25_keywords = [keyword for keyword, count in keyword_counts.most_common(25)]
+        else:
+            top_25_keywords = rank_terms(page_terms, num_keywords=25, method=mode)
 
         return ", ".join(top_25_keywords) # Join the keywords into a single string
 
@@ -0,0 +1,383 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from src.similarity.model_registry import encode, DEFAULT_MODEL
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+EMBEDDING_CACHE_DIR = "embedding_cache"  # One subdirectory (index + vector file) per model
+EMBEDDING_CACHE_MAX_VECTORS = 200000  # Least recently used vectors are overwritten above this count
+EMBEDDING_CACHE_READ_ONLY = os.getenv("EMBEDDING_CACHE_READ_ONLY") == "1"  # Workers reading a cache filled elsewhere
+INITIAL_CAPACITY = 1024  # Rows allocated in the vector file at first; the file doubles as it fills
+LOOKUP_CHUNK_SIZE = 500  # Keys per SQL query (SQLite caps the number of parameters)
+TOUCH_FLUSH_INTERVAL = 30  # Seconds between writes of the LRU times of looked-up keys
+TOUCH_FLUSH_KEYS = 10000  # Looked-up keys that trigger a write of their LRU times sooner
+TOUCH_BUSY_TIMEOUT_MS = 100  # How long a lookup waits for the write lock before keeping its LRU times for later
+BUSY_TIMEOUT_MS = 5000  # How long writes wait for another process holding the write lock
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    slot INTEGER UNIQUE,
+    last_used REAL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER
+);
+"""
+
+
+def key_tag(key):
+    """Returns the 64-bit tag stored with a key's row (never 0, which marks a row being written)."""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+
+def content_key(text, model_name=DEFAULT_MODEL):
+    """Returns the cache key of a text: SHA-256 of the model name and the exact text."""
+    return hashlib.sha256(f"{model_name}\0{text}".encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache: a memory-mapped float32 matrix plus an offset index.
+
+    `vectors.f32` holds one embedding per row; `index.sqlite` maps content keys to row
+    numbers ("slots") and records when each was last used. Several worker processes can
+    share one cache read-only through the page cache. Writers allocate slots inside an
+    immediate SQLite transaction, which serialises them across processes; once
+    `max_vectors` rows are in use the least recently used slots are overwritten.
+
+    Lookups return copies of the rows, not views into the mapping: a view would change
+    under the caller as soon as its slot is reused. Copying costs one memcpy per vector
+    (still no deserialisation). A slot can also be reused by another process between
+    the index lookup and the copy, so `tags.u64` holds a tag of the key written in each
+    row (see key_tag). Writers clear it before overwriting a row and set it after;
+    readers check it before and after copying and treat a mismatch as a miss.
+
+    Lookups only read the index: the times of the keys they hit are kept in memory and
+    written in one transaction with the next `put_many`, or every TOUCH_FLUSH_INTERVAL
+    seconds if the write lock is free, so concurrent readers never queue for it.
+    """
+
+    def __init__(self, directory, max_vectors=EMBEDDING_CACHE_MAX_VECTORS, read_only=False):
+        """
+        Args:
+            directory (str): Directory of the cache (created if missing, unless read-only).
+            max_vectors (int): Maximum number of cached embeddings.
+            read_only (bool): Never write (lookups do not refresh the LRU order either).
+        """
+        self.directory = directory
+        self.max_vectors = max_vectors
+        self.read_only = read_only
+        self.index_path = os.path.join(directory, "index.sqlite")
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.tags_path = os.path.join(directory, "tags.u64")
+        self.dim = None
+        self.hits = 0
+        self.misses = 0
+        self._vectors = None
+        self._tags = None
+        self._lock = threading.Lock()
+        self._touched = {}  # key -> time of its last lookup, not yet written to the index
+        self._touches_flushed = time.monotonic()
+
+        if read_only:
+            # A missing cache simply misses every lookup
+            self._connection = None
+            if os.path.exists(self.index_path):
+                self._connection = sqlite3.connect(f"file:{self.index_path}?mode=ro", uri=True,
+                                                   check_same_thread=False)
+        else:
+            os.makedirs(directory, exist_ok=True)
+            # Transactions are opened explicitly (BEGIN IMMEDIATE) to lock out other writers
+            self._connection = sqlite3.connect(self.index_path, check_same_thread=False, isolation_level=None,
+                                               timeout=BUSY_TIMEOUT_MS / 1000)
+            self._connection.executescript(SCHEMA)
+
+    def get(self, key):
+        """
+        Looks up one embedding.
+
+        Args:
+            key (str): Content key (see content_key).
+
+        Returns:
+            numpy.ndarray: Copy of the cached vector, or None.
+        """
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        """
+        Looks up embeddings.
+
+        Args:
+            keys (list): Content keys.
+
+        Returns:
+            list: One vector (or None on a miss) per key.
+        """
+        with self._lock:
+            slots = self._lookup(keys)
+            if slots and not self.read_only:
+                self._touch(slots)
+            # Copied while the lock keeps this process's put_many from overwriting the slots
+            copies = dict(zip(slots, self._read(list(slots.items()))))
+            vectors = [copies.get(key) for key in keys]
+        found = sum(vector is not None for vector in vectors)
+        self.hits += found
+        self.misses += len(keys) - found
+        return vectors
+
+    def put_many(self, keys, vectors):
+        """
+        Stores embeddings, evicting the least recently used ones if the cache is full.
+
+        Args:
+            keys (list): Content keys.
+            vectors (numpy.ndarray): Matching embeddings, shape (len(keys), dim).
+        """
+        if self.read_only or not len(keys):
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.dim is not None and vectors.shape[1] != self.dim:
+            raise ValueError(f"Cache holds {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+        # Later duplicates win, at most max_vectors of them fit
+        rows = list({key: row for row, key in enumerate(keys)}.items())[-self.max_vectors:]
+
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._write_touches()
+                self._load_dim()
+                if self.dim is None:
+                    self.dim = vectors.shape[1]
+                    connection.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)", (self.dim,))
+
+                # Another process may have stored some of them in the meantime
+                present = self._lookup([key for key, _ in rows])
+                rows = [(key, row) for key, row in rows if key not in present]
+                if not rows:
+                    connection.execute("COMMIT")
+                    return
+
+                next_slot = self._meta('next_slot', 0)
+                fresh = min(len(rows), self.max_vectors - next_slot)
+                slots = list(range(next_slot, next_slot + fresh))
+                if len(rows) > fresh:
+                    evicted = connection.execute(
+                        "SELECT key, slot FROM entries ORDER BY last_used LIMIT ?", (len(rows) - fresh,)
+                    ).fetchall()
+                    connection.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in evicted])
+                    slots += [slot for _, slot in evicted]
+                    logging.info(f"Evicted {len(evicted)} embeddings from {self.directory}")
+                rows = rows[:len(slots)]
+
+                self._ensure_capacity(max(slots) + 1)
+                # Readers copying these slots right now see the tag change and miss
+                self._tags[slots] = 0
+                self._vectors[slots] = vectors[[row for _, row in rows]]
+                self._tags[slots] = [key_tag(key) for key, _ in rows]
+                self._vectors.flush()  # Vectors hit the file before the index points at them
+                self._tags.flush()
+
+                now = time.time()
+                connection.executemany(
+                    "INSERT INTO entries (key, slot, last_used) VALUES (?, ?, ?)",
+                    [(key, slot, now) for (key, _), slot in zip(rows, slots)],
+                )
+                connection.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('next_slot', ?)",
+                                   (next_slot + fresh,))
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+    def __len__(self):
+        if self._connection is None:
+            return 0
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                if self._touched and not self.read_only:
+                    self._flush_touches()
+                self._connection.close()
+            self._vectors = None
+            self._tags = None
+
+    def _lookup(self, keys):
+        """Returns key -> slot for the cached keys."""
+        if self._connection is None:
+            return {}
+        slots = {}
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), LOOKUP_CHUNK_SIZE):
+            chunk = unique[start:start + LOOKUP_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            slots.update(self._connection.execute(
+                f"SELECT key, slot FROM entries WHERE key IN ({placeholders})", chunk
+            ).fetchall())
+        return slots
+
+    def _touch(self, keys):
+        """Records a lookup of the keys, writing the pending LRU times if they are due."""
+        now = time.time()
+        self._touched.update(dict.fromkeys(keys, now))
+        if (len(self._touched) >= TOUCH_FLUSH_KEYS
+                or time.monotonic() - self._touches_flushed >= TOUCH_FLUSH_INTERVAL):
+            self._flush_touches()
+
+    def _flush_touches(self):
+        """Writes the pending LRU times in one transaction; keeps them for later if the index is locked."""
+        connection = self._connection
+        connection.execute(f"PRAGMA busy_timeout = {TOUCH_BUSY_TIMEOUT_MS}")
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError as e:
+            logging.debug(f"Deferred LRU update of {len(self._touched)} embeddings: {e}")
+            return
+        finally:
+            connection.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        try:
+            self._write_touches()
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _write_touches(self):
+        """Writes the pending LRU times inside the caller's transaction."""
+        if self._touched:
+            self._connection.executemany("UPDATE entries SET last_used = ? WHERE key = ?",
+                                         [(used, key) for key, used in self._touched.items()])
+            self._touched = {}
+        self._touches_flushed = time.monotonic()
+
+    def _meta(self, name, default=None):
+        row = self._connection.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def _load_dim(self):
+        if self.dim is None and self._connection is not None:
+            self.dim = self._meta('dim')
+
+    def _read(self, found):
+        """
+        Copies the rows of (key, slot) pairs, remapping the files if they grew since they were mapped.
+
+        Returns:
+            list: One vector per pair, None where the slot now holds another key's row.
+        """
+        self._load_dim()
+        if not found:
+            return []
+        slots = [slot for _, slot in found]
+        if max(slots) >= self._mapped_rows():
+            self._map()
+        rows = self._mapped_rows()
+        readable = [(index, slot) for index, slot in enumerate(slots) if slot < rows]
+        result = [None] * len(found)
+        if not readable:
+            return result
+
+        expected = np.array([key_tag(found[index][0]) for index, _ in readable], dtype=np.uint64)
+        slots = [slot for _, slot in readable]
+        before = np.array(self._tags[slots])
+        vectors = np.array(self._vectors[slots])
+        after = np.array(self._tags[slots])
+        valid = (before == expected) & (after == expected)
+        for (index, _), vector, ok in zip(readable, vectors, valid):
+            if ok:
+                result[index] = vector
+        if not valid.all():
+            logging.debug(f"{len(valid) - int(valid.sum())} embeddings overwritten while being read")
+        return result
+
+    def _mapped_rows(self):
+        """Returns how many rows are mapped in both the vector and the tag file."""
+        if self._vectors is None or self._tags is None:
+            return 0
+        return min(self._vectors.shape[0], self._tags.shape[0])
+
+    def _map(self):
+        rows = os.path.getsize(self.vectors_path) // (self.dim * 4) if os.path.exists(self.vectors_path) else 0
+        mode = 'r' if self.read_only else 'r+'
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode=mode,
+                                  shape=(rows, self.dim)) if rows else None
+        if rows and not self.read_only and (not os.path.exists(self.tags_path)
+                                            or os.path.getsize(self.tags_path) < rows * 8):
+            # Rows of a cache written before tags existed read as misses until rewritten
+            with open(self.tags_path, 'ab') as f:
+                f.truncate(rows * 8)
+        tag_rows = os.path.getsize(self.tags_path) // 8 if os.path.exists(self.tags_path) else 0
+        self._tags = np.memmap(self.tags_path, dtype=np.uint64, mode=mode, shape=(tag_rows,)) if tag_rows else None
+
+    def _ensure_capacity(self, rows):
+        """Grows the vector and tag files (doubling, up to max_vectors rows) so they hold at least `rows` rows."""
+        if self._mapped_rows() < rows:
+            self._map()
+        capacity = self._mapped_rows()
+        if capacity >= rows:
+            return
+        capacity = min(self.max_vectors, max(rows, capacity * 2, INITIAL_CAPACITY))
+        with open(self.vectors_path, 'ab') as f:
+            f.truncate(capacity * self.dim * 4)  # Sparse until written
+        self._map()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model_name=DEFAULT_MODEL):
+    """Returns the process-wide EmbeddingCache of a model."""
+    with _caches_lock:
+        cache = _caches.get(model_name)
+        if cache is None:
+            directory = os.path.join(EMBEDDING_CACHE_DIR, re.sub(r"[^\w.-]", "_", model_name))
+            cache = _caches[model_name] = EmbeddingCache(directory, read_only=EMBEDDING_CACHE_READ_ONLY)
+        return cache
+
+
+def cached_encode(texts, model_name=DEFAULT_MODEL, cache=None):
+    """
+    Embeds texts, running the model only for texts not in the embedding cache.
+
+    Args:
+        texts (list): The texts to embed.
+        model_name (str): Model name.
+        cache (EmbeddingCache): Overrides the model's process-wide cache.
+
+    Returns:
+        numpy.ndarray: L2-normalised float32 embeddings, shape (len(texts), dimension).
+    """
+    if cache is None:
+        cache = get_embedding_cache(model_name)
+    keys = [content_key(text, model_name) for text in texts]
+    vectors = cache.get_many(keys)
+
+    missing = {}  # key -> text, each distinct text is encoded once
+    for key, text, vector in zip(keys, texts, vectors):
+        if vector is None:
+            missing.setdefault(key, text)
+    encoded = {}
+    if missing:
+        new_vectors = encode(list(missing.values()), name=model_name)
+        cache.put_many(list(missing), new_vectors)
+        encoded = dict(zip(missing, new_vectors))
+
+    if not texts:
+        return np.empty((0, cache.dim or 0), dtype=np.float32)
+    return np.stack([vector if vector is not None else encoded[key] for key, vector in zip(keys, vectors)])
@@ -1,46 +1,372 @@
 # Example with cleaned keywords
+import functools
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
 from nltk.corpus import stopwords
 from nltk.stem import PorterStemmer
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy import sparse
 
-def calculate_cosine_similarity(keywords1, keywords2):
+TFIDF_MODEL_PATH = os.path.join("tfidf_model", "corpus.sqlite")  # Vocabulary and document frequencies
+TFIDF_MAX_DOCUMENTS = 100000  # Documents counted before the model decays
+TFIDF_MAX_TERMS = 500000  # Vocabulary size before the model decays
+TFIDF_DECAY = 0.5  # Factor applied to the document counts when the model decays
+TFIDF_MIN_DOCUMENT_FREQUENCY = 1  # Terms whose decayed document frequency falls below this are forgotten
+TOP_TERMS_PER_PAIR = 5  # Terms reported per compared pair of documents
+STEM_CACHE_SIZE = 65536  # Distinct words whose stems are memoised
+
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")  # Same tokens as TfidfVectorizer's default
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY,
+    document_frequency REAL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    fingerprint BLOB PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value REAL
+);
+"""
+
+
+@functools.lru_cache(maxsize=1)
+def _stop_words():
+    return frozenset(stopwords.words('english'))
+
+
+_stemmer = PorterStemmer()
+
+
+@functools.lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(word):
+    """Porter stem of a lowercase word (memoised, keyword lists repeat the same words)."""
+    return _stemmer.stem(word)
+
+
+def analyze(text):
     """
-    Calculates the cosine similarity between two sets of keywords using TF-IDF.
+    Splits a document into index terms: lowercase tokens, stop words removed, stemmed.
 
     Args:
-        keywords1: A list of strings representing the keywords for the first website.
-        keywords2: A list of strings representing the keywords for the second website.
+        text (str): The document.
 
     Returns:
-        The cosine similarity score (a float between 0 and 1).
+        list: The terms, in document order.
     """
+    stop_words = _stop_words()
+    return [stem(token) for token in TOKEN_PATTERN.findall(text.lower()) if token not in stop_words]
 
-    # Combine the keywords into a single list of strings, where each element is
-    # the keywords for one website.
-    documents = [" ".join(keywords1), " ".join(keywords2)]
 
-    # Create a TF-IDF vectorizer. This will:
-    # 1. Tokenize the strings (split them into words).
-    # 2. Count the term frequencies.
-    # 3. Calculate the IDF for each term.
-    # 4. Calculate the TF-IDF scores.
-    vectorizer = TfidfVectorizer()
+class TfidfModel:
+    """
+    TF-IDF model fitted over every site and competitor document seen so far.
 
-    # Fit and transform the documents into a TF-IDF matrix.
-    tfidf_matrix = vectorizer.fit_transform(documents)
+    The vocabulary and document frequencies grow incrementally with `partial_fit` (each
+    distinct document is counted once, however often it is analysed again) and are saved
+    to SQLite so the IDF keeps improving across runs; a save only writes what changed
+    since the last one. Documents are transformed into L2-normalised TF-IDF rows, so the
+    cosine similarities of N documents against M others are a single sparse matrix product.
 
-    # Calculate the cosine similarity between the two TF-IDF vectors.
-    cosine_sim = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
+    The model is bounded: before counting documents that would take it past
+    `max_documents` documents or `max_terms` terms, every count is multiplied by
+    TFIDF_DECAY, terms falling below TFIDF_MIN_DOCUMENT_FREQUENCY are forgotten and only
+    the most recent fingerprints are kept. Recent documents thus weigh more than old ones, and a forgotten document is
+    simply counted again if it comes back.
+    """
 
-    return cosine_sim
+    def __init__(self, path=TFIDF_MODEL_PATH, max_documents=TFIDF_MAX_DOCUMENTS, max_terms=TFIDF_MAX_TERMS):
+        """
+        Args:
+            path (str): SQLite file the model is loaded from and saved to (None keeps it in memory).
+            max_documents (int): Documents counted before the model decays.
+            max_terms (int): Vocabulary size before the model decays.
+        """
+        self.path = path
+        self.max_documents = max_documents
+        self.max_terms = max_terms
+        self.vocabulary = {}  # term -> column
+        self.terms = []
+        self.document_frequency = []
+        self.num_documents = 0
+        self._fingerprints = {}  # Hashes of the documents already counted, oldest first
+        self._added_frequency = {}  # term -> document frequency added since the last save
+        self._added_fingerprints = []
+        self._added_documents = 0
+        self._decayed = False  # The saved model must be rewritten rather than updated
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load()
 
+    def partial_fit(self, documents):
+        """
+        Adds new documents to the vocabulary and document frequencies.
 
-def clean_keywords(keywords):
-  keywords = [word.lower() for word in keywords]
-  stop_words = set(stopwords.words('english'))
-  keywords = [word for word in keywords if word not in stop_words]
-  stemmer = PorterStemmer()
-  keywords = [stemmer.stem(word) for word in keywords]
-  return keywords
+        Args:
+            documents (list): Document strings; ones seen before are skipped.
+
+        Returns:
+            int: The number of documents added.
+        """
+        added = 0
+        with self._lock:
+            # At most max_documents at a time, so room can be made for each chunk
+            chunk_size = max(1, int(self.max_documents))
+            for start in range(0, len(documents), chunk_size):
+                added += self._add_documents(documents[start:start + chunk_size])
+        return added
+
+    def idf(self):
+        """Smoothed inverse document frequencies, one per vocabulary term."""
+        document_frequency = np.asarray(self.document_frequency, dtype=np.float64)
+        return np.log((1 + self.num_documents) / (1 + document_frequency)) + 1
+
+    def transform(self, documents):
+        """
+        Converts documents into L2-normalised TF-IDF rows (terms outside the vocabulary are ignored).
+
+        Args:
+            documents (list): Document strings.
+
+        Returns:
+            scipy.sparse.csr_matrix: Shape (len(documents), vocabulary size).
+        """
+        with self._lock:
+            vocabulary = self.vocabulary
+            idf = self.idf()
+            rows, columns = [], []
+            for row, document in enumerate(documents):
+                for term in analyze(document):
+                    column = vocabulary.get(term)
+                    if column is not None:
+                        rows.append(row)
+                        columns.append(column)
+            shape = (len(documents), len(self.terms))
+
+        # Duplicate (row, column) pairs are summed into term counts
+        matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, columns)), shape=shape)
+        matrix.sum_duplicates()
+        matrix.data *= idf[matrix.indices]
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix)
+
+    def similarity_matrix(self, documents, other_documents):
+        """
+        Cosine similarities of every document against every other document.
+
+        Args:
+            documents (list): N document strings.
+            other_documents (list): M document strings.
+
+        Returns:
+            scipy.sparse.csr_matrix: N x M similarities (pairs sharing no term are not stored).
+        """
+        left, right = self._transform_pair(documents, other_documents)
+        return sparse.csr_matrix(left @ right.T)
+
+    def top_terms(self, documents, other_documents, k=TOP_TERMS_PER_PAIR):
+        """
+        The terms contributing most to the similarity of each pair of documents.
+
+        Args:
+            documents (list): N document strings.
+            other_documents (list): M document strings.
+            k (int): Terms per pair.
+
+        Returns:
+            dict: (i, j) -> list of (term, contribution), largest first, for the pairs with a
+            non-zero similarity. The contributions of a pair sum to its cosine similarity.
+        """
+        left, right = self._transform_pair(documents, other_documents)
+        terms = self.terms
+        result = {}
+        for i in range(left.shape[0]):
+            # Element-wise products of row i with every row of `right`
+            contributions = sparse.csr_matrix(right.multiply(left[i]))
+            contributions.eliminate_zeros()
+            for j in range(contributions.shape[0]):
+                start, end = contributions.indptr[j], contributions.indptr[j + 1]
+                if start == end:
+                    continue
+                values = contributions.data[start:end]
+                columns = contributions.indices[start:end]
+                best = np.argsort(-values, kind='stable')[:k]
+                result[(i, j)] = [(terms[columns[index]], float(values[index])) for index in best]
+        return result
+
+    def _transform_pair(self, documents, other_documents):
+        # One transform, so both sides share the same vocabulary snapshot
+        matrix = self.transform(list(documents) + list(other_documents))
+        return matrix[:len(documents)], matrix[len(documents):]
+
+    def save(self):
+        """Writes the changes since the last save to the model's path (in one transaction)."""
+        if not self.path:
+            return
+        with self._lock:
+            if not (self._added_documents or self._decayed):
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, isolation_level=None)
+            try:
+                connection.executescript(SCHEMA)
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    if self._decayed:
+                        # Rare (once per TFIDF_DECAY of the corpus): replace the whole model
+                        connection.execute("DELETE FROM terms")
+                        connection.execute("DELETE FROM documents")
+                        connection.executemany("INSERT INTO terms (term, document_frequency) VALUES (?, ?)",
+                                               zip(self.terms, self.document_frequency))
+                        connection.executemany("INSERT INTO documents (fingerprint) VALUES (?)",
+                                               ((fingerprint,) for fingerprint in self._fingerprints))
+                        connection.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('num_documents', ?)",
+                                           (self.num_documents,))
+                    else:
+                        # Added to what is stored, so other processes' updates are kept
+                        connection.executemany(
+                            "INSERT INTO terms (term, document_frequency) VALUES (?, ?) ON CONFLICT (term) "
+                            "DO UPDATE SET document_frequency = document_frequency + excluded.document_frequency",
+                            self._added_frequency.items(),
+                        )
+                        connection.executemany("INSERT OR IGNORE INTO documents (fingerprint) VALUES (?)",
+                                               ((fingerprint,) for fingerprint in self._added_fingerprints))
+                        connection.execute(
+                            "INSERT INTO meta (name, value) VALUES ('num_documents', ?) ON CONFLICT (name) "
+                            "DO UPDATE SET value = value + excluded.value", (self._added_documents,),
+                        )
+                    connection.execute("COMMIT")
+                except Exception:
+                    connection.execute("ROLLBACK")
+                    raise
+            finally:
+                connection.close()
+            self._added_frequency = {}
+            self._added_fingerprints = []
+            self._added_documents = 0
+            self._decayed = False
 
+    def _add_documents(self, documents):
+        """Counts new documents, decaying the model first if they would not fit (lock held)."""
+        batch = {}  # fingerprint -> set of terms
+        for document in documents:
+            fingerprint = hashlib.sha1(document.encode('utf-8')).digest()
+            if fingerprint not in self._fingerprints and fingerprint not in batch:
+                batch[fingerprint] = set(analyze(document))
+        if not batch:
+            return 0
+
+        # Decaying after counting would halve (and maybe forget) the batch's own terms
+        batch_terms = set().union(*batch.values())
+        while (self.num_documents >= 1 or self.terms) and (
+                self.num_documents + len(batch) > self.max_documents
+                or len(self.terms) + len(batch_terms.difference(self.vocabulary)) > self.max_terms):
+            self._decay()
+
+        for fingerprint, terms in batch.items():
+            self._fingerprints[fingerprint] = None
+            self._added_fingerprints.append(fingerprint)
+            for term in terms:
+                column = self.vocabulary.get(term)
+                if column is None:
+                    column = self.vocabulary[term] = len(self.terms)
+                    self.terms.append(term)
+                    self.document_frequency.append(0)
+                self.document_frequency[column] += 1
+                self._added_frequency[term] = self._added_frequency.get(term, 0) + 1
+        self.num_documents += len(batch)
+        self._added_documents += len(batch)
+        return len(batch)
+
+    def _decay(self):
+        """Scales every count by TFIDF_DECAY, forgetting rare terms and old fingerprints."""
+        kept = [(term, frequency * TFIDF_DECAY) for term, frequency in zip(self.terms, self.document_frequency)
+                if frequency * TFIDF_DECAY >= TFIDF_MIN_DOCUMENT_FREQUENCY]
+        self.terms = [term for term, _ in kept]
+        self.document_frequency = [frequency for _, frequency in kept]
+        self.vocabulary = {term: column for column, term in enumerate(self.terms)}
+        self.num_documents *= TFIDF_DECAY
+        fingerprints = list(self._fingerprints)
+        self._fingerprints = dict.fromkeys(fingerprints[len(fingerprints) - int(len(fingerprints) * TFIDF_DECAY):])
+        self._decayed = True
+
+    def _load(self):
+        connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            rows = connection.execute("SELECT term, document_frequency FROM terms ORDER BY rowid").fetchall()
+            fingerprints = connection.execute("SELECT fingerprint FROM documents ORDER BY rowid").fetchall()
+            row = connection.execute("SELECT value FROM meta WHERE name = 'num_documents'").fetchone()
+        finally:
+            connection.close()
+        self.num_documents = row[0] if row else 0
+        self.terms = [term for term, _ in rows]
+        self.document_frequency = [frequency for _, frequency in rows]
+        self.vocabulary = {term: column for column, term in enumerate(self.terms)}
+        self._fingerprints = dict.fromkeys(fingerprint for fingerprint, in fingerprints)
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_tfidf_model():
+    """Returns the process-wide corpus TF-IDF model."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = TfidfModel()
+        return _model
+
+
+def compare_documents(documents, other_documents, k=TOP_TERMS_PER_PAIR, model=None):
+    """
+    Fits the corpus model on new documents and compares two sets of documents.
+
+    Args:
+        documents (list): N document strings (e.g. site keywords).
+        other_documents (list): M document strings (e.g. one per competitor).
+        k (int): Top contributing terms reported per pair.
+        model (TfidfModel): Overrides the process-wide model.
+
+    Returns:
+        tuple: (N x M scipy.sparse.csr_matrix of cosine similarities,
+                dict (i, j) -> [(term, contribution), ...]).
+    """
+    if model is None:
+        model = get_tfidf_model()
+    if model.partial_fit(list(documents) + list(other_documents)):
+        model.save()
+    top_terms = model.top_terms(documents, other_documents, k) if k else {}
+    return model.similarity_matrix(documents, other_documents), top_terms
+
+
+def calculate_cosine_similarity(keywords1, keywords2):
+    """
+    Calculates the cosine similarity between two sets of keywords using TF-IDF.
+
+    The IDF comes from the corpus model (every site and competitor analysed so far),
+    not from these two documents alone.
+
+    Args:
+        keywords1: A list of strings representing the keywords for the first website.
+        keywords2: A list of strings representing the keywords for the second website.
+
+    Returns:
+        The cosine similarity score (a float between 0 and 1).
+    """
+    similarity, _ = compare_documents([" ".join(keywords1)], [" ".join(keywords2)], k=0)
+    return float(similarity[0, 0])
+
+
+def clean_keywords(keywords):
+  """Lowercases, removes stop words and stems a list of keywords (see analyze)."""
+  return [term for keyword in keywords for term in analyze(keyword)]
@@ -0,0 +1,122 @@
+import logging
+import threading
+import time
+
+from sentence_transformers import SentenceTransformer
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Other models available: https://www.sbert.net/docs/pretrained_models.html
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+ENCODE_BATCH_SIZE = 32  # Texts embedded per forward pass
+WARMUP_TEXT = "warmup"
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of SentenceTransformer models.
+
+    Each model is loaded once, on first use or by `warmup`, and then shared by every
+    request thread (inference does not modify the model, so no lock is held while
+    encoding). Concurrent first requests for the same model wait for a single load.
+    """
+
+    def __init__(self, device=None):
+        """
+        Args:
+            device (str): Torch device for every model ('cpu', 'cuda', ...); None lets
+                sentence-transformers pick one.
+        """
+        self.device = device
+        self._models = {}
+        self._load_locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, name=DEFAULT_MODEL):
+        """
+        Returns a model, loading it if this process has not used it yet.
+
+        Args:
+            name (str): Model name or path.
+
+        Returns:
+            SentenceTransformer: The shared model.
+        """
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        with load_lock:
+            model = self._models.get(name)
+            if model is None:
+                started = time.monotonic()
+                model = SentenceTransformer(name, device=self.device)
+                self._models[name] = model
+                logging.info(f"Loaded embedding model {name} in {time.monotonic() - started:.1f}s")
+        return model
+
+    def warmup(self, names=(DEFAULT_MODEL,), background=False):
+        """
+        Loads models and runs one encode so the first request pays no start-up cost.
+
+        Args:
+            names (iterable): Model names to load.
+            background (bool): Warm up in a daemon thread and return immediately.
+
+        Returns:
+            threading.Thread: The warmup thread if `background` is set, else None.
+        """
+        def run():
+            for name in names:
+                try:
+                    self.get(name).encode([WARMUP_TEXT])
+                except Exception as e:
+                    logging.error(f"Error warming up embedding model {name}: {e}")
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def encode(self, texts, name=DEFAULT_MODEL, batch_size=ENCODE_BATCH_SIZE, normalize=True):
+        """
+        Embeds texts in batched forward passes.
+
+        Args:
+            texts (list): The texts to embed.
+            name (str): Model name.
+            batch_size (int): Texts per forward pass.
+            normalize (bool): L2-normalise the embeddings (dot product = cosine similarity).
+
+        Returns:
+            numpy.ndarray: float32 array of shape (len(texts), dimension).
+        """
+        return self.get(name).encode(
+            list(texts),
+            batch_size=batch_size,
+            normalize_embeddings=normalize,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+
+
+MODELS = ModelRegistry()  # One registry per process, shared by all requests
+
+
+def get_model(name=DEFAULT_MODEL):
+    """Returns the process-wide instance of a model (see ModelRegistry.get)."""
+    return MODELS.get(name)
+
+
+def warmup(names=(DEFAULT_MODEL,), background=False):
+    """Pre-loads models into the process-wide registry (see ModelRegistry.warmup)."""
+    return MODELS.warmup(names, background=background)
+
+
+def encode(texts, name=DEFAULT_MODEL, batch_size=ENCODE_BATCH_SIZE, normalize=True):
+    """Embeds texts with a process-wide model (see ModelRegistry.encode)."""
+    return MODELS.encode(texts, name=name, batch_size=batch_size, normalize=normalize)
@@ -0,0 +1,146 @@
+import numpy as np
+
+from src.similarity.embedding_cache import cached_encode
+from src.similarity.model_registry import DEFAULT_MODEL
+
+MATCHES_PER_PAGE = 3  # Nearest competitor pages returned per site page
+MAX_BLOCK_ELEMENTS = 8 * 1024 * 1024  # Similarity scores held at once during a search (32 MB of float32)
+
+
+def page_text(page):
+    """
+    Returns the text embedded for a page: its title and meta description.
+
+    Args:
+        page (dict): A spider item, or a competitor page from search_competitor_pages
+            ('Topic' and 'Meta Description' keys).
+
+    Returns:
+        str: The text, empty if the page has neither.
+    """
+    parts = [(page.get('Topic') or '').strip(), (page.get('Meta Description') or '').strip()]
+    return ". ".join(part for part in parts if part)
+
+
+class PageIndex:
+    """
+    In-process nearest-neighbour index over page embeddings.
+
+    The embeddings are kept as one L2-normalised float32 matrix, so cosine similarity is
+    a matrix product. Queries are searched in blocks of rows (at most
+    `max_block_elements` scores in memory at once) and the top k of every row is picked
+    with argpartition, which keeps exact search fast on CPU for tens of thousands of pages.
+    """
+
+    def __init__(self, vectors, ids):
+        """
+        Args:
+            vectors (numpy.ndarray): Page embeddings, shape (pages, dimension).
+            ids (list): One identifier (e.g. URL) per row.
+        """
+        self.vectors = normalize_rows(vectors)
+        self.ids = list(ids)
+
+    @classmethod
+    def from_pages(cls, pages, model_name=DEFAULT_MODEL):
+        """
+        Embeds pages (through the embedding cache) and indexes them; pages without text are skipped.
+
+        Args:
+            pages (list): Dicts with 'URL', 'Topic' and 'Meta Description' keys.
+            model_name (str): Embedding model.
+
+        Returns:
+            PageIndex: The index, its ids are the positions of the pages in `pages`.
+        """
+        texts, ids = [], []
+        for position, page in enumerate(pages):
+            text = page_text(page)
+            if text:
+                texts.append(text)
+                ids.append(position)
+        return cls(cached_encode(texts, model_name=model_name), ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, queries, k=MATCHES_PER_PAGE, max_block_elements=MAX_BLOCK_ELEMENTS):
+        """
+        Finds the k most similar indexed rows for every query vector.
+
+        Args:
+            queries (numpy.ndarray): Query embeddings, shape (queries, dimension).
+            k (int): Neighbours per query.
+            max_block_elements (int): Bound on the size of each block of scores.
+
+        Returns:
+            tuple: (scores, rows), both of shape (queries, min(k, len(self))), best first.
+                `rows` index into `self.ids`.
+        """
+        queries = normalize_rows(queries)
+        k = min(k, len(self))
+        scores = np.empty((len(queries), k), dtype=np.float32)
+        rows = np.empty((len(queries), k), dtype=np.int64)
+        if k == 0:
+            return scores, rows
+
+        block_rows = max(1, max_block_elements // len(self))
+        for start in range(0, len(queries), block_rows):
+            similarities = queries[start:start + block_rows] @ self.vectors.T
+            if k < len(self):
+                top = np.argpartition(similarities, -k, axis=1)[:, -k:]
+            else:
+                top = np.broadcast_to(np.arange(k), similarities.shape)
+            top_scores = np.take_along_axis(similarities, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+            scores[start:start + block_rows] = np.take_along_axis(top_scores, order, axis=1)
+            rows[start:start + block_rows] = np.take_along_axis(top, order, axis=1)
+        return scores, rows
+
+
+def normalize_rows(vectors):
+    """Returns the rows of a matrix scaled to unit length (zero rows stay zero), as float32."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.ascontiguousarray(vectors / np.where(norms > 0, norms, 1))
+
+
+def match_pages(site_pages, competitor_pages, k=MATCHES_PER_PAGE, model_name=DEFAULT_MODEL):
+    """
+    Finds the nearest competitor pages of every site page.
+
+    Args:
+        site_pages (list): Crawled site items ('URL', 'Topic', 'Meta Description').
+        competitor_pages (list): Competitor pages with the same keys.
+        k (int): Matches per site page.
+        model_name (str): Embedding model.
+
+    Returns:
+        list: One dict per site page with text, {'URL', 'Topic', 'Score', 'Matches'}, where
+        'Matches' lists up to k {'URL', 'Topic', 'Score'} dicts, best first. Site pages are
+        ordered by their best match, closest overlap first.
+    """
+    competitors = PageIndex.from_pages(competitor_pages, model_name)
+    site = PageIndex.from_pages(site_pages, model_name)
+    if not len(competitors) or not len(site):
+        return []
+
+    scores, rows = competitors.search(site.vectors, k)
+    matches = []
+    for position, page_scores, page_rows in zip(site.ids, scores, rows):
+        page = site_pages[position]
+        matches.append({
+            'URL': page.get('URL'),
+            'Topic': page.get('Topic'),
+            'Score': float(page_scores[0]),
+            'Matches': [
+                {
+                    'URL': competitor_pages[competitors.ids[row]].get('URL'),
+                    'Topic': competitor_pages[competitors.ids[row]].get('Topic'),
+                    'Score': float(score),
+                }
+                for score, row in zip(page_scores, page_rows)
+            ],
+        })
+    matches.sort(key=lambda match: match['Score'], reverse=True)
+    return matches
@@ -0,0 +1,284 @@
+# crawl_worker.py
+import atexit
+import collections
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import uuid
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "2"))  # Long-lived Scrapy worker processes
+MAX_JOBS_PER_WORKER = int(os.getenv("CRAWL_JOBS_PER_WORKER", "4"))  # Crawls one worker runs at the same time
+CRAWL_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
+RESULT_POLL_SECONDS = 1.0
+MAX_JOB_ATTEMPTS = 2  # Runs of a job before a worker crash fails it (the job itself may crash the worker)
+
+
+class CrawlWorkerPool:
+    """
+    Pool of worker processes that each keep a Twisted reactor running.
+
+    A Twisted reactor cannot be restarted, so running `CrawlerProcess` inside the web
+    process only works once. Every worker instead starts its reactor a single time and
+    runs incoming crawl jobs on it with a `CrawlerRunner`, several at once. The pool hands
+    each job to the worker running the fewest (jobs wait while every worker is full), and
+    the items of each finished crawl are sent back to the web process, where they resolve
+    the `Future` returned by `submit`. Every job gets its own ItemCollector, so concurrent
+    crawls never share an output file.
+
+    A spawned process imports the parent's `__main__` module again before running its
+    target, which for the web process is app.py with torch, sentence-transformers and
+    LangChain behind it. Workers are therefore started with this module standing in as
+    `__main__` (see _worker_entry_module), so they import only what a crawl needs.
+
+    Every worker has its own job queue, so the pool always knows which jobs a worker holds
+    and a crashed worker cannot leave a shared queue locked. Worker liveness is checked
+    after every message and poll: the jobs of a dead worker run again (up to
+    MAX_JOB_ATTEMPTS times) and the worker is replaced.
+    """
+
+    def __init__(self, num_workers=CRAWL_WORKERS, max_jobs_per_worker=MAX_JOBS_PER_WORKER):
+        # 'spawn' keeps the Flask process's threads and any imported reactor out of the workers
+        self._context = multiprocessing.get_context('spawn')
+        self._results = self._context.Queue()
+        self._max_jobs_per_worker = max(1, max_jobs_per_worker)
+        self._job_ids = itertools.count()
+        self._futures = {}  # job id -> Future
+        self._job_specs = {}  # job id -> (stream dir, spider kwargs, attempt)
+        self._waiting = collections.deque()  # job ids not handed to a worker yet
+        self._lock = threading.Lock()
+        self._closed = False
+
+        num_workers = max(1, num_workers)
+        self._job_queues = [None] * num_workers
+        self._running = [set() for _ in range(num_workers)]  # worker index -> ids of its jobs
+        self._processes = [self._start_worker(index) for index in range(num_workers)]
+        self._collector = threading.Thread(target=self._collect_results, name="crawl-results", daemon=True)
+        self._collector.start()
+
+    def _start_worker(self, index):
+        # A fresh queue: a worker killed while reading its queue leaves it locked
+        self._job_queues[index] = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(self._job_queues[index], self._results),
+            name=f"crawl-worker-{index}",
+            daemon=True,
+        )
+        with _worker_entry_module():
+            process.start()
+        logging.info(f"Started crawl worker {index} (pid {process.pid})")
+        return process
+
+    def submit(self, stream_dir=None, **spider_kwargs):
+        """
+        Queues a TopicSpider crawl.
+
+        Args:
+            stream_dir (str): If given, items are streamed to a job-specific CSV file in this
+                directory instead of being sent back in memory.
+            **spider_kwargs: Keyword arguments passed to TopicSpider (e.g. records).
+
+        Returns:
+            Future: Resolves to {'items': [dicts]} or, for streamed jobs, {'path': ..., 'count': ...}.
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Crawl worker pool is shut down.")
+            job_id = next(self._job_ids)
+            self._futures[job_id] = future
+            self._job_specs[job_id] = (stream_dir, spider_kwargs, 1)
+            self._waiting.append(job_id)
+            self._dispatch()
+        return future
+
+    def _dispatch(self):
+        """Hands waiting jobs to the least busy workers that have a free slot (lock held)."""
+        while self._waiting:
+            index = min(range(len(self._running)), key=lambda worker: len(self._running[worker]))
+            if len(self._running[index]) >= self._max_jobs_per_worker:
+                return
+            job_id = self._waiting.popleft()
+            stream_dir, spider_kwargs, _ = self._job_specs[job_id]
+            self._running[index].add(job_id)
+            self._job_queues[index].put((job_id, stream_dir, spider_kwargs))
+
+    def _collect_results(self):
+        """Resolves futures from worker messages and replaces workers that died."""
+        while True:
+            try:
+                message = self._results.get(timeout=RESULT_POLL_SECONDS)
+            except queue.Empty:
+                message = ()
+            except (EOFError, OSError):  # Queue closed during interpreter shutdown
+                return
+            if message is None:  # Shutdown sentinel
+                return
+            if message:
+                self._finish(*message)
+            self._check_workers()
+
+    def _finish(self, job_id, result, error):
+        with self._lock:
+            future = self._futures.pop(job_id, None)
+            self._job_specs.pop(job_id, None)
+            for running in self._running:
+                running.discard(job_id)
+            if not self._closed:
+                self._dispatch()
+        if future is None:
+            return
+        if error:
+            future.set_exception(RuntimeError(f"Crawl job {job_id} failed: {error}"))
+        else:
+            future.set_result(result)
+
+    def _check_workers(self):
+        """Runs the jobs of crashed workers again (or fails them after MAX_JOB_ATTEMPTS) and starts replacements."""
+        failed = []
+        with self._lock:
+            if self._closed:
+                return
+            for index, process in enumerate(self._processes):
+                if process.is_alive():
+                    continue
+                logging.error(f"Crawl worker {index} exited with code {process.exitcode}, restarting it")
+                for job_id in sorted(self._running[index], reverse=True):
+                    stream_dir, spider_kwargs, attempt = self._job_specs[job_id]
+                    if attempt < MAX_JOB_ATTEMPTS:
+                        logging.warning(f"Requeueing crawl job {job_id} (attempt {attempt + 1})")
+                        self._job_specs[job_id] = (stream_dir, spider_kwargs, attempt + 1)
+                        self._waiting.appendleft(job_id)
+                        continue
+                    del self._job_specs[job_id]
+                    failed.append((self._futures.pop(job_id), RuntimeError(
+                        f"Crawl worker {index} died while running job {job_id} ({attempt} attempts)")))
+                self._running[index] = set()
+                self._processes[index] = self._start_worker(index)
+            self._dispatch()
+        # Outside the lock: callbacks may submit new jobs
+        for future, error in failed:
+            future.set_exception(error)
+
+    def shutdown(self, timeout=10):
+        """
+        Stops the workers after their running crawls finish (or after `timeout` seconds).
+
+        Jobs not handed to a worker yet are cancelled.
+
+        Args:
+            timeout (float): Seconds to wait for each worker before terminating it.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            cancelled = [self._futures.pop(job_id) for job_id in self._waiting]
+            self._waiting.clear()
+        for future in cancelled:
+            future.cancel()
+        for jobs in self._job_queues:
+            jobs.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+        self._collector.join(timeout)
+
+
+_main_module_lock = threading.Lock()
+
+
+@contextmanager
+def _worker_entry_module():
+    """Makes processes spawned inside the block import this module, not the parent's script, as `__main__`."""
+    with _main_module_lock:
+        main_module = sys.modules['__main__']
+        sys.modules['__main__'] = sys.modules[__name__]
+        try:
+            yield
+        finally:
+            sys.modules['__main__'] = main_module
+
+
+def _worker_main(jobs, results):
+    """
+    Entry point of a worker process: installs the reactor once and runs crawl jobs on it forever.
+
+    Args:
+        jobs (Queue): This worker's (job id, stream dir, spider kwargs) tuples, or None to
+            shut down. The pool never hands it more jobs than it may run at once.
+        results (Queue): (job id, result, error) messages back to the web process.
+    """
+    # The reactor must be installed before anything imports twisted.internet.reactor
+    from scrapy.utils.reactor import install_reactor
+    install_reactor(CRAWL_REACTOR)
+
+    from twisted.internet import reactor
+    from twisted.python.failure import Failure
+    from scrapy.crawler import CrawlerRunner
+    from scrapy.utils.log import configure_logging
+    from src.spiders.pipelines import ItemCollector
+    from src.spiders.scrapy_spider import TopicSpider, feed_fields
+
+    configure_logging(install_root_handler=False)
+    runner = CrawlerRunner({'TWISTED_REACTOR': CRAWL_REACTOR})
+
+    def start_job(job_id, stream_dir, spider_kwargs):
+        stream_path = None
+        if stream_dir:
+            os.makedirs(stream_dir, exist_ok=True)
+            stream_path = os.path.join(stream_dir, f"crawl_{uuid.uuid4().hex}.csv")
+        collector = ItemCollector(feed_fields(spider_kwargs.get('meta_fields')), stream_path=stream_path)
+
+        def finished(outcome):
+            collector.close()
+            error = outcome.getErrorMessage() if isinstance(outcome, Failure) else None
+            results.put((job_id, collector.result(), error))
+
+        try:
+            runner.crawl(TopicSpider, item_collector=collector, **spider_kwargs).addBoth(finished)
+        except Exception as e:  # Spider construction errors are raised synchronously
+            finished(Failure(e))
+
+    def stop():
+        runner.join().addBoth(lambda _: reactor.stop())
+
+    def feed_jobs():
+        while True:
+            job = jobs.get()
+            if job is None:
+                reactor.callFromThread(stop)
+                return
+            reactor.callFromThread(start_job, *job)
+
+    threading.Thread(target=feed_jobs, name="crawl-jobs", daemon=True).start()
+    reactor.run(installSignalHandlers=False)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_crawl_pool():
+    """
+    Returns the process-wide crawl worker pool, starting it on first use.
+
+    Returns:
+        CrawlWorkerPool: The shared pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = CrawlWorkerPool()
+            atexit.register(_pool.shutdown)
+        return _pool
@@ -0,0 +1,159 @@
+# meta_extractor.py
+import html
+import re
+
+# Field name -> (kind, key). Kinds: 'title', 'meta' (name="..."), 'property' (property="...",
+# used by Open Graph), 'link' (rel="..." -> href) and 'hreflang' (all rel="alternate" links).
+DEFAULT_META_FIELDS = {
+    'Topic': ('title', None),
+    'Meta Description': ('meta', 'description'),
+    'Meta Keywords': ('meta', 'keywords'),
+    'Meta Robots': ('meta', 'robots'),
+    'Meta Author': ('meta', 'author'),
+}
+
+OPTIONAL_META_FIELDS = {
+    'OG Title': ('property', 'og:title'),
+    'OG Description': ('property', 'og:description'),
+    'OG Type': ('property', 'og:type'),
+    'OG Image': ('property', 'og:image'),
+    'OG Site Name': ('property', 'og:site_name'),
+    'Canonical': ('link', 'canonical'),
+    'Hreflang': ('hreflang', None),
+}
+
+META_FIELD_SPECS = {**DEFAULT_META_FIELDS, **OPTIONAL_META_FIELDS}
+
+# End of the document head, on raw bytes
+HEAD_END_PATTERN = re.compile(rb"</head\s*>|<body[\s>]", re.IGNORECASE)
+
+# One alternation for everything the scanner cares about; comments and scripts are matched
+# (and skipped) so tags inside them are never picked up.
+TAG_PATTERN = re.compile(
+    r"<!--.*?-->"
+    r"|<(?:script|style|noscript)\b.*?</(?:script|style|noscript)\s*>"
+    r"|<title\b[^>]*>(?P<title>.*?)</title\s*>"
+    r"|<(?P<tag>meta|link)\b(?P<attrs>[^>]*)>"
+    r"|(?P<end></head\s*>|<body\b)",
+    re.IGNORECASE | re.DOTALL,
+)
+ATTR_PATTERN = re.compile(r"""([^\s=/>"']+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>"']+)))?""")
+
+
+class MetaExtractor:
+    """
+    Single-pass extractor for <title>, <meta> and <link> fields in the document head.
+
+    Instead of one XPath query (and DOM walk) per field, the head is scanned once with a
+    precompiled pattern and every requested field is filled from the tags as they pass.
+    The first occurrence of each field wins, as with `xpath(...).get()`.
+    """
+
+    def __init__(self, fields=None):
+        """
+        Args:
+            fields (dict or list): Field specs (see DEFAULT_META_FIELDS), or a list of field
+                names from META_FIELD_SPECS. Defaults to DEFAULT_META_FIELDS.
+        """
+        if fields is None:
+            fields = DEFAULT_META_FIELDS
+        elif not isinstance(fields, dict):
+            fields = {name: META_FIELD_SPECS[name] for name in fields}
+
+        self.field_names = list(fields)
+        self._title_field = None
+        self._hreflang_field = None
+        self._by_name = {}
+        self._by_property = {}
+        self._by_rel = {}
+        for field, (kind, key) in fields.items():
+            if kind == 'title':
+                self._title_field = field
+            elif kind == 'meta':
+                self._by_name[key.lower()] = field
+            elif kind == 'property':
+                self._by_property[key.lower()] = field
+            elif kind == 'link':
+                self._by_rel[key.lower()] = field
+            elif kind == 'hreflang':
+                self._hreflang_field = field
+            else:
+                raise ValueError(f"Unknown meta field kind: {kind}")
+
+    def extract(self, document):
+        """
+        Extracts the configured fields from an HTML document (or just its head).
+
+        Args:
+            document (str): The HTML text.
+
+        Returns:
+            dict: Field name -> value (None for missing fields). Hreflang alternates are
+                  returned as 'lang=url' pairs separated by spaces.
+        """
+        values = dict.fromkeys(self.field_names)
+        alternates = []
+
+        for match in TAG_PATTERN.finditer(document):
+            if match.group('end'):
+                break
+
+            title = match.group('title')
+            if title is not None:
+                if self._title_field and values[self._title_field] is None:
+                    values[self._title_field] = html.unescape(title)
+                continue
+
+            tag = match.group('tag')
+            if tag is None:
+                continue  # comment / script / style
+            attrs = _parse_attributes(match.group('attrs'))
+
+            if tag.lower() == 'meta':
+                field = None
+                if 'name' in attrs:
+                    field = self._by_name.get(attrs['name'].lower())
+                if field is None and 'property' in attrs:
+                    field = self._by_property.get(attrs['property'].lower())
+                if field and values[field] is None and 'content' in attrs:
+                    values[field] = attrs['content']
+                continue
+
+            rel = attrs.get('rel', '').lower()
+            href = attrs.get('href')
+            if href is None:
+                continue
+            if self._hreflang_field and rel == 'alternate' and 'hreflang' in attrs:
+                alternates.append(f"{attrs['hreflang']}={href}")
+            field = self._by_rel.get(rel)
+            if field and values[field] is None:
+                values[field] = href
+
+        if self._hreflang_field and alternates:
+            values[self._hreflang_field] = " ".join(alternates)
+        return values
+
+    def extract_from_response(self, response):
+        """
+        Extracts the configured fields from a Scrapy response, decoding only the head.
+
+        Args:
+            response (scrapy.http.Response): A (possibly truncated) HTML response.
+
+        Returns:
+            dict: Field name -> value.
+        """
+        body = response.body
+        end = HEAD_END_PATTERN.search(body)
+        head = body[:end.end()] if end else body
+        return self.extract(head.decode(response.encoding, errors='replace'))
+
+
+def _parse_attributes(attr_text):
+    """Parses the attribute string of a tag into a dict with lowercase names and unescaped values."""
+    attrs = {}
+    for name, double_quoted, single_quoted, unquoted in ATTR_PATTERN.findall(attr_text):
+        name = name.lower()
+        if name not in attrs:
+            attrs[name] = html.unescape(double_quoted or single_quoted or unquoted)
+    return attrs
@@ -0,0 +1,47 @@
+# middlewares.py
+import time
+
+from twisted.internet import reactor
+from twisted.internet.task import deferLater
+from scrapy.utils.defer import maybe_deferred_to_future
+
+from src.utils.politeness import POLITENESS
+
+
+class PolitenessMiddleware:
+    """
+    Downloader middleware that paces requests with the process-wide PolitenessScheduler.
+
+    Each request reserves a slot for its host and is delayed (without blocking the
+    reactor) until the slot is due; every response and download error is fed back so
+    the host's rate adapts to throttling (429/503, Retry-After), errors and latency.
+    Placed close to the downloader so it also sees the responses RetryMiddleware retries.
+    """
+
+    def __init__(self, scheduler=POLITENESS):
+        self.scheduler = scheduler
+
+    async def process_request(self, request, spider):
+        delay = self.scheduler.reserve(request.url)
+        if delay > 0:
+            await maybe_deferred_to_future(deferLater(reactor, delay, lambda: None))
+        request.meta['politeness_sent_at'] = time.monotonic()
+        return None
+
+    def process_response(self, request, response, spider):
+        self.scheduler.record(
+            request.url,
+            status=response.status,
+            latency=self._latency(request),
+            retry_after=response.headers.get('Retry-After'),
+        )
+        return response
+
+    def process_exception(self, request, exception, spider):
+        self.scheduler.record(request.url, latency=self._latency(request), error=True)
+        return None
+
+    @staticmethod
+    def _latency(request):
+        sent_at = request.meta.get('politeness_sent_at')
+        return time.monotonic() - sent_at if sent_at is not None else None
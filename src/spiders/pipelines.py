@@ -0,0 +1,83 @@
+# pipelines.py
+import csv
+import logging
+
+from src.utils.records import PageRecord
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+CSV_ENCODING = 'utf-8'
+
+
+class ItemCollector:
+    """
+    Per-job item sink handed to a spider as its `item_collector` argument.
+
+    By default items are kept in memory as PageRecords and returned to the caller.
+    With `stream_path` set they are written to that (job-specific) CSV file as they
+    arrive instead, so very large crawls never hold every item in memory.
+    """
+
+    def __init__(self, fieldnames, stream_path=None):
+        self.fieldnames = fieldnames
+        self.stream_path = stream_path
+        self.items = []
+        self.count = 0
+        self._file = None
+        self._writer = None
+        self._closed = False
+
+    def add(self, item):
+        self.count += 1
+        if self.stream_path is None:
+            self.items.append(PageRecord.from_dict(item))
+            return
+
+        if self._writer is None:
+            self._open_stream()
+        self._writer.writerow(dict(item))
+
+    def _open_stream(self):
+        self._file = open(self.stream_path, 'w', encoding=CSV_ENCODING, newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore')
+        self._writer.writeheader()
+
+    def close(self):
+        """Closes the stream file, creating it with just a header if nothing was scraped. Idempotent."""
+        if self._closed:
+            return
+        self._closed = True
+        if self.stream_path is None:
+            return
+        if self._writer is None:
+            self._open_stream()
+        self._file.close()
+        logging.info(f"Streamed {self.count} items to {self.stream_path}")
+
+    def result(self):
+        """
+        Returns the outcome of the job in a picklable form.
+
+        Returns:
+            dict: {'items': [...]} for in-memory jobs, {'path': ..., 'count': ...} for streamed jobs.
+        """
+        if self.stream_path is None:
+            return {'items': self.items}
+        return {'path': self.stream_path, 'count': self.count}
+
+
+class ItemCollectorPipeline:
+    """
+    Item pipeline that hands every scraped item to the spider's ItemCollector.
+    """
+
+    def process_item(self, item, spider):
+        collector = getattr(spider, 'item_collector', None)
+        if collector is not None:
+            collector.add(item)
+        return item
+
+    def close_spider(self, spider):
+        collector = getattr(spider, 'item_collector', None)
+        if collector is not None:
+            collector.close()
@@ -1,84 +1,282 @@
 # scrapy_spider.py
 import scrapy
+from scrapy import signals
+from scrapy.exceptions import StopDownload
+from scrapy.settings import Settings
 from io import StringIO
 import csv
 import logging
-from scrapy.crawler import CrawlerProcess
-from twisted.internet import reactor  # Import reactor
-import re
-import os
+
+from src.spiders.crawl_worker import get_crawl_pool
+from src.spiders.meta_extractor import MetaExtractor, HEAD_END_PATTERN
+from src.utils.politeness import POLITENESS
+from src.utils.records import read_url_records
+from src.utils.robots import get_robots
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-SCRAPY_OUTPUT_FILENAME = "output_scrapy.csv"
 CSV_ENCODING = 'utf-8'
+FEED_FIELDS = ['Parent Sitemap', 'URL', 'Topic', 'Meta Description', 'Meta Keywords', 'Meta Robots', 'Meta Author']
+VALIDATOR_FIELDS = ['ETag', 'Last-Modified']  # Response validators added to every item (kept in the crawl state)
+CRAWL_TIMEOUT_SECONDS = 3600  # Upper bound on one crawl job in the worker pool
+CRAWL_USER_AGENT = Settings().get('USER_AGENT')  # User agent of the spider, matched against robots.txt
+
+# Head-only mode: every field the spider extracts lives in <head>, so the download is
+# cut off as soon as the head is complete (or after HEAD_MAX_BYTES, whichever comes first).
+HEAD_ONLY = True
+HEAD_MAX_BYTES = 256 * 1024
+HEAD_END_OVERLAP = 16  # Bytes kept between chunks so a tag split across two chunks is still found
 
 class TopicSpider(scrapy.Spider):
     name = "topic_spider"
+    download_delay = 0  # Pacing is done per host by PolitenessMiddleware
     custom_settings = {
-        'FEED_FORMAT': 'csv',
-        'FEED_URI': SCRAPY_OUTPUT_FILENAME,
-        'FEED_EXPORT_ENCODING': CSV_ENCODING, # Ensure correct encoding
-        'FEED_FIELDS': ['Parent Sitemap', 'URL', 'Topic', 'Meta Description', 'Meta Keywords', 'Meta Robots', 'Meta Author'], #Define the order
-        'overwrite': True,
+        # Items go to the job's ItemCollector (see pipelines.py), never to a shared feed file
+        'ITEM_PIPELINES': {'src.spiders.pipelines.ItemCollectorPipeline': 300},
+        'DOWNLOADER_MIDDLEWARES': {'src.spiders.middlewares.PolitenessMiddleware': 950},
     }
 
-    def __init__(self, csv_data=None, *args, **kwargs):  # takes csv DATA as an argument not FILE
+    def __init__(self, csv_data=None, head_only=HEAD_ONLY, head_max_bytes=HEAD_MAX_BYTES, meta_fields=None,
+                 validators=None, records=None, crawl_delays=None, *args, **kwargs):  # takes csv DATA as an argument not FILE
         super(TopicSpider, self).__init__(*args, **kwargs)
-        if csv_data is None:
-            raise ValueError("Please provide CSV data to the spider.")
-        self.csv_data = csv_data
+        # records: SitemapUrl records (in-process callers); csv_data: the same as CSV (command line)
+        if records is None:
+            if csv_data is None:
+                raise ValueError("Please provide CSV data to the spider.")
+            records = read_url_records(csv_data)
+        self.head_only = head_only
+        self.head_max_bytes = int(head_max_bytes)
+        # meta_fields: field names from META_FIELD_SPECS (e.g. 'OG Title', 'Canonical', 'Hreflang')
+        self.meta_extractor = MetaExtractor(meta_fields)
+        # URL -> {'etag', 'last_modified', 'item'} from the crawl state: those pages are
+        # requested conditionally and the stored item is reused on a 304
+        self.validators = validators or {}
+        # Host -> robots.txt Crawl-delay when the caller already dropped disallowed URLs
+        # (see check_robots); None makes start_requests read robots.txt itself
+        self.crawl_delays = crawl_delays
         self.start_urls = []
-        self.url_topic_mapping = {}
-
-        # Using StringIO again
-        csvfile = StringIO(self.csv_data)
-        reader = csv.DictReader(csvfile)
-        self.fieldnames = reader.fieldnames  # Store fieldnames
-        for row in reader:
-            url = row.get('URL')
-            if url:
-                self.start_urls.append(url)
-                self.url_topic_mapping[url] = row
+        self.url_parent_sitemaps = {}  # URL -> parent sitemap
+
+        for record in records:
+            if record.url:
+                self.start_urls.append(record.url)
+                self.url_parent_sitemaps[record.url] = record.parent_sitemap or ''
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super(TopicSpider, cls).from_crawler(crawler, *args, **kwargs)
+        if spider.head_only:
+            crawler.signals.connect(spider.stop_after_head, signal=signals.bytes_received)
+        return spider
+
+    def stop_after_head(self, data, request, spider):
+        """
+        bytes_received handler for head-only mode. Stops the download once `</head>`
+        (or `<body>`) has arrived, or once HEAD_MAX_BYTES have been read. The partial
+        response is still passed to `parse`.
+        """
+        received = request.meta.get('head_bytes', 0) + len(data)
+        window = request.meta.get('head_tail', b'') + data
+        if received >= self.head_max_bytes or HEAD_END_PATTERN.search(window):
+            raise StopDownload(fail=False)
+        request.meta['head_bytes'] = received
+        request.meta['head_tail'] = window[-HEAD_END_OVERLAP:]
+
+    def start_requests(self):
+        """
+        Issues requests only for URLs that robots.txt allows, and caps each host's
+        request rate at its Crawl-delay (see PolitenessMiddleware).
+
+        Jobs from the crawl worker pool arrive with robots.txt already applied (reading it
+        here would block the reactor that every job of the worker shares); only the
+        command-line spider fetches it itself.
+        """
+        if self.crawl_delays is not None:
+            allowed_urls = self.start_urls
+            crawl_delays = self.crawl_delays
+        else:
+            allowed_records, crawl_delays = check_robots(
+                [(self.url_parent_sitemaps[url], url) for url in self.start_urls], self.settings.get('USER_AGENT')
+            )
+            allowed_urls = [url for _, url in allowed_records]
+        for base_url, crawl_delay in crawl_delays.items():
+            POLITENESS.set_crawl_delay(base_url, crawl_delay)
+
+        # Compressed bodies cannot be scanned for </head> while they stream in
+        base_headers = {'Accept-Encoding': 'identity'} if self.head_only else {}
+        for url in allowed_urls:
+            headers = dict(base_headers)
+            meta = {}
+            validator = self.validators.get(url)
+            if validator:
+                if validator.get('etag'):
+                    headers['If-None-Match'] = validator['etag']
+                if validator.get('last_modified'):
+                    headers['If-Modified-Since'] = validator['last_modified']
+                meta['handle_httpstatus_list'] = [304]
+                meta['stored_item'] = validator['item']
+            yield scrapy.Request(url, headers=headers or None, meta=meta, dont_filter=True)
 
     def parse(self, response):
         url = response.url
-        meta_description = response.xpath('//meta[@name="description"]/@content').get()
-        meta_keywords = response.xpath('//meta[@name="keywords"]/@content').get()
-        meta_robots = response.xpath('//meta[@name="robots"]/@content').get()
-        meta_author = response.xpath('//meta[@name="author"]/@content').get()
-        topic = response.xpath('//title/text()').get()
 
-        # Get the corresponding row from the CSV data
-        row = self.url_topic_mapping.get(url, {})
+        # Get the sitemap that listed the URL
+        parent_sitemap = self.url_parent_sitemaps.get(url, '')
+
+        if response.status == 304:  # Unchanged since the last crawl, reuse the stored item
+            item = dict(response.meta['stored_item'])
+            item['Parent Sitemap'] = parent_sitemap
+            yield item
+            return
+
+        # One scan of the head fills every requested field
+        fields = self.meta_extractor.extract_from_response(response)
 
-        yield {
-            'Parent Sitemap': row.get('Parent Sitemap', ''), # Get parent sitemap
+        item = {
+            'Parent Sitemap': parent_sitemap,
             'URL': url,
-            'Topic': topic,
-            'Meta Description': meta_description,
-            'Meta Keywords': meta_keywords,
-            'Meta Robots': meta_robots,
-            'Meta Author': meta_author
         }
-        
-def run_scrapy_spider(csv_data):
-    """Runs the Scrapy spider and returns the final CSV data."""
-    process = CrawlerProcess()
+        item.update(fields)
+        for field in VALIDATOR_FIELDS:
+            value = response.headers.get(field)
+            item[field] = value.decode('latin-1') if value else None
+        yield item
+
+
+def check_robots(records, user_agent=CRAWL_USER_AGENT):
+    """
+    Applies robots.txt to the crawl input.
+
+    Blocking (robots.txt is downloaded on first use of a host), so it runs before a crawl
+    is handed to the worker pool, never on a reactor thread.
+
+    Args:
+        records (list): SitemapUrl records (or (parent_sitemap, URL) tuples).
+        user_agent (str): User agent the rules are matched for.
+
+    Returns:
+        tuple: (records robots.txt allows, dict base URL -> Crawl-delay in seconds or None)
+    """
+    allowed_records = []
+    crawl_delays = {}
+    for record in records:
+        url = record[1]
+        robots = get_robots(url)  # Parsed once per host
+        if not robots.can_fetch(url, user_agent):
+            logging.info(f"Skipping URL disallowed by robots.txt: {url}")
+            continue
+        if robots.base_url not in crawl_delays:
+            crawl_delays[robots.base_url] = robots.crawl_delay(user_agent)
+        allowed_records.append(record)
+    return allowed_records, crawl_delays
+
+
+def feed_fields(meta_fields=None):
+    """
+    Returns the item columns produced for a set of meta fields.
+
+    Args:
+        meta_fields (list): Field names passed to TopicSpider, or None for the defaults.
+
+    Returns:
+        list: Column names, in item order.
+    """
+    if meta_fields is None:
+        return FEED_FIELDS
+    return ['Parent Sitemap', 'URL'] + MetaExtractor(meta_fields).field_names
 
-    # Remove any existing file first
-    if os.path.exists(SCRAPY_OUTPUT_FILENAME):
-       os.remove(SCRAPY_OUTPUT_FILENAME)
 
-    process.crawl(TopicSpider, csv_data=csv_data)
-    process.start()  # the script will block here until the crawling is finished
+def run_scrapy_spider(csv_data=None, records=None):
+    """
+    Runs the Scrapy spider in the crawl worker pool and returns the scraped items.
 
-    # Read the data from the file
+    The crawl runs in a long-lived worker process (see crawl_worker.py), so the web
+    process never starts a reactor and can run any number of analyses, concurrently
+    or one after another. Items come back in memory; nothing is written to disk.
+
+    Args:
+        csv_data (str): CSV data with 'Parent Sitemap' and 'URL' columns.
+        records (list): The crawl input as SitemapUrl records (instead of csv_data).
+
+    Returns:
+        list: One PageRecord per crawled page (keys as in FEED_FIELDS), or None on error.
+    """
+    if records is None:
+        records = read_url_records(csv_data)
+    result = _run_crawl_job(records=records)
+    return result['items'] if result else None
+
+
+def run_incremental_crawl(records, crawl_state, sitemap_metadata=None):
+    """
+    Crawls only the pages that are new or changed since the last analysis of the site.
+
+    The crawl state decides which URLs to fetch (see CrawlState.plan); every other page is
+    served from the items stored by earlier crawls, and pages that are only due for
+    revalidation are requested with If-None-Match / If-Modified-Since.
+
+    Args:
+        records (list): The crawl input (SitemapUrl records).
+        crawl_state (CrawlState): The site's crawl state store.
+        sitemap_metadata (dict): URL -> SitemapUrl with the sitemap's lastmod/changefreq/priority.
+            Defaults to the records themselves.
+
+    Returns:
+        list: One PageRecord per page (reused and freshly crawled), or None on error.
+    """
+    if sitemap_metadata is None:
+        sitemap_metadata = {record.url: record for record in records}
+    plan = crawl_state.plan(records, sitemap_metadata)
+    if not plan.fetch_rows:
+        return plan.reused_items
+
+    result = _run_crawl_job(records=plan.fetch_rows, validators=plan.validators)
+    if not result:
+        return None
+    crawl_state.record(result['items'], sitemap_metadata)
+    return plan.reused_items + result['items']
+
+
+def run_scrapy_spider_to_file(csv_data, output_dir):
+    """
+    Runs the Scrapy spider and streams its items to a job-specific CSV file.
+
+    Meant for very large crawls whose items should not be held in memory.
+
+    Args:
+        csv_data (str): CSV data with 'Parent Sitemap' and 'URL' columns.
+        output_dir (str): Directory for the output file (a unique name is generated per job).
+
+    Returns:
+        str: Path of the CSV file, or None on error.
+    """
+    result = _run_crawl_job(records=read_url_records(csv_data), stream_dir=output_dir)
+    return result['path'] if result else None
+
+
+def _run_crawl_job(records, **job_kwargs):
     try:
-        with open(SCRAPY_OUTPUT_FILENAME, 'r', encoding=CSV_ENCODING) as f:
-            final_csv_data = f.read()
+        records, crawl_delays = check_robots(records)
+        future = get_crawl_pool().submit(records=records, crawl_delays=crawl_delays, **job_kwargs)
+        return future.result(timeout=CRAWL_TIMEOUT_SECONDS)  # blocks until this crawl is finished
     except Exception as e:
-        logging.error(f"Error reading Scrapy output file: {e}")
+        logging.error(f"Error running Scrapy spider: {e}")
         return None
 
-    return final_csv_data
\ No newline at end of file
+
+def items_to_csv(items, fieldnames=FEED_FIELDS):
+    """
+    Serializes scraped items to CSV data (for export only).
+
+    Args:
+        items (list): PageRecords or dicts with the FEED_FIELDS keys.
+        fieldnames (list): Columns to write (see feed_fields()).
+
+    Returns:
+        str: CSV data with a header row.
+    """
+    output = StringIO()
+    writer = csv.DictWriter(output, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(items)
+    return output.getvalue()
@@ -0,0 +1,269 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from src.utils.records import PageRecord
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+CRAWL_STATE_DIR = "crawl_state"  # One SQLite database per site
+RECRAWL_MAX_AGE_SECONDS = 7 * 24 * 3600  # Pages without lastmod/changefreq are revalidated after this long
+
+# Sitemap <changefreq> -> seconds after which a page without <lastmod> is refetched
+CHANGEFREQ_SECONDS = {
+    "always": 0,
+    "hourly": 3600,
+    "daily": 24 * 3600,
+    "weekly": 7 * 24 * 3600,
+    "monthly": 30 * 24 * 3600,
+    "yearly": 365 * 24 * 3600,
+    "never": None,  # Archived pages are only fetched once
+}
+
+# Result of CrawlState.plan: rows to crawl, stored items to reuse and the validators the
+# spider sends with its conditional requests (URL -> {'etag', 'last_modified', 'item'}).
+CrawlPlan = namedtuple('CrawlPlan', ['fetch_rows', 'reused_items', 'validators'])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    parent_sitemap TEXT,
+    lastmod TEXT,
+    changefreq TEXT,
+    priority TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL,
+    item TEXT
+)
+"""
+
+
+class CrawlState:
+    """
+    Per-site record of what was crawled: for every URL the time it was last fetched,
+    the sitemap lastmod/changefreq/priority seen at that time, the response validators
+    (ETag, Last-Modified) and the extracted item.
+
+    `plan` splits the URLs of a new analysis into pages that must be crawled (new,
+    changed according to the sitemap, or due for revalidation) and pages whose stored
+    item can be reused as is; `record` stores the results of the crawl.
+    """
+
+    def __init__(self, path, max_age=RECRAWL_MAX_AGE_SECONDS):
+        """
+        Args:
+            path (str): Path of the SQLite database (created if missing).
+            max_age (float): Seconds after which a page with no sitemap hints is revalidated.
+        """
+        self.path = path
+        self.max_age = max_age
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by the request threads, serialized by the lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(SCHEMA)
+
+    def get(self, url):
+        """
+        Returns the stored state of a URL.
+
+        Args:
+            url (str): The page URL.
+
+        Returns:
+            dict: The stored columns (with 'item' decoded), or None if the URL was never crawled.
+        """
+        with self._lock:
+            cursor = self._connection.execute("SELECT * FROM pages WHERE url = ?", (url,))
+            row = cursor.fetchone()
+            columns = [column[0] for column in cursor.description]
+        if row is None:
+            return None
+        state = dict(zip(columns, row))
+        state['item'] = json.loads(state['item']) if state['item'] else None
+        return state
+
+    def plan(self, rows, sitemap_metadata=None, now=None):
+        """
+        Decides which URLs need to be crawled.
+
+        A URL is crawled when it was never crawled successfully, when its sitemap <lastmod>
+        changed (or is newer than the last fetch), or when the last fetch is older than its
+        <changefreq> (or `max_age` if the sitemap gives no hint). Pages that are revalidated
+        only because of their age are requested conditionally, so unchanged pages cost a 304.
+
+        Args:
+            rows (list): SitemapUrl records (the crawl input).
+            sitemap_metadata (dict): URL -> SitemapUrl with the current lastmod/changefreq/priority.
+            now (float): Current time (defaults to time.time()).
+
+        Returns:
+            CrawlPlan: Rows to crawl, items reused from the store and conditional request validators.
+        """
+        now = time.time() if now is None else now
+        sitemap_metadata = sitemap_metadata or {}
+        stored = self._load([row.url for row in rows])
+
+        fetch_rows, reused_items, validators = [], [], {}
+        for row in rows:
+            url = row.url
+            state = stored.get(url)
+            if state is None or state['item'] is None:
+                fetch_rows.append(row)
+                continue
+
+            entry = sitemap_metadata.get(url)
+            lastmod = entry.lastmod if entry else None
+            changefreq = entry.changefreq if entry else None
+
+            if lastmod and _lastmod_changed(lastmod, state):
+                fetch_rows.append(row)  # The sitemap says the page changed, fetch it unconditionally
+            elif not lastmod and self._is_due(state, changefreq, now):
+                fetch_rows.append(row)
+                validators[url] = {
+                    'etag': state['etag'],
+                    'last_modified': state['last_modified'],
+                    'item': json.loads(state['item']),
+                }
+            else:
+                item = PageRecord.from_dict(json.loads(state['item']))
+                item.parent_sitemap = row.parent_sitemap or item.parent_sitemap or ''
+                reused_items.append(item)
+
+        logging.info(f"Crawl plan for {len(rows)} URLs: {len(fetch_rows)} to fetch "
+                     f"({len(validators)} conditionally), {len(reused_items)} reused from {self.path}")
+        return CrawlPlan(fetch_rows, reused_items, validators)
+
+    def record(self, items, sitemap_metadata=None, now=None):
+        """
+        Stores the items of a crawl (one per successfully fetched page).
+
+        Args:
+            items (list): PageRecords (or item dicts) as produced by TopicSpider, including 'ETag'
+                and 'Last-Modified'.
+            sitemap_metadata (dict): URL -> SitemapUrl seen when the pages were planned.
+            now (float): Fetch time to record (defaults to time.time()).
+        """
+        now = time.time() if now is None else now
+        sitemap_metadata = sitemap_metadata or {}
+        records = []
+        for item in items:
+            url = item['URL']
+            entry = sitemap_metadata.get(url)
+            records.append((
+                url,
+                item.get('Parent Sitemap'),
+                entry.lastmod if entry else None,
+                entry.changefreq if entry else None,
+                entry.priority if entry else None,
+                item.get('ETag'),
+                item.get('Last-Modified'),
+                now,
+                json.dumps(dict(item)),
+            ))
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO pages (url, parent_sitemap, lastmod, changefreq, priority, etag, "
+                "last_modified, fetched_at, item) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                records,
+            )
+        logging.info(f"Recorded {len(records)} crawled pages in {self.path}")
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _load(self, urls):
+        """Fetches the stored rows of many URLs, in batches below SQLite's parameter limit."""
+        stored = {}
+        batch_size = 500
+        with self._lock:
+            for start in range(0, len(urls), batch_size):
+                batch = urls[start:start + batch_size]
+                placeholders = ",".join("?" * len(batch))
+                cursor = self._connection.execute(
+                    f"SELECT url, lastmod, etag, last_modified, fetched_at, item FROM pages WHERE url IN ({placeholders})",
+                    batch,
+                )
+                for url, lastmod, etag, last_modified, fetched_at, item in cursor:
+                    stored[url] = {
+                        'lastmod': lastmod,
+                        'etag': etag,
+                        'last_modified': last_modified,
+                        'fetched_at': fetched_at or 0,
+                        'item': item,
+                    }
+        return stored
+
+    def _is_due(self, state, changefreq, now):
+        """Tells whether a page without lastmod should be revalidated."""
+        max_age = CHANGEFREQ_SECONDS.get((changefreq or "").lower(), self.max_age)
+        if max_age is None:
+            return False
+        return now - state['fetched_at'] >= max_age
+
+
+def _lastmod_changed(lastmod, state):
+    """Tells whether a sitemap lastmod means the page changed since it was stored."""
+    if state['lastmod'] is not None:
+        return lastmod != state['lastmod']
+    # Stored without a lastmod: compare against the fetch time instead
+    modified = _parse_lastmod(lastmod)
+    return modified is None or modified > state['fetched_at']
+
+
+def _parse_lastmod(lastmod):
+    """
+    Parses a W3C datetime (sitemap <lastmod>) into a Unix timestamp.
+
+    Args:
+        lastmod (str): e.g. '2024-01-31' or '2024-01-31T12:00:00+00:00'.
+
+    Returns:
+        float: The timestamp (UTC if no offset is given), or None if it cannot be parsed.
+    """
+    try:
+        parsed = datetime.fromisoformat(lastmod)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+_states = {}
+_states_lock = threading.Lock()
+
+
+def get_crawl_state(site_url):
+    """
+    Returns the crawl state store of a site, opening it on first use.
+
+    Args:
+        site_url (str): Any URL of the site.
+
+    Returns:
+        CrawlState: The store, shared by every caller in this process.
+    """
+    hostname = urlparse(site_url).netloc or site_url
+    if hostname.startswith("www."):
+        hostname = hostname[4:]
+    safe_hostname = re.sub(r"[^a-zA-Z0-9_]", "_", hostname) or "default_site"
+    path = os.path.join(CRAWL_STATE_DIR, f"{safe_hostname}.sqlite3")
+
+    with _states_lock:
+        if path not in _states:
+            _states[path] = CrawlState(path)
+        return _states[path]
@@ -1,73 +1,53 @@
-import csv
-from io import StringIO
 import logging
-from urllib.parse import urlparse
+
+from src.utils.locale_index import LocaleIndex
+from src.utils.records import read_url_records, write_url_records
+from src.utils.url_filter import FilterStats
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def process_csv_data(csv_data):
+def process_csv_data(csv_data, url_filter=None):
     """
     Reads CSV data, filters URLs to keep only 'en' versions, and returns the filtered data.
 
     Args:
         csv_data (str): CSV data as a string.
+        url_filter (UrlFilter): Optional compiled rule set; rows whose URL it rejects are dropped.
 
     Returns:
         str: Filtered CSV data as a string.
     """
-    url_map = {}
-    new_rows = []
-
-    csvfile = StringIO(csv_data) #Use StringIO, treat string as a file
-    reader = csv.reader(csvfile)
-    try:
-        header = next(reader)
-        if header != ['Parent Sitemap', 'URL']:
-            logging.warning(f"Unexpected header in CSV: {header}.  Assuming standard 'Parent Sitemap,URL' format.")
-    except StopIteration:
+    if not csv_data.strip():
         logging.warning("CSV data is empty.")
         return ""  # Return empty string if CSV is empty
+    return write_url_records(filter_url_records(read_url_records(csv_data), url_filter))
 
 
-    for row in reader:
-        if len(row) != 2:
-            logging.warning(f"Skipping row with unexpected number of columns: {row}")
-            continue
+def filter_url_records(records, url_filter=None):
+    """
+    Filters crawl input records to keep only the 'en' version of every page.
 
-        parent_sitemap, url = row
-        parsed_url = urlparse(url)
-        path_segments = parsed_url.path.split('/')
+    The records are streamed through a LocaleIndex, so memory grows with the number of
+    distinct pages rather than with the number of URLs.
 
-        language_code = path_segments[1] if len(path_segments) > 1 else None
+    Args:
+        records (iterable): SitemapUrl records.
+        url_filter (UrlFilter): Optional compiled rule set; records whose URL it rejects are dropped.
 
-        url_key = '/'.join(path_segments[2:])
+    Returns:
+        list: The kept records, in first-seen order of their pages.
+    """
+    index = LocaleIndex()
+    stats = FilterStats()
 
-        if not language_code:
-            new_rows.append([parent_sitemap, url])
+    for record in records:
+        if url_filter is not None and not url_filter.accepts(record.url, stats):
             continue
+        index.add(record)
 
-        if url_key not in url_map:
-            url_map[url_key] = {'en': None}
-            if language_code == 'en':
-                url_map[url_key]['en'] = [parent_sitemap, url]
-            else:
-                url_map[url_key][language_code] = [parent_sitemap, url]
-
-        elif language_code == 'en':
-            url_map[url_key]['en'] = [parent_sitemap, url]
-
-        elif 'en' not in url_map[url_key] or url_map[url_key]['en'] is None:
-            url_map[url_key][language_code] = [parent_sitemap, url]
-
-    filtered_data = StringIO()
-    writer = csv.writer(filtered_data)
-    writer.writerow(['Parent Sitemap', 'URL'])
+    if url_filter is not None:
+        url_filter.stats.merge(stats)
+        logging.info(f"URL filter on crawl input: {stats.summary()}")
+    logging.info(f"Locale index: {index.summary()}")
 
-    for url_key in url_map:
-        if url_map[url_key]['en'] is not None:
-            writer.writerow(url_map[url_key]['en'])
-        else:
-            for lang in url_map[url_key]:
-                if url_map[url_key][lang] is not None:
-                    writer.writerow(url_map[url_key][lang])
-    return filtered_data.getvalue() #get the string for next func
\ No newline at end of file
+    return list(index.records())
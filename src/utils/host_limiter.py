@@ -0,0 +1,43 @@
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+DEFAULT_PER_HOST_LIMIT = 4  # Maximum simultaneous requests to a single host
+
+
+class HostLimiter:
+    """
+    Caps the number of simultaneous requests made to any one host.
+
+    One bounded semaphore is created lazily per hostname, so fetches spread
+    across many hosts run freely while a single host never sees more than
+    `per_host` requests in flight.
+    """
+
+    def __init__(self, per_host=DEFAULT_PER_HOST_LIMIT):
+        self.per_host = max(1, per_host)
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore_for(self, host):
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_host)
+                self._semaphores[host] = semaphore
+            return semaphore
+
+    @contextmanager
+    def limit(self, url):
+        """
+        Context manager that holds one of the host's slots for the duration of the block.
+
+        Args:
+            url (str): The URL about to be requested.
+        """
+        semaphore = self._semaphore_for(urlparse(url).netloc.lower())
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
@@ -0,0 +1,277 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+import requests
+
+from src.utils.transport import TRANSPORT, DEFAULT_TIMEOUT
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+HTTP_CACHE_DIR = "http_cache"  # On-disk cache for robots.txt and sitemap downloads
+HTTP_CACHE_MAX_BYTES = 512 * 1024 * 1024  # Least recently used entries are evicted above this size
+HTTP_CACHE_FRESH_SECONDS = 3600  # Entries validated more recently than this are served without a request
+CHUNK_SIZE = 64 * 1024
+
+
+class CachedResponse:
+    """
+    A response whose body lives in the cache directory.
+
+    The body file is opened when the response is made, so the first `open` (or `content`)
+    still reads it if the entry is evicted in the meantime.
+
+    Attributes:
+        url (str): The requested URL.
+        status_code (int): The HTTP status of the stored response (always 2xx).
+        headers (dict): The validators and content type of the stored response.
+        path (str): Path of the body file.
+        from_cache (bool): True if no body was downloaded for this call.
+    """
+
+    def __init__(self, url, status_code, headers, path, from_cache, body=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.path = path
+        self.from_cache = from_cache
+        self._body = body  # The body file, opened in advance
+
+    def open(self):
+        """Opens the body as a binary stream (callers stream large sitemaps from here)."""
+        if self._body is not None:
+            body, self._body = self._body, None
+            return body
+        return open(self.path, 'rb')
+
+    @property
+    def content(self):
+        with self.open() as f:
+            return f.read()
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+
+class HttpCache:
+    """
+    Size-bounded on-disk HTTP cache with conditional revalidation.
+
+    Each URL is stored as two files named after the SHA-256 of the URL: `<key>.body`
+    (decoded response body) and `<key>.json` (ETag, Last-Modified, content type and the
+    time of the last validation). Fresh entries are served straight from disk, stale ones
+    are revalidated with If-None-Match / If-Modified-Since, and the least recently used
+    entries are evicted once the cache grows beyond `max_bytes`.
+    """
+
+    def __init__(self, cache_dir=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES, fresh_seconds=HTTP_CACHE_FRESH_SECONDS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self._lock = threading.Lock()
+        self._total_bytes = None  # Computed lazily from the directory contents
+
+    def get(self, url, timeout=DEFAULT_TIMEOUT):
+        """
+        Fetches a URL through the cache.
+
+        Args:
+            url (str): The URL to fetch.
+            timeout (float or tuple): Request timeout in seconds, or (connect, read).
+
+        Returns:
+            CachedResponse: The (possibly cached) response.
+
+        Raises:
+            requests.exceptions.RequestException: If the request fails and nothing is cached,
+                or the server answers with an error status.
+            OSError: If the downloaded body cannot be written to the cache.
+        """
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        body_path, meta_path = self._paths(key)
+        meta = self._read_meta(meta_path) if os.path.exists(body_path) else None
+
+        if meta and time.time() - meta.get('validated_at', 0) < self.fresh_seconds:
+            self._touch(body_path)
+            cached = self._cached_response(url, meta, body_path)
+            if cached:
+                return cached
+            meta = None  # Evicted or unreadable since: a miss
+
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        try:
+            with TRANSPORT.get(url, headers=headers, timeout=timeout, stream=True) as response:
+                if response.status_code == 304 and meta:
+                    cached = self._cached_response(url, meta, body_path)
+                    if cached:
+                        logging.info(f"Not modified, serving cached copy of {url}")
+                        meta['validated_at'] = time.time()
+                        self._write_meta(meta_path, meta)
+                        self._touch(body_path)
+                        return cached
+                else:
+                    response.raise_for_status()
+                    return self._store(url, key, response)
+
+            # Not modified, but the body was evicted while revalidating: download it again
+            with TRANSPORT.get(url, timeout=timeout, stream=True) as response:
+                response.raise_for_status()
+                return self._store(url, key, response)
+
+        except requests.exceptions.ConnectionError as e:
+            cached = self._cached_response(url, meta, body_path) if meta else None
+            if not cached:
+                raise
+            logging.warning(f"Error revalidating {url} ({e}), serving stale cached copy")
+            return cached
+
+    def _store(self, url, key, response):
+        """Streams a 2xx response body into the cache and records its validators."""
+        body_path, meta_path = self._paths(key)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        tmp_path = f"{body_path}.{uuid.uuid4().hex}.tmp"
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in TRANSPORT.iter_content(response, CHUNK_SIZE):
+                    f.write(chunk)
+                    size += len(chunk)
+            previous_size = os.path.getsize(body_path) if os.path.exists(body_path) else 0
+            os.replace(tmp_path, body_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        meta = {
+            'url': url,
+            'status_code': response.status_code,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_type': response.headers.get('Content-Type'),
+            'size': size,
+            'validated_at': time.time(),
+        }
+        self._write_meta(meta_path, meta)
+        logging.info(f"Cached {url} ({size} bytes)")
+
+        cached = self._cached_response(url, meta, body_path, from_cache=False)
+        if not cached:
+            raise FileNotFoundError(f"Cached body of {url} disappeared: {body_path}")
+        self._account(size - previous_size, keep=key)
+        return cached
+
+    def _account(self, delta, keep=None):
+        """
+        Updates the running cache size and evicts least recently used entries if needed.
+
+        Args:
+            delta (int): Change of the cache size in bytes.
+            keep (str): Key of the entry being returned, never evicted.
+        """
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._entries())
+            else:
+                self._total_bytes += delta
+
+            if self._total_bytes <= self.max_bytes:
+                return
+
+            # Oldest access time first
+            for key, size, _ in sorted(self._entries(), key=lambda entry: entry[2]):
+                if self._total_bytes <= self.max_bytes:
+                    break
+                if key == keep:
+                    continue
+                for path in self._paths(key):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                self._total_bytes -= size
+                logging.info(f"Evicted cache entry {key} ({size} bytes)")
+
+    def _entries(self):
+        """Yields (key, size, last access time) for every cached body."""
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if not name.endswith('.body'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            yield name[:-len('.body')], stat.st_size, stat.st_mtime
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return f"{base}.body", f"{base}.json"
+
+    def _cached_response(self, url, meta, body_path, from_cache=True):
+        """Returns the response of a cache entry, or None if its body cannot be opened (e.g. evicted)."""
+        try:
+            body = open(body_path, 'rb')
+        except OSError as e:
+            logging.info(f"Cached body of {url} unavailable ({e}), treating it as a miss")
+            return None
+        headers = {
+            'ETag': meta.get('etag'),
+            'Last-Modified': meta.get('last_modified'),
+            'Content-Type': meta.get('content_type'),
+        }
+        return CachedResponse(url, meta.get('status_code', 200), headers, body_path, from_cache, body)
+
+    @staticmethod
+    def _touch(path):
+        """Marks an entry as recently used (the body mtime drives LRU eviction)."""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _read_meta(meta_path):
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_meta(meta_path, meta):
+        tmp_path = f"{meta_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+
+HTTP_CACHE = HttpCache()
+
+
+def cached_get(url, timeout=DEFAULT_TIMEOUT):
+    """
+    Fetches a URL through the shared on-disk cache.
+
+    Args:
+        url (str): The URL to fetch.
+        timeout (float or tuple): Request timeout in seconds, or (connect, read).
+
+    Returns:
+        CachedResponse: The (possibly cached) response.
+    """
+    return HTTP_CACHE.get(url, timeout=timeout)
@@ -0,0 +1,423 @@
+import logging
+import re
+from array import array
+from collections import Counter
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+from src.utils.records import SitemapUrl
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+PREFERRED_LANGUAGE = 'en'  # Language kept when a page exists in several locales
+LOCALE_QUERY_PARAMS = ('lang', 'language', 'locale', 'hl')  # Query parameters that select the locale
+
+# ISO 639-1 language codes
+LANGUAGE_CODES = frozenset("""
+aa ab ae af ak am an ar as av ay az ba be bg bh bi bm bn bo br bs ca ce ch co cr cs cu cv cy da de dv dz
+ee el en eo es et eu fa ff fi fj fo fr fy ga gd gl gn gu gv ha he hi ho hr ht hu hy hz ia id ie ig ii ik
+io is it iu ja jv ka kg ki kj kk kl km kn ko kr ks ku kv kw ky la lb lg li ln lo lt lu lv mg mh mi mk ml
+mn mr ms mt my na nb nd ne ng nl nn no nr nv ny oc oj om or os pa pi pl ps pt qu rm rn ro ru rw sa sc sd
+se sg si sk sl sm sn so sq sr ss st su sv sw ta te tg th ti tk tl tn to tr ts tt tw ty ug uk ur uz ve vi
+vo wa wo xh yi yo za zh zu
+""".split())
+
+# ISO 3166-1 alpha-2 country codes (lowercase), plus 'uk' which sites use for 'gb'
+COUNTRY_CODES = frozenset("""
+ad ae af ag ai al am ao aq ar as at au aw ax az ba bb bd be bf bg bh bi bj bl bm bn bo bq br bs bt bv bw
+by bz ca cc cd cf cg ch ci ck cl cm cn co cr cu cv cw cx cy cz de dj dk dm do dz ec ee eg eh er es et fi
+fj fk fm fo fr ga gb gd ge gf gg gh gi gl gm gn gp gq gr gs gt gu gw gy hk hm hn hr ht hu id ie il im in
+io iq ir is it je jm jo jp ke kg kh ki km kn kp kr kw ky kz la lb lc li lk lr ls lt lu lv ly ma mc md me
+mf mg mh mk ml mm mn mo mp mq mr ms mt mu mv mw mx my mz na nc ne nf ng ni nl no np nr nu nz om pa pe pf
+pg ph pk pl pm pn pr ps pt pw py qa re ro rs ru rw sa sb sc sd se sg sh si sj sk sl sm sn so sr ss st sv
+sx sy sz tc td tf tg th tj tk tl tm tn to tr tt tv tw tz ua ug uk um us uy uz va vc ve vg vi vn vu wf ws
+ye yt za zm zw
+""".split())
+
+# 'en', 'en-us', 'en_US', 'zh-hans': language, then an optional region or script subtag
+LOCALE_PATTERN = re.compile(r"([a-z]{2})(?:[-_]([a-z]{2}|[a-z]{4}))?")
+# 'shoes-en-us' (an optional extension follows): a language-region suffix on the last path segment
+LOCALE_SUFFIX_PATTERN = re.compile(r"(.+)[-_]([a-z]{2})[-_]([a-z]{2})(\.[a-z0-9]+)?")
+
+LOCALE_EVIDENCE_PAGES = 2  # Pages a bare language code must share with other locales before it counts as one
+
+# Variant ranks, best first: the preferred language, the preferred language with a region, anything else
+RANK_LANGUAGE, RANK_REGIONAL, RANK_OTHER, RANK_NONE = 0, 1, 2, 3
+
+
+def parse_locale(value):
+    """
+    Normalises a locale tag.
+
+    Args:
+        value (str): e.g. 'en', 'EN-us', 'pt_BR', 'zh-Hans'.
+
+    Returns:
+        str: The lowercase tag with '-' separators ('pt-br'), or None if it is not a known locale.
+    """
+    match = LOCALE_PATTERN.fullmatch(value.lower())
+    if not match:
+        return None
+    language, subtag = match.groups()
+    if language not in LANGUAGE_CODES:
+        return None
+    if subtag is None:
+        return language
+    if len(subtag) == 2 and subtag not in COUNTRY_CODES:
+        return None
+    return f"{language}-{subtag}"
+
+
+def split_locale(url):
+    """
+    Finds the locale of a URL and the key of the page it is a version of.
+
+    The locale is looked for, in order, in a locale query parameter (?lang=fr), the
+    first path segment (/fr-ca/), the first host label (fr-ca.example.com) and a
+    language-region suffix on the last path segment (/shoes-fr-ca). The page key is the
+    URL without that marker, so every locale of a page shares it.
+
+    A bare language code as the first path segment or host label (/it/, my.shop.com) is
+    not trusted here: it is as likely to be a section or a brand. See locale_candidate.
+
+    Args:
+        url (str): The URL.
+
+    Returns:
+        tuple: (locale or None, page key).
+    """
+    locale, page_key, _ = _split_url(url)
+    return locale, page_key
+
+
+def locale_candidate(url):
+    """
+    Finds a bare language code in the first path segment or host label of a URL
+    without another locale marker (/fr/page, fr.example.com/page).
+
+    Whether it is a locale depends on the rest of the site (see LocaleIndex).
+
+    Args:
+        url (str): The URL.
+
+    Returns:
+        tuple: (language code, page key without it), or None.
+    """
+    return _split_url(url)[2]
+
+
+def _split_url(url):
+    """Returns (locale, page key, candidate) of a URL, see split_locale and locale_candidate."""
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parts.path.rstrip('/')
+    query = parts.query
+    candidate = None
+
+    if query:
+        params = parse_qsl(query, keep_blank_values=True)
+        for index, (name, value) in enumerate(params):
+            if name.lower() in LOCALE_QUERY_PARAMS:
+                locale = parse_locale(value)
+                if locale:
+                    query = urlencode(params[:index] + params[index + 1:])
+                    return locale, _page_key(host, path, query), None
+
+    segment, _, rest = path[1:].partition('/')
+    locale = parse_locale(segment) if segment else None
+    if locale:
+        page_key = _page_key(host, '/' + rest if rest else '', query)
+        if '-' not in locale:
+            candidate = (locale, page_key)
+        else:
+            return locale, page_key, None
+
+    label, _, domain = host.partition('.')
+    if domain.count('.') >= 1:
+        locale = parse_locale(label)
+        if locale:
+            page_key = _page_key(domain, path, query)
+            if '-' not in locale:
+                candidate = candidate or (locale, page_key)
+            else:
+                return locale, page_key, None
+
+    head, _, last = path.rpartition('/')
+    match = LOCALE_SUFFIX_PATTERN.fullmatch(last.lower())
+    if match:
+        stem, language, region, extension = match.groups()
+        locale = parse_locale(f"{language}-{region}")
+        if locale:
+            return locale, _page_key(host, f"{head}/{stem}{extension or ''}", query), None
+
+    return None, _page_key(host, path, query), candidate
+
+
+def _page_key(host, path, query):
+    return f"{host}{path}?{query}" if query else f"{host}{path}"
+
+
+def locale_rank(locale, preferred_language=PREFERRED_LANGUAGE):
+    """Ranks a locale against the preferred language (see the RANK_* constants)."""
+    if locale == preferred_language:
+        return RANK_LANGUAGE
+    if locale and locale.partition('-')[0] == preferred_language:
+        return RANK_REGIONAL
+    return RANK_OTHER
+
+
+class LocaleIndex:
+    """
+    Streaming locale deduplication of sitemap URLs.
+
+    Every URL is reduced to (page, locale) and only the best-ranked versions of each page
+    are kept: the preferred language if the page has it, else its regional variants
+    (en-us, en-gb, ...), else every locale it was found in. URLs with hreflang alternates
+    in the sitemap are grouped by those alternates rather than by their shape.
+
+    Memory grows with the number of distinct pages, not with the number of URLs: page
+    keys, parent sitemaps and locales are interned into integer ids, the per-page state
+    lives in flat arrays, and a version that loses to a better-ranked one is released as
+    soon as the better one arrives. Kept versions of a page form a linked list of slots.
+
+    A bare language code in the first path segment or host label (/it/services) is only
+    taken as a locale once the site shows it uses locales that way: the code is listed in
+    hreflang alternates, or LOCALE_EVIDENCE_PAGES of its pages also exist in another
+    locale (one once any code is confirmed). Until then its URLs are kept as pages of
+    their own and are moved under the shared page key when the code is confirmed.
+    """
+
+    def __init__(self, preferred_language=PREFERRED_LANGUAGE):
+        self.preferred_language = preferred_language
+        self.urls_seen = 0
+        self._page_ids = {}  # page key -> page id
+        self._sitemap_ids = {}  # parent sitemap -> sitemap id
+        self._sitemaps = []
+        self._locale_ids = {None: 0}  # locale -> locale id
+        self._locales = [None]
+        self._page_ranks = bytearray()  # page id -> rank of its kept versions
+        self._first_slots = array('l')  # page id -> first kept slot
+        self._last_slots = array('l')  # page id -> last kept slot
+        self._next_slots = array('l')  # slot -> next slot of the same page, -1 ends the list
+        self._slot_locales = array('l')  # slot -> locale id
+        self._rows = []  # slot -> (sitemap id, url, lastmod, changefreq, priority, alternates), None once released
+        self._free_slots = []
+        self._retired_pages = 0  # pages emptied when their locale code was confirmed
+        self._confirmed = set()  # bare language codes the site uses as locales
+        self._candidates = {}  # page key without the code -> first unconfirmed code seen for it
+        self._pending = {}  # unconfirmed code -> [(page key with the code, page key without it)]
+        self._evidence = Counter()  # unconfirmed code -> pages shared with another locale
+
+    def __len__(self):
+        """Number of distinct pages seen."""
+        return len(self._page_ranks) - self._retired_pages
+
+    def add(self, record):
+        """
+        Adds one URL to the index.
+
+        Args:
+            record (SitemapUrl): The URL and its sitemap metadata.
+        """
+        self.urls_seen += 1
+        if record.alternates:
+            for hreflang, _ in record.alternates:
+                code = parse_locale(hreflang)
+                if code and code not in self._confirmed:
+                    self._confirm(code)
+
+        locale, page_key, candidate = self._locate(record)
+        if candidate:
+            code, stripped_key = candidate
+            if self._shares_page(code, stripped_key) or code in self._confirmed:
+                self._confirm(code)
+                locale, page_key, candidate = code, stripped_key, None
+        elif locale and page_key in self._candidates:
+            code = self._candidates[page_key]
+            if self._add_evidence(code):
+                self._confirm(code)
+
+        row = (self._intern_sitemap(record.parent_sitemap), record.url, record.lastmod, record.changefreq,
+               record.priority, record.alternates)
+        self._insert(page_key, locale, row)
+        if candidate:
+            self._pending.setdefault(code, []).append((page_key, stripped_key))
+            self._candidates.setdefault(stripped_key, code)
+
+    def update(self, records):
+        """Adds a stream of URLs."""
+        for record in records:
+            self.add(record)
+
+    def records(self):
+        """
+        Yields the kept URLs, pages in first-seen order and the versions of a page in first-seen order.
+
+        Yields:
+            SitemapUrl: The kept records.
+        """
+        sitemaps = self._sitemaps
+        for page_id in range(len(self._page_ranks)):
+            slot = self._first_slots[page_id]
+            while slot != -1:
+                sitemap_id, url, lastmod, changefreq, priority, alternates = self._rows[slot]
+                yield SitemapUrl(sitemaps[sitemap_id], url, lastmod, changefreq, priority, alternates)
+                slot = self._next_slots[slot]
+
+    def summary(self):
+        """Returns a one-line, human readable description of the index."""
+        kept = len(self._rows) - len(self._free_slots)
+        return (f"{self.urls_seen} URLs, {len(self)} distinct pages, {kept} kept, "
+                f"{len(self._locales) - 1} locales from {len(self._sitemaps)} sitemaps")
+
+    def _insert(self, page_key, locale, row):
+        """Adds a row as the given locale of a page, unless the page has better-ranked versions."""
+        rank = locale_rank(locale, self.preferred_language) if locale else RANK_OTHER
+
+        page_id = self._page_ids.get(page_key)
+        if page_id is None:
+            page_id = self._page_ids[page_key] = len(self._page_ranks)
+            self._page_ranks.append(RANK_NONE)
+            self._first_slots.append(-1)
+            self._last_slots.append(-1)
+
+        page_rank = self._page_ranks[page_id]
+        if rank > page_rank:
+            return
+        if rank < page_rank:
+            self._release(page_id)
+            self._page_ranks[page_id] = rank
+
+        # A second URL for the same locale of a page replaces the first
+        locale_id = self._intern_locale(locale)
+        slot = self._first_slots[page_id]
+        while slot != -1:
+            if self._slot_locales[slot] == locale_id:
+                self._rows[slot] = row
+                return
+            slot = self._next_slots[slot]
+
+        slot = self._new_slot(locale_id, row)
+        if self._first_slots[page_id] == -1:
+            self._first_slots[page_id] = slot
+        else:
+            self._next_slots[self._last_slots[page_id]] = slot
+        self._last_slots[page_id] = slot
+
+    def _locate(self, record):
+        """
+        Returns (locale, page key, candidate) of a record, from its hreflang alternates when
+        it has them. candidate is (code, page key without it) for an unconfirmed bare code.
+        """
+        alternates = record.alternates
+        if alternates:
+            locale = None
+            for hreflang, href in alternates:
+                if href == record.url:
+                    locale = parse_locale(hreflang)
+                    break
+            if locale is None:
+                locale = self._split(record.url)[0]
+            # Every version lists the same alternates, so they all agree on this key
+            return locale, self._split(min(href for _, href in alternates))[1], None
+        return self._split(record.url)
+
+    def _split(self, url):
+        """split_locale with the bare language codes this site is known to use."""
+        locale, page_key, candidate = _split_url(url)
+        if candidate and candidate[0] in self._confirmed:
+            return candidate[0], candidate[1], None
+        return locale, page_key, candidate
+
+    def _shares_page(self, code, page_key):
+        """Counts a page an unconfirmed code shares with another locale; True once that confirms the code."""
+        other = self._candidates.get(page_key)
+        if other is not None:
+            if other == code:
+                return False
+            if self._add_evidence(other):
+                self._confirm(other)
+        else:
+            page_id = self._page_ids.get(page_key)
+            if page_id is None or not self._has_other_locale(page_id, code):
+                return False
+        return self._add_evidence(code)
+
+    def _add_evidence(self, code):
+        self._evidence[code] += 1
+        return self._evidence[code] >= self._evidence_needed()
+
+    def _evidence_needed(self):
+        return 1 if self._confirmed else LOCALE_EVIDENCE_PAGES
+
+    def _has_other_locale(self, page_id, code):
+        slot = self._first_slots[page_id]
+        while slot != -1:
+            locale = self._locales[self._slot_locales[slot]]
+            if locale and locale != code:
+                return True
+            slot = self._next_slots[slot]
+        return False
+
+    def _confirm(self, code):
+        """Takes a bare language code as a locale from now on and moves its pending pages under their shared key."""
+        self._confirmed.add(code)
+        self._evidence.pop(code, None)
+        for literal_key, page_key in self._pending.pop(code, ()):
+            if self._candidates.get(page_key) == code:
+                del self._candidates[page_key]
+            page_id = self._page_ids.pop(literal_key, None)
+            if page_id is None:
+                continue
+            moved = []
+            slot = self._first_slots[page_id]
+            while slot != -1:
+                moved.append((self._locales[self._slot_locales[slot]] or code, self._rows[slot]))
+                slot = self._next_slots[slot]
+            self._release(page_id)
+            self._page_ranks[page_id] = RANK_NONE
+            self._retired_pages += 1
+            for locale, row in moved:
+                self._insert(page_key, locale, row)
+
+        # Evidence gathered before the first confirmation may meet the lower threshold now
+        needed = self._evidence_needed()
+        for other in [other for other, count in self._evidence.items() if count >= needed]:
+            if other not in self._confirmed:
+                self._confirm(other)
+
+    def _release(self, page_id):
+        slot = self._first_slots[page_id]
+        while slot != -1:
+            self._rows[slot] = None
+            self._free_slots.append(slot)
+            slot = self._next_slots[slot]
+        self._first_slots[page_id] = -1
+        self._last_slots[page_id] = -1
+
+    def _new_slot(self, locale_id, row):
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._rows[slot] = row
+            self._slot_locales[slot] = locale_id
+            self._next_slots[slot] = -1
+            return slot
+        self._rows.append(row)
+        self._slot_locales.append(locale_id)
+        self._next_slots.append(-1)
+        return len(self._rows) - 1
+
+    def _intern_sitemap(self, parent_sitemap):
+        sitemap_id = self._sitemap_ids.get(parent_sitemap)
+        if sitemap_id is None:
+            sitemap_id = self._sitemap_ids[parent_sitemap] = len(self._sitemaps)
+            self._sitemaps.append(parent_sitemap)
+        return sitemap_id
+
+    def _intern_locale(self, locale):
+        locale_id = self._locale_ids.get(locale)
+        if locale_id is None:
+            locale_id = self._locale_ids[locale] = len(self._locales)
+            self._locales.append(locale)
+        return locale_id
@@ -0,0 +1,210 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+INITIAL_RATE = 4.0  # Requests per second a new host starts with
+MIN_RATE = 0.1
+MAX_RATE = 20.0
+BURST = 4  # Requests a host may receive back to back when its bucket is full
+ADDITIVE_INCREASE = 1.0  # Requests per second added per "round" (rate successful responses)
+MULTIPLICATIVE_DECREASE = 0.5  # Rate factor applied on 429/503/errors
+SLOW_RESPONSE_SECONDS = 5.0  # Responses slower than this shrink the rate a little
+SLOW_RESPONSE_DECREASE = 0.9
+THROTTLE_STATUSES = (429, 503)
+MAX_RETRY_AFTER_SECONDS = 600  # Longer Retry-After values are clamped to this
+
+
+class HostBucket:
+    """
+    Token bucket of one host whose refill rate is adjusted AIMD-style.
+
+    Successful responses raise the rate additively, throttling responses (429/503) and
+    errors halve it, slow responses shrink it slightly. A Retry-After blocks the host
+    until that time and a Crawl-delay caps the rate at one request per delay.
+    """
+
+    def __init__(self, rate=INITIAL_RATE, burst=BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.max_rate = MAX_RATE
+        self.throttled = 0  # Number of 429/503 responses seen
+
+    def set_crawl_delay(self, delay):
+        if delay and delay > 0:
+            self.max_rate = min(MAX_RATE, 1.0 / delay)
+            self.burst = 1
+        else:
+            self.max_rate = MAX_RATE
+            self.burst = BURST
+        self.rate = min(self.rate, self.max_rate)
+        self.tokens = min(self.tokens, self.burst)
+
+    def reserve(self, now):
+        """Takes one token and returns how many seconds the request has to wait for it."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1  # May go negative: later requests queue up behind this one
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def on_response(self, now, status=None, latency=None, retry_after=None, error=False):
+        """Adjusts the rate from the outcome of one request."""
+        if error or status in THROTTLE_STATUSES:
+            self.rate = max(MIN_RATE, self.rate * MULTIPLICATIVE_DECREASE)
+            self.tokens = min(self.tokens, 0.0)
+            if status in THROTTLE_STATUSES:
+                self.throttled += 1
+        elif latency is not None and latency > SLOW_RESPONSE_SECONDS:
+            self.rate = max(MIN_RATE, self.rate * SLOW_RESPONSE_DECREASE)
+        elif status is not None and status < 500:
+            self.rate = min(self.max_rate, self.rate + ADDITIVE_INCREASE / max(self.rate, 1.0))
+
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, now + min(retry_after, MAX_RETRY_AFTER_SECONDS))
+
+
+class PolitenessScheduler:
+    """
+    Per-host request scheduler shared by every fetcher of a process.
+
+    Blocking callers (requests-based fetchers in threads) use `acquire`; event-loop
+    callers (the Scrapy middleware) use `reserve` and delay the request themselves.
+    Every caller reports the outcome with `record` so the host's rate adapts.
+    """
+
+    def __init__(self, initial_rate=INITIAL_RATE, burst=BURST):
+        self.initial_rate = initial_rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, url):
+        key = host_key(url)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = HostBucket(self.initial_rate, self.burst)
+        return bucket
+
+    def set_crawl_delay(self, url, delay):
+        """
+        Applies a robots.txt Crawl-delay to the host of a URL.
+
+        Args:
+            url (str): Any URL of the host.
+            delay (float): Seconds between requests, or None to remove the cap.
+        """
+        with self._lock:
+            self._bucket(url).set_crawl_delay(delay)
+
+    def reserve(self, url):
+        """
+        Reserves a request slot without blocking.
+
+        Args:
+            url (str): The URL about to be requested.
+
+        Returns:
+            float: Seconds the caller must wait before sending the request.
+        """
+        with self._lock:
+            return self._bucket(url).reserve(time.monotonic())
+
+    def acquire(self, url):
+        """
+        Blocks until the host of the URL may receive another request.
+
+        Args:
+            url (str): The URL about to be requested.
+
+        Returns:
+            float: The number of seconds waited.
+        """
+        wait = self.reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def record(self, url, status=None, latency=None, retry_after=None, error=False):
+        """
+        Feeds the outcome of a request back into the host's rate.
+
+        Args:
+            url (str): The requested URL.
+            status (int): HTTP status, if a response arrived.
+            latency (float): Seconds until the response arrived.
+            retry_after (str or float): Retry-After header value (seconds or HTTP date).
+            error (bool): True for timeouts and connection errors.
+        """
+        delay = parse_retry_after(retry_after)
+        with self._lock:
+            bucket = self._bucket(url)
+            previous_rate = bucket.rate
+            bucket.on_response(time.monotonic(), status, latency, delay, error)
+            rate = bucket.rate
+        if rate < previous_rate and (error or status in THROTTLE_STATUSES):
+            logging.warning(f"Slowing down {host_key(url)} to {rate:.2f} req/s "
+                            f"({'error' if error else status}{f', retry after {delay:.0f}s' if delay else ''})")
+
+    def stats(self):
+        """
+        Returns the current state of every host.
+
+        Returns:
+            dict: Host -> {'rate', 'max_rate', 'throttled', 'blocked_for'}.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                key: {
+                    'rate': bucket.rate,
+                    'max_rate': bucket.max_rate,
+                    'throttled': bucket.throttled,
+                    'blocked_for': max(0.0, bucket.blocked_until - now),
+                }
+                for key, bucket in self._buckets.items()
+            }
+
+
+def host_key(url):
+    """Returns 'host:port' for a URL (default port filled in), the unit of rate control."""
+    parsed = urlparse(url)
+    port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+    return f"{(parsed.hostname or '').lower()}:{port}"
+
+
+def parse_retry_after(value):
+    """
+    Parses a Retry-After header.
+
+    Args:
+        value (str or float): Delay in seconds or an HTTP date.
+
+    Returns:
+        float: Seconds to wait, or None if the value is missing or invalid.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, bytes):
+        value = value.decode('latin-1')
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+POLITENESS = PolitenessScheduler()  # One scheduler per process, shared by all fetchers
@@ -0,0 +1,157 @@
+import csv
+import logging
+from collections import namedtuple
+from io import StringIO
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+URL_FIELDS = ['Parent Sitemap', 'URL']  # CSV columns of the crawl input
+
+# A page URL with its sitemap metadata: the record of the crawl input, from the sitemap
+# extractor through language filtering, sampling and the crawl plan. The first two fields
+# are the usual (parent_sitemap, URL) pair; the metadata is None when unknown. `alternates`
+# are the page's hreflang links from the sitemap, as (hreflang, href) pairs.
+SitemapUrl = namedtuple('SitemapUrl', ['parent_sitemap', 'url', 'lastmod', 'changefreq', 'priority', 'alternates'],
+                        defaults=(None, None, None, None))
+
+# Item key -> PageRecord attribute for the fields every crawled page has
+PAGE_FIELDS = {
+    'Parent Sitemap': 'parent_sitemap',
+    'URL': 'url',
+    'Topic': 'topic',
+    'Meta Description': 'meta_description',
+    'Meta Keywords': 'meta_keywords',
+    'Meta Robots': 'meta_robots',
+    'Meta Author': 'meta_author',
+    'ETag': 'etag',
+    'Last-Modified': 'last_modified',
+}
+
+
+class PageRecord:
+    """
+    A crawled page: the spider's item without a per-item dict.
+
+    The common fields live in slots; optional meta fields (Open Graph, canonical, ...)
+    go to `extra`. Records also read like the item dicts they replace (`get`, `[]`,
+    `keys`, `dict(record)`), so keyword extraction, page matching and CSV export take
+    either.
+    """
+
+    __slots__ = tuple(PAGE_FIELDS.values()) + ('extra',)
+
+    def __init__(self, url, parent_sitemap='', topic=None, meta_description=None, meta_keywords=None,
+                 meta_robots=None, meta_author=None, etag=None, last_modified=None, extra=None):
+        self.url = url
+        self.parent_sitemap = parent_sitemap
+        self.topic = topic
+        self.meta_description = meta_description
+        self.meta_keywords = meta_keywords
+        self.meta_robots = meta_robots
+        self.meta_author = meta_author
+        self.etag = etag
+        self.last_modified = last_modified
+        self.extra = extra  # Other fields, or None
+
+    @classmethod
+    def from_dict(cls, item):
+        """
+        Builds a record from a spider item.
+
+        Args:
+            item (dict): Item keyed by column name (see PAGE_FIELDS).
+
+        Returns:
+            PageRecord: The record.
+        """
+        record = cls(item.get('URL'))
+        extra = None
+        for field, value in item.items():
+            attribute = PAGE_FIELDS.get(field)
+            if attribute is not None:
+                setattr(record, attribute, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[field] = value
+        record.extra = extra
+        return record
+
+    def get(self, field, default=None):
+        attribute = PAGE_FIELDS.get(field)
+        if attribute is not None:
+            return getattr(self, attribute)
+        return self.extra.get(field, default) if self.extra else default
+
+    def __getitem__(self, field):
+        attribute = PAGE_FIELDS.get(field)
+        if attribute is not None:
+            return getattr(self, attribute)
+        if self.extra and field in self.extra:
+            return self.extra[field]
+        raise KeyError(field)
+
+    def __setitem__(self, field, value):
+        attribute = PAGE_FIELDS.get(field)
+        if attribute is not None:
+            setattr(self, attribute, value)
+            return
+        if self.extra is None:
+            self.extra = {}
+        self.extra[field] = value
+
+    def __contains__(self, field):
+        return field in PAGE_FIELDS or bool(self.extra and field in self.extra)
+
+    def keys(self):
+        return list(PAGE_FIELDS) + list(self.extra or ())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __repr__(self):
+        return f"PageRecord({self.url!r})"
+
+
+def read_url_records(csv_data):
+    """
+    Parses crawl input CSV ('Parent Sitemap', 'URL' columns) into SitemapUrl records.
+
+    Args:
+        csv_data (str): CSV data with a header row.
+
+    Returns:
+        list: SitemapUrl records (metadata None).
+    """
+    reader = csv.reader(StringIO(csv_data))
+    header = next(reader, None)
+    if header is None:
+        logging.warning("CSV data is empty.")
+        return []
+    if header != URL_FIELDS:
+        logging.warning(f"Unexpected header in CSV: {header}.  Assuming standard 'Parent Sitemap,URL' format.")
+
+    records = []
+    for row in reader:
+        if len(row) != 2:
+            logging.warning(f"Skipping row with unexpected number of columns: {row}")
+            continue
+        records.append(SitemapUrl(row[0], row[1]))
+    return records
+
+
+def write_url_records(records):
+    """
+    Serializes crawl input records to CSV (for export and the command-line spider only).
+
+    Args:
+        records (iterable): SitemapUrl records or (parent_sitemap, URL) tuples.
+
+    Returns:
+        str: CSV data with a header row.
+    """
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(URL_FIELDS)
+    writer.writerows(record[:2] for record in records)
+    return output.getvalue()
@@ -0,0 +1,180 @@
+import re
+import logging
+import threading
+import time
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+from src.utils.http_cache import cached_get
+from src.utils.politeness import POLITENESS
+from src.utils.transport import DEFAULT_TIMEOUT
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+ROBOTS_TTL_SECONDS = 3600  # How long a parsed robots.txt is reused before it is re-read
+DEFAULT_USER_AGENT = "*"
+
+
+class RobotsRules:
+    """
+    Parsed robots.txt of one host.
+
+    Attributes:
+        base_url (str): Scheme and host the rules belong to.
+        sitemaps (list): Every absolute sitemap URL listed in the file, in order.
+        groups (dict): User-agent token (lowercase) -> list of (allow, compiled pattern, pattern length).
+        crawl_delays (dict): User-agent token (lowercase) -> Crawl-delay in seconds.
+    """
+
+    def __init__(self, base_url, robots_txt=""):
+        self.base_url = base_url
+        self.sitemaps = []
+        self.groups = {}
+        self.crawl_delays = {}
+        self._parse(robots_txt or "")
+
+    def _parse(self, robots_txt):
+        agents = []
+        in_rules = False  # True once the current group has seen a rule line
+
+        for raw_line in robots_txt.splitlines():
+            line = raw_line.split('#', 1)[0].strip()
+            if ':' not in line:
+                continue
+            field, value = line.split(':', 1)
+            field = field.strip().lower()
+            value = value.strip()
+
+            if field == 'sitemap':
+                if value:
+                    sitemap_url = value if urlparse(value).scheme else urljoin(self.base_url, value)
+                    if sitemap_url not in self.sitemaps:
+                        self.sitemaps.append(sitemap_url)
+            elif field == 'user-agent':
+                if in_rules:  # A User-agent line after rules starts a new group
+                    agents = []
+                    in_rules = False
+                agent = value.lower()
+                agents.append(agent)
+                self.groups.setdefault(agent, [])
+            elif field in ('allow', 'disallow'):
+                in_rules = True
+                if not value:  # An empty Disallow allows everything
+                    continue
+                rule = (field == 'allow', _compile_pattern(value), len(value))
+                for agent in agents:
+                    self.groups[agent].append(rule)
+            elif field == 'crawl-delay':
+                in_rules = True
+                try:
+                    delay = float(value)
+                except ValueError:
+                    continue
+                for agent in agents:
+                    self.crawl_delays[agent] = delay
+
+    def _agent_key(self, user_agent, table):
+        """Picks the most specific agent token of `table` that matches the user agent."""
+        user_agent = (user_agent or DEFAULT_USER_AGENT).lower()
+        matches = [agent for agent in table if agent != '*' and agent in user_agent]
+        if matches:
+            return max(matches, key=len)
+        return '*' if '*' in table else None
+
+    def can_fetch(self, url, user_agent=DEFAULT_USER_AGENT):
+        """
+        Tells whether the rules allow fetching a URL (longest matching rule wins, Allow wins ties).
+
+        Args:
+            url (str): The URL to check.
+            user_agent (str): The user agent string of the fetcher.
+
+        Returns:
+            bool: True if the URL may be fetched.
+        """
+        agent = self._agent_key(user_agent, self.groups)
+        if agent is None:
+            return True
+
+        parsed_url = urlparse(url)
+        path = parsed_url.path or '/'
+        if parsed_url.query:
+            path = f"{path}?{parsed_url.query}"
+
+        best_length = -1
+        allowed = True
+        for allow, pattern, length in self.groups[agent]:
+            if pattern.match(path) and (length > best_length or (length == best_length and allow)):
+                best_length = length
+                allowed = allow
+        return allowed
+
+    def crawl_delay(self, user_agent=DEFAULT_USER_AGENT):
+        """
+        Returns the Crawl-delay that applies to the user agent.
+
+        Args:
+            user_agent (str): The user agent string of the fetcher.
+
+        Returns:
+            float: The delay in seconds, or None if the site does not set one.
+        """
+        agent = self._agent_key(user_agent, self.groups)
+        return self.crawl_delays.get(agent) if agent else None
+
+
+def _compile_pattern(value):
+    """Converts a robots.txt path pattern ('*' wildcard, '$' end anchor) to a compiled regex."""
+    anchored = value.endswith('$')
+    if anchored:
+        value = value[:-1]
+    regex = '.*'.join(re.escape(part) for part in value.split('*'))
+    return re.compile(regex + ('$' if anchored else ''))
+
+
+_robots_cache = {}
+_robots_lock = threading.Lock()
+
+
+def get_robots(url, timeout=DEFAULT_TIMEOUT):
+    """
+    Returns the parsed robots.txt for the host of a URL.
+
+    Rules are parsed once per host and kept in memory for ROBOTS_TTL_SECONDS; the download
+    itself goes through the on-disk HTTP cache. A missing or unreachable robots.txt yields
+    rules that allow everything. The host's Crawl-delay (for the requests user agent) is
+    applied to the politeness scheduler, so every requests-based fetcher honours it.
+
+    Args:
+        url (str): Any URL on the host.
+        timeout (float): Seconds the caller can wait for the download. Rules assumed for a
+            robots.txt that timed out are not kept.
+
+    Returns:
+        RobotsRules: The rules of the host.
+    """
+    parsed_url = urlparse(url)
+    base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
+
+    with _robots_lock:
+        cached = _robots_cache.get(base_url)
+        if cached and time.time() - cached[0] < ROBOTS_TTL_SECONDS:
+            return cached[1]
+
+    robots_url = urljoin(base_url, "robots.txt")
+    try:
+        logging.info(f"Fetching robots.txt: {robots_url}")
+        rules = RobotsRules(base_url, cached_get(robots_url, timeout=timeout).text)
+    except requests.exceptions.Timeout as e:
+        # The caller ran out of time; a caller with more of it reads the file again
+        logging.info(f"Timed out reading robots.txt ({e}), assuming everything is allowed")
+        return RobotsRules(base_url)
+    except (requests.exceptions.RequestException, OSError) as e:
+        logging.info(f"Error accessing robots.txt ({e}), assuming everything is allowed")
+        rules = RobotsRules(base_url)
+
+    POLITENESS.set_crawl_delay(base_url, rules.crawl_delay(requests.utils.default_user_agent()))
+    with _robots_lock:
+        _robots_cache[base_url] = (time.time(), rules)
+    return rules
@@ -1,18 +1,48 @@
 import requests
+import urllib3
 import xml.etree.ElementTree as ET
+import gzip
+import io
 from urllib.parse import urljoin, urlparse
 import re
 import logging
-import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+
+from src.utils.host_limiter import HostLimiter
+from src.utils.http_cache import cached_get
+from src.utils.records import SitemapUrl
+from src.utils.robots import get_robots
+from src.utils.url_filter import UrlFilter, FilterStats
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
 ALLOWED_COUNTRIES = {"US", "SA", "QA", "IN", "KR", "CN", "SG", "AU"}
-MIN_URL_THRESHOLD = 100
+RESTRICT_TO_ALLOWED_COUNTRIES = False  # Drop '-en-<country>' URLs outside ALLOWED_COUNTRIES
 MAX_RECURSION_DEPTH = 5  # Define maximum recursion depth
+MAX_CONCURRENT_FETCHES = 16  # Thread pool size for concurrent sub-sitemap traversal
+MAX_FETCHES_PER_HOST = 4  # Simultaneous sub-sitemap fetches allowed against one host
+
+
+# Compiled once, shared by every sitemap parse (media extensions, clustered paths, country rule)
+SITEMAP_URL_FILTER = UrlFilter.from_rules({
+    "allowed_countries": ALLOWED_COUNTRIES if RESTRICT_TO_ALLOWED_COUNTRIES else None,
+})
+
+GZIP_MAGIC = b"\x1f\x8b"  # Leading bytes of a gzip stream (.xml.gz sitemaps)
+
+# Errors that can surface while downloading or decompressing a streamed sitemap
+SITEMAP_FETCH_ERRORS = (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, OSError, EOFError)
+
+# One <url>/<sitemap> element of a sitemap document; the optional fields are None when absent.
+# `alternates` holds the entry's hreflang links as (hreflang, href) pairs.
+SitemapEntry = namedtuple('SitemapEntry', ['kind', 'loc', 'lastmod', 'changefreq', 'priority', 'alternates'],
+                          defaults=(None,))
 
-ROBOTS_DIR = "robots"  # Directory to save robots.txt files
+ENTRY_METADATA_TAGS = ('lastmod', 'changefreq', 'priority')
+SITEMAP_NAMESPACE = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
 
 
 def create_csv_filename(url):
@@ -41,285 +71,529 @@ def create_csv_filename(url):
     return f"{safe_hostname}.csv"
 
 
-def get_sitemap_url_from_robots(robots_txt):
+def get_base_url(url):
     """
-    Extracts the sitemap URL from a robots.txt file using regular expressions.
+    Extracts the base URL (scheme and netloc) from a given URL.
 
     Args:
-        robots_txt (str): The content of the robots.txt file.
+        url (str): The URL to extract the base URL from.
 
     Returns:
-        str: The sitemap URL, or None if not found.
+        str: The base URL.
     """
-    pattern = re.compile(r"^Sitemap:\s*(.*)$", re.IGNORECASE | re.MULTILINE)  # Regex pattern
-    match = pattern.search(robots_txt)
-    if match:
-        return match.group(1).strip()
-    return None
+    parsed_url = urlparse(url)
+    return f"{parsed_url.scheme}://{parsed_url.netloc}"
+
 
-def extract_country_code(url):
+def extract_sitemap_urls(url, concurrent=False, lazy=False, with_metadata=False):
     """
-    Extracts the country code from a URL if it matches the pattern '-en-<country>'
+    Extracts URLs from a sitemap.xml or a sitemap URL found in robots.txt and returns them.
 
     Args:
-        url (str): The URL to extract the country code from.
+        url (str): The base URL of the website.
+        concurrent (bool): Fetch sibling sub-sitemaps in parallel (see `parse_sitemap_xml_concurrent`).
+        lazy (bool): Return a generator that streams the URLs instead of a list.
+        with_metadata (bool): Return SitemapUrl tuples that also carry lastmod, changefreq and priority.
 
     Returns:
-        str: The country code in uppercase, or None if not found.
+        list: A list of tuples (parent_sitemap, URL) or None on error.
+              With lazy=True, a generator of the same tuples.
     """
-    match = re.search(r"-en-([a-z]{2})", url, re.IGNORECASE)
-    if match:
-        return match.group(1).upper()
-    return None
+    urls = iter_site_sitemap_urls(url, concurrent=concurrent, with_metadata=with_metadata)
+    if lazy:
+        return urls
 
-def get_base_url(url):
+    all_urls = list(urls)
+    if not all_urls:
+        logging.info("No sitemap found.")
+        return None
+
+    return all_urls  # Return the list of URLs
+
+
+def iter_site_sitemap_urls(url, concurrent=False, with_metadata=False):
     """
-    Extracts the base URL (scheme and netloc) from a given URL.
+    Generator behind `extract_sitemap_urls`. Fans out over /sitemap.xml and every sitemap
+    listed in robots.txt, streaming (parent_sitemap, URL) tuples as they are parsed.
 
     Args:
-        url (str): The URL to extract the base URL from.
+        url (str): The base URL of the website.
+        concurrent (bool): Fetch the root sitemaps and sibling sub-sitemaps in parallel.
+        with_metadata (bool): Yield SitemapUrl tuples (see `iter_sitemap_urls`).
+
+    Yields:
+        tuple: (parent_sitemap, URL)
+    """
+
+    base_url = get_base_url(url)
+    logging.info(f"Using base URL: {base_url}")
+
+    # 1. /sitemap.xml, then 2. every sitemap listed in robots.txt (parsed once per host)
+    root_sitemaps = [urljoin(base_url, "sitemap.xml")]
+    robots = get_robots(base_url)
+    if not robots.sitemaps:
+        logging.info("No sitemap URL found in robots.txt")
+    for sitemap_url in robots.sitemaps:
+        if sitemap_url not in root_sitemaps:
+            logging.info(f"Found sitemap URL in robots.txt: {sitemap_url}")
+            root_sitemaps.append(sitemap_url)
+
+    # Roots are marked visited up front so a sitemap index never traverses them a second time
+    visited_sitemaps = set(root_sitemaps)
+
+    if concurrent:
+        yield from _traverse_sitemaps_concurrent([], root_sitemaps, visited_sitemaps=visited_sitemaps, depth=-1,
+                                                 select=False, with_metadata=with_metadata)
+        return
+
+    for sitemap_url in root_sitemaps:
+        logging.info(f"Trying sitemap: {sitemap_url}")
+        try:
+            count = yield from _iter_root_sitemap(sitemap_url, visited_sitemaps, with_metadata)
+            if count:
+                logging.info(f"Found URLs in {sitemap_url}")
+            else:
+                logging.info(f"No URLs found in {sitemap_url} (but it exists).")
+        except SITEMAP_FETCH_ERRORS as e:
+            logging.info(f"Error accessing sitemap {sitemap_url}: {e}")
+
+
+def parse_sitemap_xml(xml_content, depth=0, max_depth=MAX_RECURSION_DEPTH, visited_sitemaps=None, parent_sitemap=None,
+                      with_metadata=False):
+    """
+    Parses an XML sitemap and extracts the URLs. Handles both standard sitemap and sitemap index files.
+    Prioritizes extracting 'en' URLs.
+
+    Args:
+        xml_content (bytes or file-like): The XML content of the sitemap, optionally gzipped.
+        depth (int): The current recursion depth.
+        max_depth (int): The maximum recursion depth allowed.
+        visited_sitemaps (set): A set to keep track of visited sitemap URLs.
+        parent_sitemap (str): URL of the parent sitemap.
+        with_metadata (bool): Return SitemapUrl tuples (see `iter_sitemap_urls`).
 
     Returns:
-        str: The base URL.
+        list: A list of tuples (parent_sitemap, URL) found in the sitemap.
     """
-    parsed_url = urlparse(url)
-    return f"{parsed_url.scheme}://{parsed_url.netloc}"
+    return list(iter_sitemap_tree(xml_content, depth=depth, max_depth=max_depth, visited_sitemaps=visited_sitemaps,
+                                  parent_sitemap=parent_sitemap, with_metadata=with_metadata))
 
 
-def extract_sitemap_urls(url):
+def iter_sitemap_tree(xml_content, depth=0, max_depth=MAX_RECURSION_DEPTH, visited_sitemaps=None, parent_sitemap=None,
+                      with_metadata=False):
     """
-    Extracts URLs from a sitemap.xml or a sitemap URL found in robots.txt and returns them.
+    Lazy version of `parse_sitemap_xml`: streams the URLs of a sitemap, then follows its
+    sub-sitemaps one at a time. Only one sitemap document is open at any moment.
 
     Args:
-        url (str): The base URL of the website.
+        xml_content (bytes or file-like): The XML content of the sitemap, optionally gzipped.
+        depth (int): The current recursion depth.
+        max_depth (int): The maximum recursion depth allowed.
+        visited_sitemaps (set): A set to keep track of visited sitemap URLs.
+        parent_sitemap (str): URL of the parent sitemap.
+        with_metadata (bool): Yield SitemapUrl tuples (see `iter_sitemap_urls`).
+
+    Yields:
+        tuple: (parent_sitemap, URL)
+    """
+
+    if visited_sitemaps is None:
+        visited_sitemaps = set()
+
+    if depth > max_depth:
+        logging.warning(f"Max recursion depth ({max_depth}) reached. Skipping this sitemap.")
+        return
+
+    sub_sitemaps = []
+    yield from iter_sitemap_urls(xml_content, parent_sitemap, sub_sitemaps, with_metadata=with_metadata)
+    yield from _iter_sub_sitemaps(sub_sitemaps, depth + 1, max_depth, visited_sitemaps, with_metadata)
+
+
+def parse_sitemap_xml_concurrent(xml_content, max_depth=MAX_RECURSION_DEPTH, visited_sitemaps=None, parent_sitemap=None,
+                                 max_workers=MAX_CONCURRENT_FETCHES, per_host_limit=MAX_FETCHES_PER_HOST,
+                                 with_metadata=False):
+    """
+    Concurrent counterpart of `parse_sitemap_xml`.
+
+    Sibling sub-sitemaps of a sitemap index are fetched and parsed in a bounded thread pool,
+    and the children of every finished sub-sitemap are scheduled as soon as it completes, so
+    the whole tree is discovered in roughly (depth x slowest fetch) instead of (number of
+    sub-sitemaps x average fetch). Results are reassembled in the same depth-first order the
+    sequential parser produces.
+
+    Args:
+        xml_content (bytes or file-like): The XML content of the root sitemap, optionally gzipped.
+        max_depth (int): The maximum recursion depth allowed.
+        visited_sitemaps (set): A set to keep track of visited sitemap URLs.
+        parent_sitemap (str): URL of the root sitemap.
+        max_workers (int): Size of the fetch thread pool.
+        per_host_limit (int): Maximum simultaneous fetches against one host.
+        with_metadata (bool): Return SitemapUrl tuples (see `iter_sitemap_urls`).
 
     Returns:
-        list: A list of tuples (parent_sitemap, URL) or None on error.
+        list: A list of tuples (parent_sitemap, URL) found in the sitemap tree.
     """
+    root_urls, root_sub_sitemaps = _parse_sitemap_document(xml_content, parent_sitemap, with_metadata)
+    return _traverse_sitemaps_concurrent(root_urls, root_sub_sitemaps, max_depth=max_depth,
+                                         visited_sitemaps=visited_sitemaps, max_workers=max_workers,
+                                         per_host_limit=per_host_limit, with_metadata=with_metadata)
 
-    base_url = get_base_url(url)
-    logging.info(f"Using base URL: {base_url}")
 
-    all_urls = []
-    visited_sitemaps = set()
-    parent_sitemap = None
+def iter_sitemap_urls(xml_content, parent_sitemap=None, sub_sitemaps=None, url_filter=None, with_metadata=False):
+    """
+    Single-pass, constant-memory parse of one sitemap document.
 
-    # 1. Try /sitemap.xml
-    try:
-        sitemap_url = urljoin(base_url, "sitemap.xml")
-        logging.info(f"Trying sitemap.xml: {sitemap_url}")
-        response = requests.get(sitemap_url, timeout=15)
-        response.raise_for_status()
-        parent_sitemap = sitemap_url
-
-        if response.status_code == 200:
-            all_urls.extend(parse_sitemap_xml(response.content, visited_sitemaps=visited_sitemaps, parent_sitemap=parent_sitemap))
-            if all_urls:
-                logging.info(f"Found URLs in sitemap.xml")
-            else:
-                logging.info(f"No URLs found in sitemap.xml (but it exists).")
-        else:
-            logging.warning(f"sitemap.xml returned status code: {response.status_code}")
+    'en' URLs are yielded as soon as they are read. Other URLs are only buffered until
+    the first 'en' URL shows up (after which they can never be returned), and are emitted
+    at the end when the sitemap turns out to have no 'en' URLs at all.
 
-    except requests.exceptions.RequestException as e:
-        logging.info(f"Error accessing sitemap.xml: {e}")
+    Args:
+        xml_content (bytes or file-like): The XML content of the sitemap, optionally gzipped.
+        parent_sitemap (str): URL of the sitemap being parsed.
+        sub_sitemaps (list): If given, sitemap URLs from a sitemap index are appended to it.
+        url_filter (UrlFilter): Rules applied to every URL. Defaults to SITEMAP_URL_FILTER.
+        with_metadata (bool): Yield SitemapUrl tuples that also carry the entry's lastmod,
+            changefreq, priority and hreflang alternates.
+
+    Yields:
+        tuple: (parent_sitemap, URL), or SitemapUrl with with_metadata=True.
+    """
+    url_filter = url_filter or SITEMAP_URL_FILTER
+    stats = FilterStats()
+    fallback_urls = []
+    en_count = 0
 
-    # 2. Try /robots.txt
     try:
-        robots_url = urljoin(base_url, "robots.txt")
-        logging.info(f"Trying robots.txt: {robots_url}")
-        response = requests.get(robots_url, timeout=15)
-        response.raise_for_status()
-
-        if response.status_code == 200:
-            # Save robots.txt content to a file
-            hostname = urlparse(base_url).netloc
-            filename = f"robots_{hostname}.txt"
-            filepath = os.path.join(ROBOTS_DIR, filename)
-
-            # Ensure the 'robots' directory exists
-            os.makedirs(ROBOTS_DIR, exist_ok=True)
-
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(response.text)
-            logging.info(f"robots.txt saved to {filepath}")
-
-            sitemap_from_robots = get_sitemap_url_from_robots(response.text)
-            if sitemap_from_robots:
-                if not urlparse(sitemap_from_robots).scheme:
-                    sitemap_from_robots = urljoin(base_url, sitemap_from_robots)
-
-                logging.info(f"Found sitemap URL in robots.txt: {sitemap_from_robots}")
-
-                if sitemap_from_robots in visited_sitemaps:
-                    logging.warning(f"Skipping already visited sitemap: {sitemap_from_robots}")
-                else:
-                    try:
-                        response = requests.get(sitemap_from_robots, timeout=15)
-                        response.raise_for_status()
-                        parent_sitemap = sitemap_from_robots
-
-                        if response.status_code == 200:
-                            all_urls.extend(parse_sitemap_xml(response.content, visited_sitemaps=visited_sitemaps, parent_sitemap=parent_sitemap))
-                            if all_urls:
-                                logging.info(f"Found URLs in sitemap from robots.txt")
-                            else:
-                                logging.info(f"No URLs found in sitemap from robots.txt (but it exists).")
-                        else:
-                            logging.warning(f"Sitemap from robots.txt returned status code: {response.status_code}")
-
-                    except requests.exceptions.RequestException as e:
-                        logging.error(f"Error accessing sitemap URL from robots.txt: {e}")
+        for entry in iter_sitemap_entries(xml_content):
+            if entry.kind == 'sitemap':
+                if sub_sitemaps is not None:
+                    sub_sitemaps.append(entry.loc)
+                continue
+
+            url_value = entry.loc
+            if not url_filter.accepts(url_value, stats):
+                continue
+            if with_metadata:
+                row = SitemapUrl(parent_sitemap, url_value, entry.lastmod, entry.changefreq, entry.priority,
+                                 entry.alternates)
             else:
-                logging.info("No sitemap URL found in robots.txt")
-        else:
-            logging.warning(f"robots.txt returned status code: {response.status_code}")
+                row = (parent_sitemap, url_value)
 
-    except requests.exceptions.RequestException as e:
-        logging.info(f"Error accessing robots.txt: {e}")
+            if url_filter.is_preferred(url_value):  # Check for 'en' in the URL
+                if not en_count:
+                    fallback_urls = None  # 'en' URLs win, stop buffering the rest
+                en_count += 1
+                yield row
+            elif fallback_urls is not None:
+                fallback_urls.append(row)
 
-    # Explicitly handle the case where the robots.txt fetch fails but we *still* have a sitemap URL from it
-    if not all_urls:
-        try:
-            robots_url = urljoin(base_url, "robots.txt")
-            response = requests.get(robots_url, timeout=15)
-            sitemap_from_robots = get_sitemap_url_from_robots(response.text)
-            if sitemap_from_robots:
-                try:
-                    response = requests.get(sitemap_from_robots, timeout=15)  # Add timeout
-                    response.raise_for_status()
-                    parent_sitemap = sitemap_from_robots
+    except ET.ParseError as e:
+        logging.error(f"Error parsing sitemap XML: {e}")
 
-                    if response.status_code == 200:
+    url_filter.stats.merge(stats)
+    logging.info(f"Total URL count in sitemap: {stats.seen}, parent {parent_sitemap}: {stats.summary()}")
 
-                        all_urls.extend(
-                            parse_sitemap_xml(response.content, visited_sitemaps=visited_sitemaps,
-                                              parent_sitemap=parent_sitemap))  # Accumulate URLs
-                        if all_urls:
-                            logging.info(f"Found URLs in sitemap from robots.txt")
-                        else:
-                            logging.info(f"No URLs found in sitemap from robots.txt (but it exists).")
-                    else:
-                        logging.warning(f"Sitemap from robots.txt returned status code: {response.status_code}")
+    # If we found any 'en' URLs, we used them. Otherwise, fall back to all URLs.
+    if en_count:
+        logging.info("Found 'en' URLs, processing only those.")
+    elif fallback_urls:
+        logging.info("No 'en' URLs found, processing all URLs.")
+        yield from fallback_urls
 
-                except requests.exceptions.RequestException as e:
-                    logging.error(f"Error accessing sitemap URL from robots.txt: {e}")
 
-        except:
-            logging.info("No sitemap found.")
-            return None
+def iter_sitemap_entries(xml_content):
+    """
+    Incrementally parses a sitemap with `iterparse`, clearing every element once it has
+    been read so memory stays flat regardless of the sitemap size. Gzipped sitemaps
+    (.xml.gz) are detected by their magic bytes and decompressed on the fly.
 
-    if not all_urls:
-        logging.info("No sitemap found.")
-        return None
+    Args:
+        xml_content (bytes or file-like): The raw sitemap, plain XML or gzip.
+
+    Yields:
+        SitemapEntry: kind 'url' for <url> entries and 'sitemap' for sitemap index entries,
+                      with the entry's <loc>, <lastmod>, <changefreq> and <priority> text
+                      and its <xhtml:link rel="alternate" hreflang=...> links. Only direct
+                      children of the entry in the sitemap namespace (or none) count, so the
+                      <image:loc> of an image sitemap is not taken for the page URL.
+    """
+    root = None
+    depth = 0  # Open elements; at an end event, 1 closes an entry and 2 one of its fields
+    fields = {}
+    for event, element in ET.iterparse(_open_xml_stream(xml_content), events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 2:
+            namespace, _, tag = element.tag.rpartition('}')
+            if namespace and f"{namespace}}}" != SITEMAP_NAMESPACE:
+                if tag == 'link':
+                    hreflang, href = element.get('hreflang'), element.get('href')
+                    if hreflang and href and element.get('rel', 'alternate') == 'alternate':
+                        fields.setdefault('alternates', []).append((hreflang.strip(), href.strip()))
+            elif (tag == 'loc' or tag in ENTRY_METADATA_TAGS) and fields.get(tag) is None:
+                fields[tag] = (element.text or '').strip() or None
+            continue
+        if depth != 1:
+            continue
+
+        tag = element.tag.rpartition('}')[2]
+        if tag in ('url', 'sitemap'):
+            if fields.get('loc'):
+                alternates = fields.get('alternates')
+                yield SitemapEntry(tag, fields['loc'], fields.get('lastmod'), fields.get('changefreq'),
+                                   fields.get('priority'), tuple(alternates) if alternates else None)
+            fields = {}
+            root.clear()  # Drop the processed entries
+
+
+def _open_xml_stream(xml_content):
+    """
+    Wraps sitemap content in a readable binary stream, decompressing gzip transparently.
 
-    return all_urls  # Return the list of URLs
+    Args:
+        xml_content (bytes or file-like): The raw sitemap.
+
+    Returns:
+        file-like: A binary stream of plain XML.
+    """
+    if isinstance(xml_content, (bytes, bytearray)):
+        xml_content = io.BytesIO(xml_content)
+
+    # Sniff the first bytes, then put them back in front of the stream
+    stream = _ReplayStream(xml_content.read(len(GZIP_MAGIC)), xml_content)
+    if stream.head == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=stream)
+    return stream
 
 
-def parse_sitemap_xml(xml_content, depth=0, max_depth=MAX_RECURSION_DEPTH, visited_sitemaps=None, parent_sitemap=None):
+class _ReplayStream:
+    """
+    Minimal read-only stream that returns already consumed leading bytes before
+    continuing with the wrapped stream. Unlike io.BufferedReader it does not care
+    whether the underlying HTTP response has already been marked closed.
     """
-    Parses an XML sitemap and extracts the URLs. Handles both standard sitemap and sitemap index files.
-    Prioritizes extracting 'en' URLs.
+
+    def __init__(self, head, stream):
+        self.head = head
+        self._pending = head
+        self._stream = stream
+
+    def read(self, size=-1):
+        if self._pending:
+            data, self._pending = self._pending, b''
+            return data
+        return self._stream.read(size)
+
+
+@contextmanager
+def _open_sitemap(sitemap_url):
+    """
+    Opens a sitemap through the on-disk HTTP cache. Unchanged sitemaps are revalidated
+    with a conditional request (or not requested at all while fresh) and streamed from
+    disk; .xml.gz payloads are decompressed later by `_open_xml_stream`.
 
     Args:
-        xml_content (bytes): The XML content of the sitemap.
-        depth (int): The current recursion depth.
+        sitemap_url (str): The sitemap to download.
+
+    Yields:
+        file-like: A binary stream of the sitemap body.
+    """
+    with cached_get(sitemap_url).open() as stream:
+        yield stream
+
+
+def _iter_root_sitemap(sitemap_url, visited_sitemaps, with_metadata=False):
+    """
+    Streams the URLs of a top-level sitemap and everything below it.
+
+    Args:
+        sitemap_url (str): The top-level sitemap URL.
+        visited_sitemaps (set): A set to keep track of visited sitemap URLs.
+        with_metadata (bool): Yield SitemapUrl tuples.
+
+    Yields:
+        tuple: (parent_sitemap, URL)
+
+    Returns:
+        int: The number of URLs yielded.
+    """
+    count = 0
+    sub_sitemaps = []
+    with _open_sitemap(sitemap_url) as stream:
+        for entry in iter_sitemap_urls(stream, sitemap_url, sub_sitemaps, with_metadata=with_metadata):
+            count += 1
+            yield entry
+
+    for entry in _iter_sub_sitemaps(sub_sitemaps, 1, MAX_RECURSION_DEPTH, visited_sitemaps, with_metadata):
+        count += 1
+        yield entry
+    return count
+
+
+def _iter_sub_sitemaps(sub_sitemaps, depth, max_depth, visited_sitemaps, with_metadata=False):
+    """
+    Sequentially streams the sub-sitemaps of an index, depth first.
+
+    Args:
+        sub_sitemaps (list): Sitemap URLs listed in a sitemap index.
+        depth (int): The recursion depth of the sub-sitemaps.
         max_depth (int): The maximum recursion depth allowed.
         visited_sitemaps (set): A set to keep track of visited sitemap URLs.
-        parent_sitemap (str): URL of the parent sitemap.
+        with_metadata (bool): Yield SitemapUrl tuples.
+
+    Yields:
+        tuple: (parent_sitemap, URL)
+    """
+    for sitemap_url in _select_sub_sitemaps(sub_sitemaps, visited_sitemaps):
+        if depth > max_depth:
+            logging.warning(f"Max recursion depth ({max_depth}) reached. Skipping sitemap: {sitemap_url}")
+            continue
+
+        nested_sitemaps = []
+        try:
+            logging.info(f"Accessing sub-sitemap: {sitemap_url}")
+            with _open_sitemap(sitemap_url) as stream:
+                visited_sitemaps.add(sitemap_url)  # Mark sitemap as visited BEFORE parsing
+                yield from iter_sitemap_urls(stream, sitemap_url, nested_sitemaps, with_metadata=with_metadata)
+        except SITEMAP_FETCH_ERRORS as e:
+            logging.error(f"Error accessing sub-sitemap {sitemap_url}: {e}")
+
+        # The sub-sitemap's own connection is closed before descending further
+        yield from _iter_sub_sitemaps(nested_sitemaps, depth + 1, max_depth, visited_sitemaps, with_metadata)
+
+
+def _traverse_sitemaps_concurrent(root_urls, sitemap_urls, max_depth=MAX_RECURSION_DEPTH, visited_sitemaps=None,
+                                  max_workers=MAX_CONCURRENT_FETCHES, per_host_limit=MAX_FETCHES_PER_HOST, depth=0,
+                                  select=True, with_metadata=False):
+    """
+    Fetches a tree of sitemaps in a thread pool.
+
+    Args:
+        root_urls (list): (parent_sitemap, URL) tuples already parsed at the top of the tree.
+        sitemap_urls (list): Sitemaps to fetch below that point.
+        max_depth (int): The maximum recursion depth allowed.
+        visited_sitemaps (set): A set to keep track of visited sitemap URLs.
+        max_workers (int): Size of the fetch thread pool.
+        per_host_limit (int): Maximum simultaneous fetches against one host.
+        depth (int): Recursion depth of the already parsed top of the tree (-1 for a set of root sitemaps).
+        select (bool): Apply the sub-sitemap rules (unvisited, 'en') to `sitemap_urls`.
+            Root sitemaps are fetched unconditionally.
+        with_metadata (bool): Return SitemapUrl tuples.
 
     Returns:
-        list: A list of tuples (parent_sitemap, URL) found in the sitemap.
+        list: A list of tuples (parent_sitemap, URL), in depth-first order.
     """
 
     if visited_sitemaps is None:
         visited_sitemaps = set()
 
-    if depth > max_depth:
-        logging.warning(f"Max recursion depth ({max_depth}) reached. Skipping this sitemap.")
-        return []
+    # Each node of the sitemap tree keeps its own URLs and the ids of its children,
+    # so the flattened output can follow the sequential (depth-first) order.
+    nodes = [{'urls': root_urls, 'children': []}]
+    host_limiter = HostLimiter(per_host_limit)
+    pending = {}
 
-    urls = []
-    try:
-        root = ET.fromstring(xml_content)
-
-        # Count total URL elements
-        total_url_count = len(root.findall('.//{*}url'))
-        logging.info(f"Total URL count in sitemap: {total_url_count}, parent {parent_sitemap}")
-
-        # First, extract all the 'en' URLs
-        en_urls = []
-        for element in root.findall('.//{*}url'):
-            loc_element = element.find('.//{*}loc')
-            if loc_element is not None:
-                url_value = loc_element.text
-
-                # Skip media URLs that are clustered together
-                if re.search(r"\.(jpg|jpeg|png|gif|webp)$", url_value):  # Basic media extension check
-                    logging.info(f"Skipping media URL: {url_value}")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+        def schedule(node_id, sub_sitemaps, depth, select=True):
+            selected = _select_sub_sitemaps(sub_sitemaps, visited_sitemaps) if select else sub_sitemaps
+            for sitemap_url in selected:
+                if depth + 1 > max_depth:
+                    logging.warning(f"Max recursion depth ({max_depth}) reached. Skipping sitemap: {sitemap_url}")
                     continue
 
-                # Skip if the urls clustered together, aka more than one slash
-                if url_value.count('/') > 50:
-                    logging.info(f"Skipping clustered media URL: {url_value}")
+                # Mark as visited when scheduling so no other branch fetches it again
+                visited_sitemaps.add(sitemap_url)
+                child_id = len(nodes)
+                nodes.append({'urls': [], 'children': []})
+                nodes[node_id]['children'].append(child_id)
+
+                logging.info(f"Accessing sitemap: {sitemap_url}")
+                future = executor.submit(_fetch_and_parse_sitemap, sitemap_url, host_limiter, with_metadata)
+                pending[future] = (child_id, sitemap_url, depth + 1)
+
+        schedule(0, sitemap_urls, depth, select)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                node_id, sitemap_url, depth = pending.pop(future)
+                try:
+                    urls, sub_sitemaps = future.result()
+                except SITEMAP_FETCH_ERRORS as e:
+                    logging.error(f"Error accessing sitemap {sitemap_url}: {e}")
                     continue
 
-                if 'en' in url_value:  # Check for 'en' in the URL
-                    en_urls.append((parent_sitemap, url_value))
+                nodes[node_id]['urls'] = urls
+                schedule(node_id, sub_sitemaps, depth)
 
-        # If we found any 'en' URLs, use them. Otherwise, fall back to all URLs.
-        if en_urls:
-            logging.info("Found 'en' URLs, processing only those.")
-            urls = en_urls
-        else:
-            logging.info("No 'en' URLs found, processing all URLs.")
-            for element in root.findall('.//{*}url'):  # handles standard sitemaps
-                loc_element = element.find('.//{*}loc')
-                if loc_element is not None:
-                    url_value = loc_element.text
+    all_urls = []
+    stack = [0]
+    while stack:
+        node = nodes[stack.pop()]
+        all_urls.extend(node['urls'])
+        stack.extend(reversed(node['children']))
 
-                    # Skip media URLs that are clustered together
-                    if re.search(r"\.(jpg|jpeg|png|gif|webp)$", url_value):  # Basic media extension check
-                        logging.info(f"Skipping media URL: {url_value}")
-                        continue
+    return all_urls
 
-                    # Skip if the urls clustered together, aka more than one slash
-                    if url_value.count('/') > 50:
-                        logging.info(f"Skipping clustered media URL: {url_value}")
-                        continue
 
-                    urls.append((parent_sitemap, url_value))  # Add Parent here
+def _fetch_and_parse_sitemap(sitemap_url, host_limiter, with_metadata=False):
+    """
+    Downloads one sub-sitemap (respecting the per-host limit) and parses it while streaming.
 
-        # Handle sitemap index files separately
+    Args:
+        sitemap_url (str): The sub-sitemap to fetch.
+        host_limiter (HostLimiter): Shared per-host concurrency limiter.
+        with_metadata (bool): Return SitemapUrl tuples.
 
-        for element in root.findall('.//{*}sitemap'):  # handles sitemapindex
+    Returns:
+        tuple: (list of (parent_sitemap, URL) tuples, list of nested sitemap URLs).
+    """
+    with host_limiter.limit(sitemap_url):
+        with _open_sitemap(sitemap_url) as stream:
+            return _parse_sitemap_document(stream, sitemap_url, with_metadata)
 
-            loc_element = element.find('.//{*}loc')
-            if loc_element is not None:
-                sitemap_url = loc_element.text  # Store the URL
 
-                # Check if we've already visited this sitemap URL
-                if sitemap_url in visited_sitemaps:
-                    logging.warning(f"Skipping already visited sitemap: {sitemap_url}")
-                    continue  # Skip to the next sitemap
+def _select_sub_sitemaps(sub_sitemaps, visited_sitemaps):
+    """
+    Yields the sub-sitemaps of an index that should be followed.
 
-                # 3rd Condition
-                if 'en' in sitemap_url:
-                    try:
-                        logging.info(f"Accessing sub-sitemap: {sitemap_url}")
-                        sub_response = requests.get(sitemap_url, timeout=15)  # Add timeout
-                        sub_response.raise_for_status()
+    Args:
+        sub_sitemaps (list): Sitemap URLs listed in a sitemap index.
+        visited_sitemaps (set): Sitemap URLs that were already fetched.
 
-                        visited_sitemaps.add(sitemap_url)  # Mark sitemap as visited BEFORE parsing
-                        urls.extend(parse_sitemap_xml(sub_response.content, depth=depth + 1, max_depth=max_depth,
-                                                      visited_sitemaps=visited_sitemaps, parent_sitemap=sitemap_url))  # recursive call if nested sitemap
-                    except requests.exceptions.RequestException as e:
-                        logging.error(f"Error accessing sub-sitemap {sitemap_url}: {e}")
-                else:
-                    logging.info(f"Skipping sitemap (no 'en'): {sitemap_url}")
+    Yields:
+        str: Sub-sitemap URLs that are unvisited and contain 'en'.
+    """
+    for sitemap_url in sub_sitemaps:
+        # Check if we've already visited this sitemap URL
+        if sitemap_url in visited_sitemaps:
+            logging.warning(f"Skipping already visited sitemap: {sitemap_url}")
+            continue  # Skip to the next sitemap
+
+        # 3rd Condition
+        if 'en' in sitemap_url:
+            yield sitemap_url
+        else:
+            logging.info(f"Skipping sitemap (no 'en'): {sitemap_url}")
 
 
-    except ET.ParseError as e:
-        logging.error(f"Error parsing sitemap XML: {e}")
+def _parse_sitemap_document(xml_content, parent_sitemap, with_metadata=False):
+    """
+    Parses a single sitemap document without following sub-sitemaps.
+
+    Args:
+        xml_content (bytes or file-like): The XML content of the sitemap, optionally gzipped.
+        parent_sitemap (str): URL of the sitemap being parsed.
+        with_metadata (bool): Return SitemapUrl tuples.
 
-    return urls
\ No newline at end of file
+    Returns:
+        tuple: (list of (parent_sitemap, URL) tuples, list of sub-sitemap URLs from a sitemap index).
+    """
+    sub_sitemaps = []
+    urls = list(iter_sitemap_urls(xml_content, parent_sitemap, sub_sitemaps, with_metadata=with_metadata))
+    return urls, sub_sitemaps
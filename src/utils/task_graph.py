@@ -0,0 +1,124 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+MAX_TASK_WORKERS = 8  # Tasks of a graph running at once (LLM calls and searches mostly wait on the network)
+
+
+class TaskGraph:
+    """
+    A set of named tasks with dependencies, run in a thread pool.
+
+    Every task starts as soon as the tasks it depends on have finished and receives
+    their results as positional arguments, so independent tasks (e.g. LLM calls that
+    only need the site keywords) overlap and the total run time is the critical path
+    of the graph rather than the sum of its tasks.
+
+    Tasks must be added after their dependencies (other tasks or declared inputs), which
+    also rules out cycles.
+    """
+
+    def __init__(self, inputs=()):
+        """
+        Args:
+            inputs (tuple): Names of the values passed to `run` that tasks can depend on.
+        """
+        self.inputs = tuple(inputs)
+        self._tasks = {}  # name -> (function, dependencies)
+
+    def add(self, name, function, dependencies=()):
+        """
+        Adds a task.
+
+        Args:
+            name (str): Task name, also the key of its result.
+            function (callable): Called with the results of `dependencies`, in order.
+            dependencies (tuple): Names of tasks already added, or inputs, this task needs.
+
+        Returns:
+            TaskGraph: The graph, so calls can be chained.
+
+        Raises:
+            ValueError: If the name is taken or a dependency is neither a task nor an input.
+        """
+        if name in self._tasks or name in self.inputs:
+            raise ValueError(f"Duplicate task: {name}")
+        missing = [dependency for dependency in dependencies
+                   if dependency not in self._tasks and dependency not in self.inputs]
+        if missing:
+            raise ValueError(f"Task {name} depends on unknown tasks or inputs: {', '.join(missing)}")
+        self._tasks[name] = (function, tuple(dependencies))
+        return self
+
+    def run(self, inputs=None, max_workers=MAX_TASK_WORKERS):
+        """
+        Runs every task of the graph.
+
+        If a task fails, no further task is started; the tasks already running are
+        waited for and the exception of the failed task is raised.
+
+        Args:
+            inputs (dict): Input name -> value, for every input declared by the graph.
+            max_workers (int): Size of the thread pool.
+
+        Returns:
+            dict: Task name (and input name) -> result.
+
+        Raises:
+            ValueError: If a declared input is missing.
+            RuntimeError: If some tasks could never run (which `add` should have prevented).
+        """
+        results = dict(inputs or {})
+        missing = [name for name in self.inputs if name not in results]
+        if missing:
+            raise ValueError(f"Missing task graph inputs: {', '.join(missing)}")
+
+        waiting = dict(self._tasks)
+        pending = {}
+        durations = {}
+        error = None
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+
+            def schedule():
+                for name, (function, dependencies) in list(waiting.items()):
+                    if all(dependency in results for dependency in dependencies):
+                        del waiting[name]
+                        arguments = [results[dependency] for dependency in dependencies]
+                        pending[executor.submit(_timed, function, arguments)] = name
+
+            schedule()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        results[name], durations[name] = future.result()
+                    except Exception as e:
+                        logging.error(f"Task {name} failed: {e}")
+                        if error is None:
+                            error = e
+                if error is None:
+                    schedule()
+
+        if error is not None:
+            raise error
+        if waiting:
+            raise RuntimeError(f"Task graph could not run: {', '.join(waiting)}")
+
+        elapsed = time.perf_counter() - start
+        slowest = ", ".join(f"{name} {seconds:.2f}s"
+                            for name, seconds in sorted(durations.items(), key=lambda item: -item[1])[:3])
+        logging.info(f"Task graph: {len(durations)} tasks in {elapsed:.2f}s "
+                     f"(sum of task times {sum(durations.values()):.2f}s; slowest: {slowest or 'none'})")
+        return results
+
+
+def _timed(function, arguments):
+    """Runs a task and returns (result, seconds taken)."""
+    start = time.perf_counter()
+    result = function(*arguments)
+    return result, time.perf_counter() - start
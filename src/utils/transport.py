@@ -0,0 +1,331 @@
+import logging
+import socket
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util import connection as urllib3_connection
+from urllib3.util.retry import Retry
+
+from src.utils.politeness import POLITENESS, THROTTLE_STATUSES
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+CONNECT_TIMEOUT = 5  # Seconds to establish a connection
+READ_TIMEOUT = 15  # Seconds between bytes once connected
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+POOL_CONNECTIONS = 64  # Hosts with a cached connection pool
+POOL_MAXSIZE = 16  # Keep-alive connections kept per host
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5  # Sleeps 0.5s, 1s, 2s between retries (Retry-After is honoured when sent)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RESPONSE_BYTES = 50 * 1024 * 1024  # Decoded body cap (the sitemap protocol limit)
+CHUNK_SIZE = 64 * 1024
+DNS_CACHE_TTL_SECONDS = 300
+
+# gzip/deflate always; br (and zstd) when urllib3 can decode them, i.e. Brotli/zstandard are installed
+ACCEPT_ENCODING = urllib3.util.make_headers(accept_encoding=True)['accept-encoding']
+
+
+class ResponseTooLarge(requests.exceptions.RequestException):
+    """Raised when a response body exceeds the transport's size cap."""
+
+
+class DnsCache:
+    """
+    Process-wide cache of getaddrinfo results, used by every connection urllib3 opens.
+
+    Keep-alive already avoids most lookups; the cache covers the new connections a pool
+    opens under concurrency and the retries against the same host.
+    """
+
+    def __init__(self, ttl=DNS_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._entries = {}  # (host, port) -> (expires at, addresses)
+        self._lock = threading.Lock()
+
+    def resolve(self, host, port):
+        """
+        Returns the addresses of a host, resolving it at most once per TTL.
+
+        Args:
+            host (str): Hostname or IP literal.
+            port (int): Port to connect to.
+
+        Returns:
+            list: Unique IP addresses, in resolver order.
+
+        Raises:
+            socket.gaierror: If the name cannot be resolved.
+        """
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                return entry[1]
+
+        family = urllib3_connection.allowed_gai_family()
+        results = socket.getaddrinfo(host, port, family, socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(sockaddr[0] for _, _, _, _, sockaddr in results))
+        with self._lock:
+            self._entries[key] = (now + self.ttl, addresses)
+        return addresses
+
+    def forget(self, host, port):
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+
+DNS_CACHE = DnsCache()
+_original_create_connection = urllib3_connection.create_connection
+_dns_cache_lock = threading.Lock()
+
+
+def _cached_create_connection(address, *args, **kwargs):
+    """urllib3 `create_connection` that resolves through DNS_CACHE and tries each address in turn."""
+    host, port = address
+    host = host.strip('[]')
+    error = None
+    for ip in DNS_CACHE.resolve(host, port):
+        try:
+            return _original_create_connection((ip, port), *args, **kwargs)
+        except OSError as e:
+            error = e
+    DNS_CACHE.forget(host, port)  # Re-resolve next time, the cached addresses may be stale
+    if error is not None:
+        raise error
+    raise OSError(f"No addresses found for {host}")
+
+
+def install_dns_cache():
+    """Routes urllib3's connection setup through DNS_CACHE. Idempotent."""
+    with _dns_cache_lock:
+        if urllib3_connection.create_connection is not _cached_create_connection:
+            urllib3_connection.create_connection = _cached_create_connection
+
+
+class Transport:
+    """
+    Shared HTTP transport for every fetcher outside Scrapy.
+
+    One `requests.Session` with a pooled adapter keeps connections alive per host,
+    negotiates compression, retries idempotent requests with exponential backoff,
+    applies one set of timeouts and caps the decoded size of every body. Request counts,
+    errors, bytes and latency are tracked per host (see `host_stats`). Every request waits
+    for its host's slot in the politeness scheduler and reports its outcome back to it.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_bytes=MAX_RESPONSE_BYTES, max_retries=MAX_RETRIES,
+                 backoff_factor=BACKOFF_FACTOR, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                 dns_cache=True, scheduler=POLITENESS):
+        """
+        Args:
+            timeout (float or tuple): Default (connect, read) timeout.
+            max_bytes (int): Default cap on the decoded body size.
+            max_retries (int): Retries for connection errors and RETRY_STATUSES.
+            backoff_factor (float): Exponential backoff factor between retries.
+            pool_connections (int): Number of per-host pools kept.
+            pool_maxsize (int): Keep-alive connections per host.
+            dns_cache (bool): Resolve hostnames through DNS_CACHE.
+            scheduler (PolitenessScheduler): Per-host rate control, or None to disable it.
+        """
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self.max_bytes = max_bytes
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+            respect_retry_after_header=True,
+            raise_on_status=False,  # The final response is returned and checked by the caller
+        )
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        if dns_cache:
+            install_dns_cache()
+
+        self._stats = defaultdict(lambda: {'requests': 0, 'errors': 0, 'bytes': 0, 'latency': 0.0, 'max_latency': 0.0})
+        self._stats_lock = threading.Lock()
+
+    def request(self, method, url, timeout=None, stream=False, max_bytes=None, **kwargs):
+        """
+        Sends a request through the shared session.
+
+        Args:
+            method (str): HTTP method.
+            url (str): The URL.
+            timeout (float or tuple): Overrides the default timeout.
+            stream (bool): Return before reading the body; read it with `iter_content`.
+            max_bytes (int): Overrides the body size cap.
+            **kwargs: Passed to `requests.Session.request` (headers, params, ...).
+
+        Returns:
+            requests.Response: The response (body already read unless `stream` is set).
+
+        Raises:
+            requests.exceptions.RequestException: On network errors, or ResponseTooLarge.
+        """
+        host = urlparse(url).netloc.lower()
+        if self.scheduler is not None:
+            self.scheduler.acquire(url)
+        started = time.monotonic()
+        try:
+            response = self.session.request(method, url, timeout=timeout or self.timeout, stream=True, **kwargs)
+            self._report(url, response, time.monotonic() - started)
+            if not stream:
+                try:
+                    response._content = b''.join(self.iter_content(response, max_bytes=max_bytes))
+                finally:
+                    response.close()
+        except requests.exceptions.RequestException as e:
+            self._record(host, started, error=True)
+            if self.scheduler is not None and not isinstance(e, (ResponseTooLarge, requests.exceptions.HTTPError)):
+                self.scheduler.record(url, error=True)
+            raise
+        self._record(host, started)
+        return response
+
+    def get(self, url, **kwargs):
+        """Shorthand for `request('GET', url, ...)`."""
+        return self.request('GET', url, **kwargs)
+
+    def iter_content(self, response, chunk_size=CHUNK_SIZE, max_bytes=None, incremental=False):
+        """
+        Yields the decoded body of a streamed response, enforcing the size cap.
+
+        Args:
+            response (requests.Response): A response from `request(..., stream=True)`.
+            chunk_size (int): Read size.
+            max_bytes (int): Overrides the body size cap.
+            incremental (bool): Yield whatever has arrived (at most `chunk_size`) instead of
+                waiting for full chunks, so a consumer can stop a slow body on time.
+
+        Yields:
+            bytes: Body chunks.
+
+        Raises:
+            ResponseTooLarge: As soon as the body grows past the cap.
+        """
+        max_bytes = max_bytes or self.max_bytes
+        declared = response.headers.get('Content-Length')
+        if declared and declared.isdigit() and 'Content-Encoding' not in response.headers and int(declared) > max_bytes:
+            raise ResponseTooLarge(f"{response.url} declares {declared} bytes (limit {max_bytes})")
+
+        size = 0
+        chunks = _iter_available(response, chunk_size) if incremental else response.iter_content(chunk_size)
+        try:
+            for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    response.close()
+                    raise ResponseTooLarge(f"{response.url} is larger than {max_bytes} bytes")
+                yield chunk
+        finally:
+            with self._stats_lock:
+                self._stats[urlparse(response.url).netloc.lower()]['bytes'] += size
+
+    def host_stats(self):
+        """
+        Returns the per-host counters.
+
+        Returns:
+            dict: Host -> {'requests', 'errors', 'bytes', 'avg_latency', 'max_latency',
+                  'connections' (sockets opened), 'pool_requests'}.
+        """
+        with self._stats_lock:
+            snapshot = {host: dict(stats) for host, stats in self._stats.items()}
+        for host, stats in snapshot.items():
+            stats['avg_latency'] = stats.pop('latency') / stats['requests'] if stats['requests'] else 0.0
+            stats['connections'], stats['pool_requests'] = self._pool_counters(host)
+        return snapshot
+
+    def log_stats(self):
+        """Logs one line of counters per host."""
+        for host, stats in sorted(self.host_stats().items()):
+            logging.info(f"{host}: {stats['requests']} requests ({stats['errors']} errors) over "
+                         f"{stats['connections']} connections, {stats['bytes']} bytes, "
+                         f"avg {stats['avg_latency'] * 1000:.0f} ms, max {stats['max_latency'] * 1000:.0f} ms")
+
+    def close(self):
+        self.session.close()
+
+    def _report(self, url, response, latency):
+        """Reports a response, and any throttled attempts urllib3 retried before it, to the scheduler."""
+        if self.scheduler is None:
+            return
+        retries = getattr(response.raw, 'retries', None)
+        for attempt in (retries.history if retries else ()):
+            if attempt.status in THROTTLE_STATUSES:
+                self.scheduler.record(url, status=attempt.status)
+            elif attempt.status is None and attempt.error is not None:
+                self.scheduler.record(url, error=True)
+        self.scheduler.record(url, status=response.status_code, latency=latency,
+                              retry_after=response.headers.get('Retry-After'))
+
+    def _record(self, host, started, error=False):
+        elapsed = time.monotonic() - started
+        with self._stats_lock:
+            stats = self._stats[host]
+            stats['requests'] += 1
+            stats['errors'] += int(error)
+            stats['latency'] += elapsed
+            stats['max_latency'] = max(stats['max_latency'], elapsed)
+
+    def _pool_counters(self, host):
+        """Returns (connections opened, requests sent) from the host's urllib3 pools."""
+        connections = requests_sent = 0
+        for scheme, default_port in (('http', 80), ('https', 443)):
+            parsed = urlparse(f"{scheme}://{host}")
+            target = (scheme, parsed.hostname, parsed.port or default_port)
+            poolmanager = self.session.get_adapter(f"{scheme}://{host}").poolmanager
+            for key in list(poolmanager.pools.keys()):
+                if (key.key_scheme, key.key_host, key.key_port) != target:
+                    continue
+                pool = poolmanager.pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+                    requests_sent += pool.num_requests
+        return connections, requests_sent
+
+
+def _iter_available(response, chunk_size):
+    """Yields decoded body data as it arrives (urllib3 read1), with requests' exception types."""
+    while True:
+        try:
+            chunk = response.raw.read1(chunk_size, decode_content=True)
+        except urllib3.exceptions.ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e)
+        except urllib3.exceptions.DecodeError as e:
+            raise requests.exceptions.ContentDecodingError(e)
+        except urllib3.exceptions.ReadTimeoutError as e:
+            raise requests.exceptions.ConnectionError(e)
+        if not chunk:
+            response._content_consumed = True  # Fully read, close() can keep the connection alive
+            return
+        yield chunk
+
+
+TRANSPORT = Transport()
+
+
+def fetch(url, **kwargs):
+    """
+    GETs a URL through the shared transport.
+
+    Args:
+        url (str): The URL.
+        **kwargs: See `Transport.request`.
+
+    Returns:
+        requests.Response: The response.
+    """
+    return TRANSPORT.get(url, **kwargs)
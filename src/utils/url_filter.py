@@ -0,0 +1,193 @@
+import re
+import logging
+import threading
+import time
+from collections import Counter
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+MEDIA_EXTENSIONS = ("jpg", "jpeg", "png", "gif", "webp")  # Media files never worth crawling for meta tags
+MAX_URL_SLASHES = 50  # URLs with more slashes than this are clustered media paths
+
+# Declarative default rule set used for sitemap URLs. Every key maps to a UrlFilter argument.
+DEFAULT_RULES = {
+    "exclude_extensions": MEDIA_EXTENSIONS,
+    "max_slashes": MAX_URL_SLASHES,
+    "exclude_patterns": (),
+    "include_patterns": (),
+    "allowed_countries": None,  # e.g. {"US", "IN"} to drop '-en-<country>' pages for other countries
+    "preferred_locale": "en",
+}
+
+COUNTRY_CODE_PATTERN = re.compile(r"-en-([a-z]{2})", re.IGNORECASE)
+
+
+class FilterStats:
+    """
+    Running counters for a UrlFilter: URLs seen and kept, hits per rule and time spent filtering.
+    """
+
+    def __init__(self):
+        self.seen = 0
+        self.kept = 0
+        self.hits = Counter()
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def dropped(self):
+        return self.seen - self.kept
+
+    def merge(self, other):
+        """Adds the counters of another FilterStats (thread-safe)."""
+        with self._lock:
+            self.seen += other.seen
+            self.kept += other.kept
+            self.hits.update(other.hits)
+            self.elapsed += other.elapsed
+
+    def summary(self):
+        """Returns a one-line, human readable description of the counters."""
+        hits = ", ".join(f"{rule}={count}" for rule, count in self.hits.most_common()) or "none"
+        return (f"kept {self.kept}/{self.seen} URLs, dropped by rule: {hits}, "
+                f"filtering took {self.elapsed * 1000:.1f} ms")
+
+
+class UrlFilter:
+    """
+    Compiled URL filter.
+
+    All exclusion rules (extension blocklist, slash limit, country rule and custom
+    exclude patterns) are compiled into a single alternation of named groups, so each
+    URL is scanned once and the name of the matching group tells which rule dropped it.
+    Include patterns are compiled into a second combined pattern.
+    """
+
+    def __init__(self, exclude_extensions=MEDIA_EXTENSIONS, max_slashes=MAX_URL_SLASHES, exclude_patterns=(),
+                 include_patterns=(), allowed_countries=None, preferred_locale="en"):
+        """
+        Args:
+            exclude_extensions (iterable): File extensions (without dot) to drop.
+            max_slashes (int): Drop URLs containing more slashes than this. None disables the rule.
+            exclude_patterns (iterable): Regular expressions; URLs matching any of them are dropped.
+            include_patterns (iterable): Regular expressions; if given, URLs must match one of them.
+            allowed_countries (iterable): Country codes allowed in '-en-<country>' URLs. None disables the rule.
+            preferred_locale (str): Locale marker used by `is_preferred` (substring match on the URL).
+        """
+        rules = []
+        if exclude_extensions:
+            extensions = "|".join(re.escape(ext.lstrip(".")) for ext in exclude_extensions)
+            rules.append(("extension", rf"(?i:\.(?:{extensions}))$"))
+        if max_slashes is not None:
+            rules.append(("slashes", rf"^(?:[^/]*/){{{max_slashes + 1}}}"))
+        if allowed_countries is not None:
+            countries = "|".join(sorted(re.escape(code.lower()) for code in allowed_countries))
+            rules.append(("country", rf"(?i:-en-(?!(?:{countries}))[a-z]{{2}})"))
+        for index, pattern in enumerate(exclude_patterns):
+            rules.append((f"exclude_{index}", pattern))
+
+        self.rule_patterns = dict(rules)
+        self._exclude = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in rules)) if rules else None
+        self._include = re.compile("|".join(f"(?:{pattern})" for pattern in include_patterns)) if include_patterns else None
+        self._preferred = re.compile(re.escape(preferred_locale)) if preferred_locale else None
+        self.stats = FilterStats()
+
+    @classmethod
+    def from_rules(cls, rules=None):
+        """
+        Builds a filter from a declarative rule dictionary (see DEFAULT_RULES).
+
+        Args:
+            rules (dict): Overrides for DEFAULT_RULES.
+
+        Returns:
+            UrlFilter: The compiled filter.
+        """
+        merged = dict(DEFAULT_RULES)
+        merged.update(rules or {})
+        return cls(**merged)
+
+    def classify(self, url):
+        """
+        Returns the name of the rule that drops the URL, or None if the URL is kept.
+
+        Args:
+            url (str): The URL to check.
+
+        Returns:
+            str: The rule name, or None.
+        """
+        if self._exclude is not None:
+            match = self._exclude.search(url)
+            if match:
+                return match.lastgroup
+        if self._include is not None and not self._include.search(url):
+            return "include"
+        return None
+
+    def is_preferred(self, url):
+        """
+        Tells whether the URL carries the preferred locale marker.
+
+        Args:
+            url (str): The URL to check.
+
+        Returns:
+            bool: True if the URL matches the preferred locale.
+        """
+        return self._preferred is None or self._preferred.search(url) is not None
+
+    def accepts(self, url, stats=None):
+        """
+        Checks one URL against every rule, counting the hit when it is dropped.
+
+        Args:
+            url (str): The URL to check.
+            stats (FilterStats): Counters to update. Defaults to the filter's own stats.
+
+        Returns:
+            bool: True if the URL is kept.
+        """
+        stats = stats if stats is not None else self.stats
+        started = time.perf_counter()
+        rule = self.classify(url)
+        stats.elapsed += time.perf_counter() - started
+        stats.seen += 1
+        if rule is None:
+            stats.kept += 1
+            return True
+        stats.hits[rule] += 1
+        return False
+
+    def filter(self, urls, stats=None):
+        """
+        Lazily yields the URLs that pass every rule, counting hits per rule.
+
+        Args:
+            urls (iterable): The URLs to filter.
+            stats (FilterStats): Counters to update. Defaults to the filter's own stats.
+
+        Yields:
+            str: The kept URLs.
+        """
+        stats = stats if stats is not None else self.stats
+        accepts = self.accepts
+        for url in urls:
+            if accepts(url, stats):
+                yield url
+
+
+def extract_country_code(url):
+    """
+    Extracts the country code from a URL if it matches the pattern '-en-<country>'
+
+    Args:
+        url (str): The URL to extract the country code from.
+
+    Returns:
+        str: The country code in uppercase, or None if not found.
+    """
+    match = COUNTRY_CODE_PATTERN.search(url)
+    if match:
+        return match.group(1).upper()
+    return None
@@ -0,0 +1,212 @@
+import heapq
+import logging
+import math
+import random
+from collections import namedtuple
+from urllib.parse import urlparse
+
+from src.utils.locale_index import parse_locale
+from src.utils.records import read_url_records, write_url_records
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+CRAWL_BUDGET_PAGES = 500  # Default maximum number of pages handed to the spider
+ESTIMATED_SECONDS_PER_PAGE = 0.25  # Average crawl cost of one page, used to turn a time budget into a page count
+DEFAULT_PRIORITY = 0.5  # Sitemap protocol default for entries without <priority>
+MIN_PRIORITY = 0.01  # Keeps priority-0 pages sampleable
+CONFIDENCE_Z = 1.96  # 95% confidence for the reported margin of error
+
+# Outcome of a sampling run. `strata` maps (parent sitemap, path prefix) -> (URLs, sampled);
+# `margin_of_error` is the worst-case 95% error of a proportion estimated from the sample.
+SampleReport = namedtuple('SampleReport', ['total', 'sampled', 'budget', 'strata', 'coverage', 'margin_of_error'])
+
+
+def budget_pages(max_pages=CRAWL_BUDGET_PAGES, max_seconds=None, seconds_per_page=ESTIMATED_SECONDS_PER_PAGE):
+    """
+    Turns a page and/or time budget into a page count.
+
+    Args:
+        max_pages (int): Maximum number of pages, or None for no page limit.
+        max_seconds (float): Maximum crawl time, or None for no time limit.
+        seconds_per_page (float): Estimated crawl cost of one page.
+
+    Returns:
+        int: The page budget, or None if neither limit is set.
+    """
+    limits = []
+    if max_pages is not None:
+        limits.append(int(max_pages))
+    if max_seconds is not None:
+        limits.append(int(max_seconds / seconds_per_page))
+    return max(1, min(limits)) if limits else None
+
+
+def stratum_key(parent_sitemap, url):
+    """
+    Returns the stratum of a URL: its parent sitemap and the section of its path.
+
+    The section is the first path segment after a locale segment (/en/, /en-us/), if
+    the URL has one. Pages directly below the root (/about, /contact/) share the ''
+    section, so a site without sections does not get one stratum per page.
+
+    Args:
+        parent_sitemap (str): The sitemap the URL was listed in.
+        url (str): The page URL.
+
+    Returns:
+        tuple: (parent_sitemap, path prefix)
+    """
+    segments = urlparse(url).path.strip('/').split('/')
+    if len(segments) > 1 and parse_locale(segments[0]):
+        segments = segments[1:]
+    return parent_sitemap or '', segments[0] if len(segments) > 1 else ''
+
+
+def sample_urls(rows, budget, sitemap_metadata=None, seed=None):
+    """
+    Picks a stratified sample of at most `budget` rows.
+
+    The budget is split over strata (parent sitemap x path prefix) in proportion to their
+    size, by largest remainder, with every stratum getting at least one page while the
+    budget allows it. When there are more strata than pages in the budget, the strata
+    that get a page are themselves drawn at random, weighted by their size and priority.
+    Within a stratum pages are drawn without replacement, weighted by their sitemap
+    <priority> (A-Res weighted reservoir keys).
+
+    Args:
+        rows (list): SitemapUrl records (the crawl input).
+        budget (int): Maximum number of rows to keep, or None to keep everything.
+        sitemap_metadata (dict): URL -> SitemapUrl; its priority weights the draw.
+        seed (int): Seed for a reproducible sample.
+
+    Returns:
+        tuple: (sampled rows in input order, SampleReport)
+    """
+    sitemap_metadata = sitemap_metadata or {}
+    strata = {}
+    for index, row in enumerate(rows):
+        strata.setdefault(stratum_key(row.parent_sitemap, row.url), []).append(index)
+
+    total = len(rows)
+    if budget is None or budget >= total:
+        report = _report(total, total, budget, {key: (len(members), len(members)) for key, members in strata.items()})
+        return list(rows), report
+
+    rng = random.Random(seed)
+    allocation = _allocate(strata, budget, rng, rows, sitemap_metadata)
+    chosen = []
+    for key, members in strata.items():
+        count = allocation.get(key, 0)
+        if not count:
+            continue
+        if count >= len(members):
+            chosen.extend(members)
+            continue
+        # A-Res: key u^(1/w), keep the `count` largest
+        keyed = ((rng.random() ** (1.0 / _weight(rows[index].url, sitemap_metadata)), index) for index in members)
+        chosen.extend(index for _, index in heapq.nlargest(count, keyed))
+
+    chosen.sort()
+    report = _report(total, len(chosen), budget,
+                     {key: (len(members), allocation.get(key, 0)) for key, members in strata.items()})
+    return [rows[index] for index in chosen], report
+
+
+def sample_records(records, max_pages=CRAWL_BUDGET_PAGES, max_seconds=None, sitemap_metadata=None, seed=None):
+    """
+    Samples the crawl input down to a page and/or time budget.
+
+    Args:
+        records (list): The filtered crawl input (SitemapUrl records).
+        max_pages (int): Page budget (None for no page limit).
+        max_seconds (float): Time budget in seconds (None for no time limit).
+        sitemap_metadata (dict): URL -> SitemapUrl, used for priority weighting. Defaults
+            to the records themselves.
+        seed (int): Seed for a reproducible sample.
+
+    Returns:
+        tuple: (sampled records, SampleReport)
+    """
+    if sitemap_metadata is None:
+        sitemap_metadata = {record.url: record for record in records}
+    sampled_records, report = sample_urls(records, budget_pages(max_pages, max_seconds), sitemap_metadata, seed)
+    logging.info(f"URL sample: {format_report(report)}")
+    return sampled_records, report
+
+
+def sample_csv_data(csv_data, max_pages=CRAWL_BUDGET_PAGES, max_seconds=None, sitemap_metadata=None, seed=None):
+    """
+    Applies `sample_records` to CSV data with 'Parent Sitemap' and 'URL' columns.
+
+    Args:
+        csv_data (str): The filtered crawl input.
+        max_pages (int): Page budget (None for no page limit).
+        max_seconds (float): Time budget in seconds (None for no time limit).
+        sitemap_metadata (dict): URL -> SitemapUrl, used for priority weighting.
+        seed (int): Seed for a reproducible sample.
+
+    Returns:
+        tuple: (sampled CSV data, SampleReport)
+    """
+    sampled_records, report = sample_records(read_url_records(csv_data), max_pages, max_seconds,
+                                             sitemap_metadata or {}, seed)
+    return write_url_records(sampled_records), report
+
+
+def format_report(report):
+    """
+    Returns a one-line, human readable description of a SampleReport.
+
+    Args:
+        report (SampleReport): The report to describe.
+
+    Returns:
+        str: e.g. 'crawled 500 of 120000 URLs (0.4%) from 37 strata, margin of error +/-4.4%'
+    """
+    sampled_strata = sum(1 for _, sampled in report.strata.values() if sampled)
+    return (f"crawled {report.sampled} of {report.total} URLs ({report.coverage:.1%}) from "
+            f"{sampled_strata}/{len(report.strata)} strata, margin of error +/-{report.margin_of_error:.1%}")
+
+
+def _allocate(strata, budget, rng, rows, sitemap_metadata):
+    """Splits the budget over strata: at least one page each, the rest proportionally."""
+    if len(strata) >= budget:
+        # Not every stratum gets a page: draw `budget` of them, weighted by their total priority (A-Res)
+        keyed = ((rng.random() ** (1.0 / sum(_weight(rows[index].url, sitemap_metadata) for index in members)), key)
+                 for key, members in strata.items())
+        return {key: 1 for _, key in heapq.nlargest(budget, keyed)}
+
+    allocation = {key: 1 for key in strata}
+    remaining = budget - len(strata)
+
+    # Largest remainder over the pages that are still unallocated in each stratum
+    spare = {key: len(strata[key]) - allocation.get(key, 0) for key in strata}
+    spare_total = sum(spare.values())
+    quotas = {key: remaining * size / spare_total for key, size in spare.items()}
+    for key, quota in quotas.items():
+        allocation[key] = allocation.get(key, 0) + int(quota)
+    leftover = budget - sum(allocation.values())
+    for key in sorted(quotas, key=lambda key: quotas[key] - int(quotas[key]), reverse=True)[:leftover]:
+        allocation[key] += 1
+    return allocation
+
+
+def _weight(url, sitemap_metadata):
+    """Sampling weight of a URL: its sitemap <priority>, or DEFAULT_PRIORITY."""
+    entry = sitemap_metadata.get(url)
+    try:
+        priority = float(entry.priority) if entry and entry.priority else DEFAULT_PRIORITY
+    except ValueError:
+        priority = DEFAULT_PRIORITY
+    return max(priority, MIN_PRIORITY)
+
+
+def _report(total, sampled, budget, strata):
+    """Builds a SampleReport, with the finite-population-corrected margin of error for p = 0.5."""
+    if not sampled or total <= 1:
+        margin = 0.0 if sampled == total else 1.0
+    else:
+        correction = (total - sampled) / (total - 1)
+        margin = CONFIDENCE_Z * math.sqrt(0.25 / sampled * correction)
+    coverage = sampled / total if total else 1.0
+    return SampleReport(total, sampled, budget, strata, coverage, margin)
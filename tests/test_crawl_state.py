@@ -0,0 +1,79 @@
+from src.utils.crawl_state import CrawlState
+from src.utils.records import SitemapUrl
+
+SITEMAP = 'https://example.com/sitemap.xml'
+DAY = 24 * 3600
+NOW = 1700000000.0
+
+
+def _item(url, etag='"v1"'):
+    return {'URL': url, 'Parent Sitemap': SITEMAP, 'Topic': 'Shoes', 'ETag': etag,
+            'Last-Modified': 'Tue, 14 Nov 2023 22:13:20 GMT'}
+
+
+def _crawled(tmp_path, metadata):
+    state = CrawlState(str(tmp_path / 'site.sqlite3'))
+    state.record([_item(url) for url in metadata], metadata, now=NOW)
+    return state
+
+
+def test_new_pages_are_fetched(tmp_path):
+    state = CrawlState(str(tmp_path / 'site.sqlite3'))
+    rows = [SitemapUrl(SITEMAP, 'https://example.com/a')]
+    plan = state.plan(rows, now=NOW)
+    assert plan.fetch_rows == rows
+    assert plan.reused_items == [] and plan.validators == {}
+
+
+def test_unchanged_lastmod_reuses_the_item(tmp_path):
+    url = 'https://example.com/a'
+    metadata = {url: SitemapUrl(SITEMAP, url, lastmod='2023-11-01')}
+    state = _crawled(tmp_path, metadata)
+
+    plan = state.plan(list(metadata.values()), metadata, now=NOW + 30 * DAY)
+    assert plan.fetch_rows == []
+    assert [item['URL'] for item in plan.reused_items] == [url]
+    assert plan.reused_items[0]['Topic'] == 'Shoes'
+
+
+def test_changed_lastmod_fetches_unconditionally(tmp_path):
+    url = 'https://example.com/a'
+    state = _crawled(tmp_path, {url: SitemapUrl(SITEMAP, url, lastmod='2023-11-01')})
+
+    metadata = {url: SitemapUrl(SITEMAP, url, lastmod='2023-11-20')}
+    plan = state.plan(list(metadata.values()), metadata, now=NOW + DAY)
+    assert [row.url for row in plan.fetch_rows] == [url]
+    assert plan.validators == {}
+
+
+def test_changefreq_drives_conditional_revalidation(tmp_path):
+    daily, archived = 'https://example.com/daily', 'https://example.com/archived'
+    metadata = {daily: SitemapUrl(SITEMAP, daily, changefreq='daily'),
+                archived: SitemapUrl(SITEMAP, archived, changefreq='never')}
+    state = _crawled(tmp_path, metadata)
+
+    plan = state.plan(list(metadata.values()), metadata, now=NOW + DAY / 2)
+    assert plan.fetch_rows == []
+
+    plan = state.plan(list(metadata.values()), metadata, now=NOW + 2 * DAY)
+    assert [row.url for row in plan.fetch_rows] == [daily]
+    assert plan.validators[daily]['etag'] == '"v1"'
+    assert [item['URL'] for item in plan.reused_items] == [archived]
+
+
+def test_pages_without_hints_use_max_age(tmp_path):
+    url = 'https://example.com/a'
+    state = _crawled(tmp_path, {url: SitemapUrl(SITEMAP, url)})
+    rows = [SitemapUrl(SITEMAP, url)]
+    assert state.plan(rows, now=NOW + 6 * DAY).fetch_rows == []
+    assert state.plan(rows, now=NOW + 8 * DAY).fetch_rows == rows
+
+
+def test_record_overwrites_previous_state(tmp_path):
+    url = 'https://example.com/a'
+    state = _crawled(tmp_path, {url: None})
+    state.record([_item(url, etag='"v2"')], now=NOW + DAY)
+    stored = state.get(url)
+    assert stored['etag'] == '"v2"' and stored['fetched_at'] == NOW + DAY
+    assert stored['item']['URL'] == url
+    assert state.get('https://example.com/missing') is None
@@ -0,0 +1,101 @@
+import os
+import signal
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.spiders.crawl_worker import CrawlWorkerPool
+from src.utils.records import SitemapUrl
+
+PAGE = b"<html><head><title>Shoes</title><meta name='keywords' content='red shoes'></head><body></body></html>"
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        Handler.requests_seen.append(self.path)
+        time.sleep(2)  # Long enough to kill the worker mid-crawl
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.end_headers()
+        try:
+            self.wfile.write(PAGE)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.requests_seen = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def pool():
+    pool = CrawlWorkerPool(num_workers=1)
+    yield pool
+    pool.shutdown(timeout=5)
+
+
+def _submit(pool, server):
+    return pool.submit(records=[SitemapUrl('s', f"{server}/slow")], crawl_delays={server: None})
+
+
+def _kill_worker_after_request(pool, requests, timeout=60):
+    """Kills the worker once the crawl has made its `requests`-th request, while it waits for the page."""
+    deadline = time.monotonic() + timeout
+    while len(Handler.requests_seen) < requests:
+        assert time.monotonic() < deadline, "The crawl job never started"
+        time.sleep(0.05)
+    os.kill(pool._processes[0].pid, signal.SIGKILL)
+
+
+def test_job_of_a_dead_worker_is_requeued(pool, server):
+    future = _submit(pool, server)
+    _kill_worker_after_request(pool, 1)
+    result = future.result(timeout=60)
+    assert [item['URL'] for item in result['items']] == [f"{server}/slow"]
+    assert Handler.requests_seen == ['/slow', '/slow']
+
+
+def test_job_fails_after_killing_its_workers(pool, server):
+    future = _submit(pool, server)
+    _kill_worker_after_request(pool, 1)
+    _kill_worker_after_request(pool, 2)
+    with pytest.raises(RuntimeError, match="died while running job"):
+        future.result(timeout=30)
+
+    # The replacement worker still runs new jobs
+    Handler.requests_seen = []
+    assert len(_submit(pool, server).result(timeout=60)['items']) == 1
+
+
+def test_workers_do_not_import_the_parents_script(server, tmp_path, monkeypatch):
+    marker = tmp_path / 'imported'
+    script = tmp_path / 'heavy_app.py'
+    script.write_text(f"open({str(marker)!r}, 'w').close()\n")
+    main_module = types.ModuleType('__main__')
+    main_module.__file__ = str(script)
+    main_module.__spec__ = None
+    monkeypatch.setitem(sys.modules, '__main__', main_module)
+
+    pool = CrawlWorkerPool(num_workers=1)
+    try:
+        assert len(_submit(pool, server).result(timeout=60)['items']) == 1
+    finally:
+        pool.shutdown(timeout=5)
+    assert not marker.exists()
+    assert sys.modules['__main__'] is main_module
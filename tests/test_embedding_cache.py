@@ -0,0 +1,121 @@
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip('sentence_transformers')
+
+from src.similarity import embedding_cache  # noqa: E402
+from src.similarity.embedding_cache import EmbeddingCache  # noqa: E402
+
+
+def _vectors(count, dim=4, start=0):
+    return np.arange(start, start + count * dim, dtype=np.float32).reshape(count, dim)
+
+
+def test_lookups_return_copies(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_vectors=2)
+    cache.put_many(['a', 'b'], _vectors(2))
+    a, missing, b = cache.get_many(['a', 'c', 'b'])
+    assert missing is None
+    assert a.tolist() == [0, 1, 2, 3] and b.tolist() == [4, 5, 6, 7]
+
+    cache.put_many(['c', 'd'], _vectors(2, start=100))  # Overwrites both slots
+    assert a.tolist() == [0, 1, 2, 3]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_lookups_do_not_write_the_index(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put_many(['a'], _vectors(1))
+
+    # Another process holds the write lock: lookups still succeed
+    other = sqlite3.connect(cache.index_path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        for _ in range(3):
+            assert cache.get('a') is not None
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+
+
+def test_locked_index_defers_lru_times(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, 'TOUCH_FLUSH_INTERVAL', 0)
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put_many(['a'], _vectors(1))
+    stored = cache._connection.execute("SELECT last_used FROM entries").fetchone()[0]
+
+    other = sqlite3.connect(cache.index_path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        assert cache.get('a') is not None
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+    assert cache._connection.execute("SELECT last_used FROM entries").fetchone()[0] == stored
+
+    cache.get('a')
+    assert cache._connection.execute("SELECT last_used FROM entries").fetchone()[0] > stored
+
+
+def test_eviction_uses_pending_lookups(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_vectors=2)
+    cache.put_many(['a'], _vectors(1))
+    cache.put_many(['b'], _vectors(1, start=10))
+    cache.get('a')  # Kept in memory only, written by the next put
+    cache.put_many(['c'], _vectors(1, start=20))
+    assert cache.get('b') is None
+    assert cache.get('a').tolist() == [0, 1, 2, 3]
+
+
+def test_concurrent_readers(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    keys = [f"key-{i}" for i in range(50)]
+    cache.put_many(keys, _vectors(50))
+    readers = [EmbeddingCache(str(tmp_path)) for _ in range(4)]
+    errors = []
+
+    def read(reader):
+        try:
+            for _ in range(50):
+                assert all(vector is not None for vector in reader.get_many(keys))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=read, args=(reader,)) for reader in readers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+
+def test_slot_reused_by_another_process_is_a_miss(tmp_path, monkeypatch):
+    cache = EmbeddingCache(str(tmp_path), max_vectors=1)
+    cache.put_many(['a'], _vectors(1))
+    other = EmbeddingCache(str(tmp_path), max_vectors=1)
+    copy = EmbeddingCache._read
+
+    def overwritten_read(self, found):
+        other.put_many(['b'], _vectors(1, start=100))  # Evicts 'a' after it was looked up
+        return copy(self, found)
+
+    monkeypatch.setattr(EmbeddingCache, '_read', overwritten_read)
+    assert cache.get('a') is None
+    monkeypatch.undo()
+    assert cache.get('b').tolist() == [100, 101, 102, 103]
+
+
+def test_rows_without_tags_are_misses(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put_many(['a'], _vectors(1))
+    cache.close()
+    os.remove(cache.tags_path)  # A cache written before rows were tagged
+
+    cache = EmbeddingCache(str(tmp_path))
+    assert cache.get('a') is None
+    cache.put_many(['b'], _vectors(1, start=100))
+    assert cache.get('b').tolist() == [100, 101, 102, 103]
@@ -0,0 +1,59 @@
+import csv
+import io
+
+import pytest
+
+pytest.importorskip('nltk')
+
+from src.scraping.get_keywords import (FIELD_WEIGHTS, count_keywords, extract_keywords,  # noqa: E402
+                                       top_keywords_from_csv, top_keywords_from_rows)
+
+TEXT = "Red Shoes, running shoes; the trail-running shoes"
+
+
+def _rows(count):
+    colours = ['red', 'blue', 'green']
+    return ({'Topic': f"{colours[i % 3]} shoes", 'Meta Keywords': f"running shoes, size {i % 5}",
+             'Meta Description': None if i % 4 else "shoes and boots"} for i in range(count))
+
+
+def test_single_words():
+    assert list(extract_keywords(TEXT)) == ['red', 'shoes', 'running', 'shoes', 'shoes']
+
+
+def test_phrases_stay_within_a_segment():
+    assert list(extract_keywords(TEXT, ngram_range=(2, 2))) == ['red shoes', 'running shoes']
+    assert list(extract_keywords("red shoes", ngram_range=(1, 2))) == ['red', 'shoes', 'red shoes']
+    # Stop words and words with special characters end a phrase
+    assert list(extract_keywords("shoes and boots | trail-running shoes", ngram_range=(2, 3))) == []
+    assert list(extract_keywords("fast trail running shoes", ngram_range=(3, 3))) == [
+        'fast trail running', 'trail running shoes']
+
+
+def test_fields_are_weighted():
+    row = {'Topic': 'Shoes', 'Meta Keywords': 'shoes, boots', 'Meta Description': 'boots', 'URL': 'x'}
+    counts = count_keywords([row, {'Topic': None}], FIELD_WEIGHTS, workers=1)
+    assert counts == {'shoes': 3.0, 'boots': 1.5}
+    assert top_keywords_from_rows([row], fields=FIELD_WEIGHTS, num_keywords=1) == 'shoes'
+    assert top_keywords_from_rows([row], column_name='Meta Description') == 'boots'
+
+
+def test_sharded_counts_match_in_process_counts():
+    in_process = count_keywords(_rows(100), FIELD_WEIGHTS, ngram_range=(1, 2), workers=1)
+    sharded = count_keywords(_rows(100), FIELD_WEIGHTS, ngram_range=(1, 2), workers=2, rows_per_shard=7)
+    assert sharded == in_process
+    assert in_process['shoes'] == 100 * 2.0 + 100 * 1.0 + 25 * 0.5
+
+
+def test_csv_files_and_streams(tmp_path):
+    path = tmp_path / 'pages.csv'
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['URL', 'Meta Keywords'])
+        writer.writeheader()
+        writer.writerows([{'URL': 'a', 'Meta Keywords': 'shoes, boots'}, {'URL': 'b', 'Meta Keywords': 'shoes'}])
+
+    assert top_keywords_from_csv(str(path), 'Meta Keywords') == 'shoes boots'
+    assert top_keywords_from_csv(io.StringIO(path.read_text(encoding='utf-8')), 'Meta Keywords',
+                                 num_keywords=1) == 'shoes'
+    assert top_keywords_from_csv(str(path), 'Topic') == ''
+    assert top_keywords_from_csv(str(tmp_path / 'missing.csv'), 'Meta Keywords') == ''
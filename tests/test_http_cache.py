@@ -0,0 +1,92 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.utils.http_cache import HttpCache
+
+BODIES = {'/small': b"x" * 100, '/large': b"y" * 1000}
+ETAG = '"v1"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        conditional = self.headers.get('If-None-Match') == ETAG
+        Handler.requests_seen.append((self.path, conditional))
+        if conditional:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = BODIES[self.path]
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', ETAG)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.requests_seen = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_fresh_entries_are_served_from_disk(tmp_path, server):
+    cache = HttpCache(str(tmp_path))
+    assert not cache.get(f"{server}/small").from_cache
+    response = cache.get(f"{server}/small")
+    assert response.from_cache and response.content == BODIES['/small']
+    assert Handler.requests_seen == [('/small', False)]
+
+
+def test_stale_entries_are_revalidated(tmp_path, server):
+    cache = HttpCache(str(tmp_path), fresh_seconds=0)
+    cache.get(f"{server}/small")
+    response = cache.get(f"{server}/small")
+    assert response.from_cache and response.content == BODIES['/small']
+    assert Handler.requests_seen == [('/small', False), ('/small', True)]
+
+
+def test_entry_larger_than_the_cache_is_still_returned(tmp_path, server):
+    cache = HttpCache(str(tmp_path), max_bytes=500)
+    cache.get(f"{server}/small")
+    response = cache.get(f"{server}/large")
+    assert response.content == BODIES['/large']
+    # The older entry made room; the one just stored was kept
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith('.body')) == \
+        [os.path.basename(response.path)]
+
+
+def test_body_evicted_after_the_response_is_made(tmp_path, server):
+    cache = HttpCache(str(tmp_path))
+    cache.get(f"{server}/small")
+    response = cache.get(f"{server}/small")
+    os.remove(response.path)
+    assert response.text == BODIES['/small'].decode()
+
+
+def test_body_evicted_during_revalidation_is_a_miss(tmp_path, server, monkeypatch):
+    cache = HttpCache(str(tmp_path), fresh_seconds=0)
+    first = cache.get(f"{server}/small")
+    read_meta = HttpCache._read_meta
+
+    def evicting_read_meta(meta_path):
+        os.remove(first.path)  # Another process evicts the entry right after it was found
+        return read_meta(meta_path)
+
+    monkeypatch.setattr(cache, '_read_meta', evicting_read_meta)
+    response = cache.get(f"{server}/small")
+    assert response.content == BODIES['/small']
+    assert not response.from_cache
+    assert Handler.requests_seen == [('/small', False), ('/small', True), ('/small', False)]
@@ -0,0 +1,42 @@
+import pytest
+
+from src.scraping.keyword_ranking import build_term_matrix, rank_terms
+
+PAGES = [
+    {'shoes': 10, 'running': 4, 'cookie': 1},
+    {'shoes': 3, 'running': 2, 'trail': 5},
+    {'shoes': 2, 'trail': 1, 'sale': 40},
+]
+
+
+def test_term_matrix():
+    matrix, terms = build_term_matrix(PAGES)
+    assert matrix.shape == (3, 5)
+    assert terms == ['shoes', 'running', 'cookie', 'trail', 'sale']
+    assert matrix[2, terms.index('sale')] == 40
+
+
+@pytest.mark.parametrize('method', ['bm25', 'tfidf'])
+def test_terms_on_many_pages_rank_first(method):
+    ranked = rank_terms(PAGES, num_keywords=10, method=method)
+    assert ranked[0] == 'shoes'
+    # Single-page terms fall outside the document frequency window, however often they appear
+    assert set(ranked) == {'shoes', 'running', 'trail'}
+
+
+def test_tiny_corpora_relax_the_window():
+    assert rank_terms([{'shoes': 2, 'laces': 1}], num_keywords=5) == ['shoes', 'laces']
+    assert rank_terms([{}, {}]) == []
+
+
+def test_max_document_ratio_drops_boilerplate():
+    pages = [{'menu': 1, f'topic{i}': 2} for i in range(6)]
+    for page in pages[:3]:
+        page['common'] = 1
+    ranked = rank_terms(pages, num_keywords=10, min_df=1, max_df_ratio=0.9)
+    assert 'menu' not in ranked and 'common' in ranked
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        rank_terms(PAGES, method='count')
@@ -0,0 +1,79 @@
+from src.utils.locale_index import LocaleIndex, locale_candidate, split_locale
+from src.utils.records import SitemapUrl
+
+SITEMAP = 'https://example.com/sitemap.xml'
+
+
+def _kept(urls, alternates=None):
+    index = LocaleIndex()
+    index.update(SitemapUrl(SITEMAP, url, alternates=(alternates or {}).get(url)) for url in urls)
+    return [record.url for record in index.records()], index
+
+
+def test_bare_codes_are_not_locales_on_their_own():
+    for url in ('https://example.com/it/services', 'https://example.com/my/account',
+                'https://example.com/no/limits', 'https://my.shop.com/cart'):
+        locale, page_key = split_locale(url)
+        assert locale is None, url
+        assert page_key == url.split('://', 1)[1]
+    assert locale_candidate('https://example.com/it/services') == ('it', 'example.com/services')
+    assert locale_candidate('https://my.shop.com/cart') == ('my', 'shop.com/cart')
+    assert locale_candidate('https://example.com/services') is None
+
+
+def test_unambiguous_markers_are_locales():
+    assert split_locale('https://example.com/fr-ca/page') == ('fr-ca', 'example.com/page')
+    assert split_locale('https://example.com/page?lang=de') == ('de', 'example.com/page')
+    assert split_locale('https://example.com/shoes-en-us.html') == ('en-us', 'example.com/shoes.html')
+    assert split_locale('https://en-us.example.com/page') == ('en-us', 'example.com/page')
+
+
+def test_section_named_like_a_language_is_kept():
+    kept, index = _kept(['https://example.com/services', 'https://example.com/it/services',
+                         'https://example.com/it/support'])
+    assert kept == ['https://example.com/services', 'https://example.com/it/services',
+                    'https://example.com/it/support']
+    assert len(index) == 3
+
+
+def test_one_shared_page_does_not_make_a_locale():
+    kept, _ = _kept(['https://example.com/account?lang=en', 'https://example.com/my/account'])
+    assert kept == ['https://example.com/account?lang=en', 'https://example.com/my/account']
+
+
+def test_bare_codes_used_as_locales_are_deduplicated():
+    kept, index = _kept(['https://example.com/en/a', 'https://example.com/fr/a', 'https://example.com/en/b',
+                         'https://example.com/fr/b', 'https://example.com/de/b', 'https://example.com/de/c'])
+    assert sorted(kept) == ['https://example.com/de/c', 'https://example.com/en/a', 'https://example.com/en/b']
+    assert len(index) == 3
+    assert index.summary() == '6 URLs, 3 distinct pages, 3 kept, 2 locales from 1 sitemaps'
+
+
+def test_language_subdomains_are_deduplicated():
+    kept, _ = _kept(['https://en.example.com/a', 'https://fr.example.com/a', 'https://en.example.com/b',
+                     'https://fr.example.com/b', 'https://fr.example.com/c'])
+    assert sorted(kept) == ['https://en.example.com/a', 'https://en.example.com/b', 'https://fr.example.com/c']
+
+
+def test_hreflang_confirms_bare_codes():
+    alternates = (('en', 'https://example.com/en/a'), ('it', 'https://example.com/it/a'))
+    urls = ['https://example.com/it/a', 'https://example.com/en/a', 'https://example.com/it/b']
+    kept, _ = _kept(urls, {url: alternates for url in urls[:2]})
+    assert kept == ['https://example.com/en/a', 'https://example.com/it/b']
+
+
+def test_regional_variants_fall_back_to_preferred_language():
+    kept, _ = _kept(['https://example.com/fr-fr/a', 'https://example.com/en-gb/a', 'https://example.com/en-us/a',
+                     'https://example.com/fr-fr/b'])
+    assert kept == ['https://example.com/en-gb/a', 'https://example.com/en-us/a', 'https://example.com/fr-fr/b']
+
+
+def test_earlier_evidence_counts_once_a_code_is_confirmed():
+    kept, _ = _kept(['https://example.com/en/a', 'https://example.com/fr/a', 'https://example.com/de/b',
+                     'https://example.com/fr/b', 'https://example.com/en/c'])
+    assert sorted(kept) == ['https://example.com/de/b', 'https://example.com/en/a', 'https://example.com/en/c',
+                            'https://example.com/fr/b']
+
+    kept, index = _kept(['https://example.com/fr/a', 'https://example.com/en/a', 'https://example.com/de/a'])
+    assert kept == ['https://example.com/en/a']
+    assert len(index) == 1
@@ -0,0 +1,101 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip('nltk')
+
+from src.similarity.measure_similarity import TfidfModel  # noqa: E402
+
+
+def _saved(path):
+    connection = sqlite3.connect(path)
+    try:
+        terms = dict(connection.execute("SELECT term, document_frequency FROM terms").fetchall())
+        documents = connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        num_documents = connection.execute("SELECT value FROM meta WHERE name = 'num_documents'").fetchone()[0]
+    finally:
+        connection.close()
+    return terms, documents, num_documents
+
+
+def test_documents_are_counted_once(tmp_path):
+    model = TfidfModel(str(tmp_path / 'corpus.sqlite'))
+    assert model.partial_fit(['running shoes', 'trail shoes', 'running shoes']) == 2
+    assert model.partial_fit(['trail shoes']) == 0
+    assert model.num_documents == 2
+    assert model.document_frequency[model.vocabulary['shoe']] == 2
+
+
+def test_saves_are_incremental_and_reload(tmp_path):
+    path = str(tmp_path / 'corpus.sqlite')
+    model = TfidfModel(path)
+    model.partial_fit(['running shoes', 'trail shoes'])
+    model.save()
+
+    # A second process adds to the stored model rather than overwriting it
+    other = TfidfModel(path)
+    model.partial_fit(['hiking boots'])
+    other.partial_fit(['running socks'])
+    model.save()
+    other.save()
+
+    terms, documents, num_documents = _saved(path)
+    assert (documents, num_documents) == (4, 4)
+    assert terms['shoe'] == 2 and terms['boot'] == 1 and terms['sock'] == 1
+
+    reloaded = TfidfModel(path)
+    assert reloaded.num_documents == 4
+    assert reloaded.partial_fit(['running shoes', 'hiking boots']) == 0
+
+
+def test_model_is_bounded(tmp_path):
+    path = str(tmp_path / 'corpus.sqlite')
+    model = TfidfModel(path, max_documents=10, max_terms=1000)
+    for i in range(100):
+        model.partial_fit([f"shoes term{i}"])
+        assert len(model._fingerprints) <= 10
+    model.save()
+
+    assert model.num_documents <= 10
+    assert len(model.terms) < 10
+    assert 'shoe' in model.vocabulary
+    terms, documents, num_documents = _saved(path)
+    assert documents == len(model._fingerprints)
+    assert num_documents == model.num_documents
+    assert set(terms) == set(model.terms)
+
+
+def test_vocabulary_is_bounded():
+    model = TfidfModel(None, max_documents=1000, max_terms=50)
+    for i in range(20):
+        model.partial_fit([" ".join(f"word{i}x{j}" for j in range(10)) + " common"])
+        assert len(model.terms) <= 50
+    assert 'common' in model.vocabulary
+
+
+def test_similarity_after_decay():
+    model = TfidfModel(None, max_documents=4)
+    documents = ['red running shoes', 'blue running shoes', 'green trail shoes', 'hiking boots', 'leather boots']
+    model.partial_fit(documents)
+    similarity = model.similarity_matrix(['running shoes'], ['running shoes', 'leather boots'])
+    assert similarity[0, 0] == pytest.approx(1.0)
+    assert similarity[0, 1] == 0
+
+
+def test_decay_keeps_the_documents_being_added():
+    model = TfidfModel(None, max_documents=4)
+    model.partial_fit(['red shoes', 'blue shoes', 'green shoes', 'white shoes'])
+    model.partial_fit(['leather boots'])
+    # The model decayed to make room, the new document is counted in full
+    assert model.document_frequency[model.vocabulary['leather']] == 1
+    assert model.document_frequency[model.vocabulary['boot']] == 1
+    assert 'red' not in model.vocabulary
+    assert model.num_documents == 3
+
+
+def test_decay_keeps_new_terms_when_the_vocabulary_is_full():
+    model = TfidfModel(None, max_documents=1000, max_terms=5)
+    model.partial_fit(['alpha beta gamma delta'])
+    model.partial_fit(['epsilon zeta'])
+    assert {'epsilon', 'zeta'} <= set(model.vocabulary)
+    assert len(model.terms) <= 5
@@ -0,0 +1,44 @@
+from src.spiders.meta_extractor import MetaExtractor
+
+HEAD = """<html><head>
+<!-- <meta name="description" content="commented out"> -->
+<title>Red &amp; Blue Shoes</title>
+<script>var html = '<meta name="keywords" content="from a script">';</script>
+<META NAME="Description" CONTENT='Running shoes for everyone'>
+<meta name="keywords" content="red shoes, running shoes">
+<meta name="keywords" content="second keywords tag">
+<meta property="og:title" content="Shoes | Example">
+<link rel="canonical" href="https://example.com/shoes">
+<link rel="alternate" hreflang="fr" href="https://example.com/fr/shoes">
+<link rel="alternate" hreflang="de" href="https://example.com/de/shoes">
+</head><body><meta name="author" content="in the body"></body></html>"""
+
+
+def test_default_fields():
+    values = MetaExtractor().extract(HEAD)
+    assert values == {
+        'Topic': 'Red & Blue Shoes',
+        'Meta Description': 'Running shoes for everyone',
+        'Meta Keywords': 'red shoes, running shoes',
+        'Meta Robots': None,
+        'Meta Author': None,
+    }
+
+
+def test_optional_fields_by_name():
+    values = MetaExtractor(['Topic', 'OG Title', 'Canonical', 'Hreflang']).extract(HEAD)
+    assert values == {
+        'Topic': 'Red & Blue Shoes',
+        'OG Title': 'Shoes | Example',
+        'Canonical': 'https://example.com/shoes',
+        'Hreflang': 'fr=https://example.com/fr/shoes de=https://example.com/de/shoes',
+    }
+
+
+def test_unknown_field_kind_is_rejected():
+    try:
+        MetaExtractor({'Custom': ('header', 'x-custom')})
+    except ValueError as e:
+        assert 'header' in str(e)
+    else:
+        raise AssertionError("ValueError not raised")
@@ -0,0 +1,75 @@
+import pytest
+from scrapy.http import HtmlResponse, Request
+from twisted.internet import defer
+
+from src.spiders import middlewares
+from src.spiders.middlewares import PolitenessMiddleware
+from src.utils.politeness import PolitenessScheduler
+
+URL = 'https://example.com/page'
+
+
+class RecordingScheduler:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.recorded = []
+
+    def reserve(self, url):
+        return self.delay
+
+    def record(self, url, **outcome):
+        self.recorded.append((url, outcome))
+
+
+def _run(coroutine):
+    """Runs a coroutine that must finish without waiting on the reactor."""
+    with pytest.raises(StopIteration) as finished:
+        coroutine.send(None)
+    return finished.value.value
+
+
+def test_due_requests_are_not_delayed(monkeypatch):
+    monkeypatch.setattr(middlewares, 'deferLater', lambda *args: pytest.fail("delayed a due request"))
+    request = Request(URL)
+    assert _run(PolitenessMiddleware(RecordingScheduler()).process_request(request, None)) is None
+    assert 'politeness_sent_at' in request.meta
+
+
+def test_requests_wait_for_their_slot(monkeypatch):
+    delays = []
+
+    def defer_later(clock, delay, function):
+        delays.append(delay)
+        return defer.succeed(function())
+
+    monkeypatch.setattr(middlewares, 'deferLater', defer_later)
+    _run(PolitenessMiddleware(RecordingScheduler(delay=1.5)).process_request(Request(URL), None))
+    assert delays == [1.5]
+
+
+def test_responses_and_errors_are_recorded():
+    scheduler = RecordingScheduler()
+    middleware = PolitenessMiddleware(scheduler)
+    request = Request(URL)
+    _run(middleware.process_request(request, None))
+
+    response = HtmlResponse(URL, status=429, headers={'Retry-After': '30'}, request=request)
+    assert middleware.process_response(request, response, None) is response
+    assert middleware.process_exception(request, TimeoutError(), None) is None
+
+    (_, throttled), (_, failed) = scheduler.recorded
+    assert throttled['status'] == 429 and throttled['retry_after'] == b'30'
+    assert throttled['latency'] >= 0
+    assert failed['error'] and failed['latency'] >= 0
+
+
+def test_throttled_responses_slow_the_host_down():
+    scheduler = PolitenessScheduler()
+    middleware = PolitenessMiddleware(scheduler)
+    request = Request(URL)
+    _run(middleware.process_request(request, None))
+    middleware.process_response(request, HtmlResponse(URL, status=503, headers={'Retry-After': '20'}), None)
+
+    stats = scheduler.stats()['example.com:443']
+    assert stats['rate'] == 2.0 and stats['throttled'] == 1
+    assert stats['blocked_for'] == pytest.approx(20, abs=1)
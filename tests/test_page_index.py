@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('sentence_transformers')
+
+from src.similarity.page_index import PageIndex, normalize_rows  # noqa: E402
+
+
+def _brute_force(index, queries, k):
+    similarities = normalize_rows(queries) @ index.vectors.T
+    rows = np.argsort(-similarities, axis=1, kind='stable')[:, :k]
+    return np.take_along_axis(similarities, rows, axis=1), rows
+
+
+@pytest.mark.parametrize('k', [1, 5, 10, 50, 100])
+def test_blocked_search_matches_brute_force(k):
+    rng = np.random.default_rng(0)
+    index = PageIndex(rng.normal(size=(50, 8)), ids=range(50))
+    queries = rng.normal(size=(13, 8))
+
+    # Blocks of 4 queries: several blocks, the last one partial, k may exceed the block size
+    scores, rows = index.search(queries, k=k, max_block_elements=4 * len(index))
+    expected_scores, expected_rows = _brute_force(index, queries, k)
+    assert rows.shape == (13, min(k, 50))
+    np.testing.assert_array_equal(rows, expected_rows)
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-6)
+
+
+def test_empty_index_and_zero_vectors():
+    index = PageIndex(np.zeros((3, 4)), ids=['a', 'b', 'c'])
+    scores, rows = index.search(np.ones((2, 4)), k=2)
+    assert scores.shape == rows.shape == (2, 2)
+    assert not scores.any()
+
+    scores, rows = PageIndex(np.zeros((0, 4)), ids=[]).search(np.ones((2, 4)))
+    assert scores.shape == (2, 0)
@@ -0,0 +1,48 @@
+from src.scraping.page_tokenizer import PageTokenizer, tokenize_stream
+
+PAGE = ("<html><head><meta name='keywords' content='red shoes'><style>.shoes{color:red}</style></head>"
+        "<body><nav>menu menu menu</nav><p>Running shoes, trail shoes and 2024shoes.</p>"
+        "<script>var shoes = 1;</script><p>Shoes for running</p></body></html>")
+
+
+def _chunks(text, size):
+    data = text.encode('utf-8')
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+def test_counts_visible_words():
+    tokenizer = tokenize_stream(_chunks(PAGE, 1000), stop_at_meta=False)
+    assert tokenizer.meta_keywords == 'red shoes'
+    assert tokenizer.counts == {'running': 2, 'shoes': 3, 'trail': 1}
+    assert tokenizer.top_keywords(2) == ['shoes', 'running']
+
+
+def test_words_split_across_chunks_are_joined():
+    whole = tokenize_stream(_chunks(PAGE, 1000), stop_at_meta=False).counts
+    for size in (1, 3, 7):
+        assert tokenize_stream(_chunks(PAGE, size), stop_at_meta=False).counts == whole
+
+
+def test_multibyte_characters_split_across_chunks():
+    tokenizer = tokenize_stream(_chunks("<p>chaussures légères légères</p>", 1))
+    assert tokenizer.counts == {'chaussures': 1, 'légères': 2}
+
+
+def test_stops_once_meta_keywords_and_body_are_seen():
+    chunks = _chunks(PAGE, 10)
+    consumed = []
+    tokenize_stream((consumed.append(chunk) or chunk for chunk in chunks))
+    assert len(consumed) < len(chunks)
+
+
+def test_max_bytes_truncates_input():
+    tokenizer = tokenize_stream(_chunks("<p>" + "shoes " * 100 + "laces</p>", 16), max_bytes=60)
+    assert 'laces' not in tokenizer.counts
+
+
+def test_bounded_term_counts():
+    tokenizer = PageTokenizer(max_terms=10)
+    tokenizer.feed(" ".join(["shoes"] * 5 + [f"word{chr(97 + i)}xyz" for i in range(20)]))
+    tokenizer.close()
+    assert len(tokenizer.counts) <= 10
+    assert tokenizer.counts['shoes'] == 5
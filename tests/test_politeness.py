@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from src.utils.politeness import (BURST, MAX_RATE, MAX_RETRY_AFTER_SECONDS, MIN_RATE, HostBucket,
+                                  PolitenessScheduler, host_key, parse_retry_after)
+
+
+def _bucket(rate=4.0):
+    bucket = HostBucket(rate)
+    bucket.updated = 0.0
+    return bucket
+
+
+def test_full_bucket_allows_a_burst_then_paces():
+    bucket = _bucket()
+    assert [bucket.reserve(0.0) for _ in range(BURST)] == [0.0] * BURST
+    assert bucket.reserve(0.0) == pytest.approx(0.25)
+    assert bucket.reserve(0.0) == pytest.approx(0.5)
+    # Tokens refill at the host's rate
+    assert bucket.reserve(2.0) == 0.0
+
+
+def test_successes_raise_the_rate_additively():
+    bucket = _bucket()
+    bucket.on_response(0.0, status=200)
+    assert bucket.rate == pytest.approx(4.25)
+    for _ in range(10000):
+        bucket.on_response(0.0, status=200)
+    assert bucket.rate == MAX_RATE
+
+
+def test_throttling_and_errors_halve_the_rate():
+    bucket = _bucket()
+    bucket.on_response(0.0, status=429)
+    assert bucket.rate == 2.0 and bucket.throttled == 1
+    assert bucket.tokens <= 0  # The next request waits
+    bucket.on_response(0.0, error=True)
+    assert bucket.rate == 1.0 and bucket.throttled == 1
+    bucket.on_response(0.0, status=200, latency=6.0)  # Slow, even though it succeeded
+    assert bucket.rate == pytest.approx(0.9)
+    for _ in range(20):
+        bucket.on_response(0.0, status=503)
+    assert bucket.rate == MIN_RATE
+
+
+def test_retry_after_blocks_the_host():
+    bucket = _bucket()
+    bucket.on_response(10.0, status=503, retry_after=30.0)
+    assert bucket.reserve(10.0) == pytest.approx(30.0)
+    assert bucket.reserve(41.0) == 0.0
+    bucket.on_response(50.0, status=429, retry_after=86400.0)
+    assert bucket.blocked_until == 50.0 + MAX_RETRY_AFTER_SECONDS
+
+
+def test_crawl_delay_caps_the_rate():
+    bucket = _bucket()
+    bucket.set_crawl_delay(2.0)
+    assert (bucket.rate, bucket.max_rate, bucket.burst) == (0.5, 0.5, 1)
+    assert bucket.reserve(0.0) == 0.0
+    assert bucket.reserve(0.0) == pytest.approx(2.0)
+    for _ in range(100):
+        bucket.on_response(0.0, status=200)
+    assert bucket.rate == 0.5
+
+    bucket.set_crawl_delay(None)
+    assert (bucket.max_rate, bucket.burst) == (MAX_RATE, BURST)
+
+
+def test_retry_after_seconds_and_dates():
+    assert parse_retry_after('120') == 120.0
+    assert parse_retry_after(b'5') == 5.0
+    assert parse_retry_after('-3') == 0.0
+    in_a_minute = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+    assert parse_retry_after(in_a_minute) == pytest.approx(60, abs=2)
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None and parse_retry_after('') is None
+
+
+def test_scheduler_keeps_one_bucket_per_host():
+    scheduler = PolitenessScheduler()
+    scheduler.set_crawl_delay('https://example.com/robots.txt', 10)
+    scheduler.record('https://Example.com:443/page', status=429, retry_after='60')
+    scheduler.record('http://example.com/page', status=200)
+
+    stats = scheduler.stats()
+    assert set(stats) == {'example.com:443', 'example.com:80'}
+    assert stats['example.com:443']['max_rate'] == 0.1
+    assert stats['example.com:443']['throttled'] == 1
+    assert stats['example.com:443']['blocked_for'] == pytest.approx(60, abs=1)
+    assert stats['example.com:80']['throttled'] == 0
+    assert scheduler.reserve('https://example.com/other') == pytest.approx(60, abs=1)
+
+
+def test_host_key():
+    assert host_key('https://Example.com/a') == 'example.com:443'
+    assert host_key('http://example.com:8080/a') == 'example.com:8080'
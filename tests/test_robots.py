@@ -0,0 +1,59 @@
+from src.utils.robots import RobotsRules
+
+BASE_URL = 'https://example.com'
+
+ROBOTS_TXT = """
+# Example rules
+User-agent: *
+Disallow: /private
+Allow: /private/public
+Disallow: /*.pdf$
+Crawl-delay: 2
+
+User-agent: Scrapy
+User-agent: other-bot
+Disallow: /
+Allow: /blog/
+Crawl-delay: 5
+
+Sitemap: /sitemap.xml
+Sitemap: https://cdn.example.com/sitemap-2.xml
+"""
+
+
+def test_longest_match_wins():
+    rules = RobotsRules(BASE_URL, ROBOTS_TXT)
+    assert not rules.can_fetch(f"{BASE_URL}/private/page")
+    assert rules.can_fetch(f"{BASE_URL}/private/public/page")
+    assert rules.can_fetch(f"{BASE_URL}/about")
+
+
+def test_wildcard_and_end_anchor():
+    rules = RobotsRules(BASE_URL, ROBOTS_TXT)
+    assert not rules.can_fetch(f"{BASE_URL}/files/report.pdf")
+    assert rules.can_fetch(f"{BASE_URL}/files/report.pdf?download=1")
+
+
+def test_most_specific_agent_group_applies():
+    rules = RobotsRules(BASE_URL, ROBOTS_TXT)
+    user_agent = "Scrapy/2.11 (+https://scrapy.org)"
+    assert not rules.can_fetch(f"{BASE_URL}/about", user_agent)
+    assert rules.can_fetch(f"{BASE_URL}/blog/post", user_agent)
+    assert rules.crawl_delay(user_agent) == 5
+    assert rules.crawl_delay("python-requests/2.32") == 2
+
+
+def test_sitemaps_are_absolute():
+    rules = RobotsRules(BASE_URL, ROBOTS_TXT)
+    assert rules.sitemaps == [f"{BASE_URL}/sitemap.xml", "https://cdn.example.com/sitemap-2.xml"]
+
+
+def test_missing_robots_allows_everything():
+    rules = RobotsRules(BASE_URL)
+    assert rules.can_fetch(f"{BASE_URL}/anything")
+    assert rules.crawl_delay() is None
+
+
+def test_empty_disallow_allows_everything():
+    rules = RobotsRules(BASE_URL, "User-agent: *\nDisallow:\n")
+    assert rules.can_fetch(f"{BASE_URL}/private")
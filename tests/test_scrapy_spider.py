@@ -0,0 +1,36 @@
+from src.spiders import scrapy_spider
+from src.spiders.scrapy_spider import TopicSpider, check_robots
+from src.utils.records import SitemapUrl
+from src.utils.robots import RobotsRules
+
+ROBOTS = {
+    'https://example.com': RobotsRules('https://example.com', "User-agent: *\nDisallow: /private\nCrawl-delay: 3\n"),
+    'https://other.example': RobotsRules('https://other.example'),
+}
+
+
+def _fake_get_robots(url):
+    return ROBOTS['/'.join(url.split('/')[:3])]
+
+
+def test_check_robots_drops_disallowed_urls(monkeypatch):
+    monkeypatch.setattr(scrapy_spider, 'get_robots', _fake_get_robots)
+    records = [
+        SitemapUrl('s', 'https://example.com/page'),
+        SitemapUrl('s', 'https://example.com/private/page'),
+        SitemapUrl('s', 'https://other.example/page'),
+    ]
+    allowed, crawl_delays = check_robots(records)
+    assert [record.url for record in allowed] == ['https://example.com/page', 'https://other.example/page']
+    assert crawl_delays == {'https://example.com': 3.0, 'https://other.example': None}
+
+
+def test_pool_jobs_do_not_read_robots(monkeypatch):
+    def fail(url):
+        raise AssertionError("robots.txt read inside the crawl")
+
+    monkeypatch.setattr(scrapy_spider, 'get_robots', fail)
+    spider = TopicSpider(records=[SitemapUrl('s', 'https://example.com/page')],
+                         crawl_delays={'https://example.com': None})
+    requests = list(spider.start_requests())
+    assert [request.url for request in requests] == ['https://example.com/page']
@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+
+import pytest
+
+from src.scraping.search_backend import (CachedSearch, DEFAULT_FIXTURE_KEY, FixtureBackend, SEARCH_FIXTURES,
+                                         SearchBackend, SearchCache)
+
+RESULTS = [{'title': 'Shoes', 'href': 'https://shop.example/shoes', 'body': 'Red shoes'}]
+
+
+class SlowBackend(SearchBackend):
+    name = "slow"
+
+    def __init__(self, results=RESULTS, error=None):
+        self.results = results
+        self.error = error
+        self.calls = 0
+
+    def search(self, query, max_results=10):
+        self.calls += 1
+        time.sleep(0.2)
+        if self.error:
+            raise self.error
+        return self.results
+
+
+def _search_concurrently(search, queries):
+    results = [None] * len(queries)
+    errors = [None] * len(queries)
+
+    def run(position, query):
+        try:
+            results[position] = search.search(query, max_results=50)
+        except Exception as e:
+            errors[position] = e
+
+    threads = [threading.Thread(target=run, args=(position, query)) for position, query in enumerate(queries)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_misses_share_one_backend_search(tmp_path):
+    backend = SlowBackend()
+    search = CachedSearch(backend, SearchCache(str(tmp_path / "results.sqlite")))
+    results, errors = _search_concurrently(search, ["red shoes", "Red  Shoes", "red shoes"])
+    assert backend.calls == 1
+    assert results == [RESULTS] * 3
+    assert errors == [None] * 3
+
+    # The result is cached for later callers too
+    assert search.search("red shoes", max_results=50) == RESULTS
+    assert backend.calls == 1
+
+
+def test_concurrent_misses_share_the_failure(tmp_path):
+    backend = SlowBackend(error=RuntimeError("rate limited"))
+    search = CachedSearch(backend, SearchCache(str(tmp_path / "results.sqlite")))
+    results, errors = _search_concurrently(search, ["red shoes", "red shoes"])
+    assert backend.calls == 1
+    assert all(isinstance(error, RuntimeError) for error in errors)
+
+    # A failed search is not remembered: the next call searches again
+    with pytest.raises(RuntimeError):
+        search.search("red shoes", max_results=50)
+    assert backend.calls == 2
+
+
+def test_different_queries_search_separately():
+    backend = SlowBackend()
+    search = CachedSearch(backend, None)
+    _search_concurrently(search, ["red shoes", "blue shoes"])
+    assert backend.calls == 2
+
+
+def test_shipped_fixtures_load():
+    backend = FixtureBackend(SEARCH_FIXTURES)
+    results = backend.search("Running  SHOES", max_results=2)
+    assert len(results) == 2
+    assert all(result['href'] and result['title'] for result in results)
+
+
+def test_fixture_default_answers_other_queries(tmp_path):
+    path = tmp_path / "fixtures.json"
+    path.write_text(json.dumps({"red shoes": RESULTS, DEFAULT_FIXTURE_KEY: [{'title': 'Default', 'href': 'x', 'body': ''}]}))
+    backend = FixtureBackend(str(path))
+    assert backend.search("Red Shoes") == RESULTS
+    assert backend.search("blue shoes")[0]['title'] == 'Default'
+
+
+def test_missing_fixture_file_is_a_configuration_error(tmp_path):
+    with pytest.raises(ValueError, match="SEARCH_FIXTURES"):
+        FixtureBackend(str(tmp_path / "missing.json"))
+
+
+def test_exported_fixtures_replay_cached_searches(tmp_path):
+    cache = SearchCache(str(tmp_path / "results.sqlite"))
+    CachedSearch(SlowBackend(), cache).search("red shoes", max_results=50)
+    path = tmp_path / "fixtures.json"
+    cache.export_fixtures(str(path), backend=SlowBackend.name)
+    assert FixtureBackend(str(path)).search("red shoes") == RESULTS
+
+
+def test_backends_must_implement_search():
+    class Incomplete(SearchBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
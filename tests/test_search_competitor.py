@@ -0,0 +1,96 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.scraping import search_competitor
+from src.scraping.search_competitor import scrape_keywords_concurrently
+from src.utils.robots import RobotsRules
+
+PAGE = b"<html><head><meta name='keywords' content='red shoes, running shoes'></head><body>"
+CONTENT_PAGE = b"<html><head><title>Shoes</title></head><body>"  # No meta keywords, the whole body is read
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests_seen = []
+    disconnected = []
+
+    def do_GET(self):
+        Handler.requests_seen.append((self.path, time.monotonic()))
+        if self.path.startswith('/stall'):
+            time.sleep(3)  # Longer than the stage deadline, before any byte is sent
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.end_headers()
+        try:
+            self.wfile.write(CONTENT_PAGE if self.path.startswith('/trickle') else PAGE)
+            if self.path.startswith('/trickle'):
+                for _ in range(100):
+                    time.sleep(0.05)
+                    self.wfile.write(b"<p>filler words</p>")
+                    self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            Handler.disconnected.append((self.path, time.monotonic()))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(search_competitor, 'get_robots', lambda url, timeout: RobotsRules(url))
+    Handler.requests_seen = []
+    Handler.disconnected = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_fast_pages_return_keywords(server):
+    results = dict(scrape_keywords_concurrently([f"{server}/page"], deadline=5))
+    assert results[f"{server}/page"] == ['red shoes', 'running shoes']
+
+
+def test_stalled_pages_are_not_retried_after_the_deadline(server):
+    started = time.monotonic()
+    results = list(scrape_keywords_concurrently([f"{server}/stall-{i}" for i in range(3)], deadline=1))
+    assert time.monotonic() - started < 2
+    assert results == []
+
+    time.sleep(4)  # Long enough for retried requests to show up
+    paths = [path for path, _ in Handler.requests_seen]
+    assert paths
+    assert len(paths) == len(set(paths))  # No page requested twice
+    # Pages still queued behind the per-host limit at the deadline are never requested
+    assert all(seen_at - started < 1.5 for _, seen_at in Handler.requests_seen)
+
+
+def test_abandoned_downloads_stop_reading(server):
+    started = time.monotonic()
+    list(scrape_keywords_concurrently([f"{server}/trickle"], deadline=1,
+                                      scraper=search_competitor.scrape_term_counts))
+    time.sleep(2)
+    # The client closed the connection around the deadline, long before the 5s body ended
+    assert Handler.disconnected
+    assert Handler.disconnected[0][1] - started < 2.5
+
+
+def test_slow_robots_txt_counts_against_the_page_timeout(server, monkeypatch):
+    timeouts = []
+
+    def slow_robots(url, timeout):
+        timeouts.append(timeout)
+        time.sleep(timeout)  # The download gives up at the caller's timeout
+        return RobotsRules(url)
+
+    monkeypatch.setattr(search_competitor, 'get_robots', slow_robots)
+    started = time.monotonic()
+    assert list(scrape_keywords_concurrently([f"{server}/page"], deadline=1)) in ([], [(f"{server}/page", None)])
+    assert time.monotonic() - started < 1.5
+    assert timeouts and timeouts[0] <= 1
+    time.sleep(0.5)
+    assert Handler.requests_seen == []  # No time was left for the page itself
@@ -0,0 +1,94 @@
+import gzip
+
+from src.utils.sitemap_extractor import iter_sitemap_entries, iter_sitemap_urls
+from src.utils.url_filter import UrlFilter
+
+SITEMAP = 'https://example.com/sitemap.xml'
+
+URLSET = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" xmlns:xhtml="http://www.w3.org/1999/xhtml">
+  <url>
+    <loc> https://example.com/en/shoes </loc>
+    <lastmod>2024-01-31</lastmod>
+    <changefreq>weekly</changefreq>
+    <priority>0.8</priority>
+    <xhtml:link rel="alternate" hreflang="en" href="https://example.com/en/shoes"/>
+    <xhtml:link rel="alternate" hreflang="fr" href="https://example.com/fr/shoes"/>
+  </url>
+  <url><loc>https://example.com/fr/shoes</loc></url>
+  <url><loc>https://example.com/en/photo.jpg</loc></url>
+  <url><loc></loc></url>
+</urlset>
+"""
+
+INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://example.com/sitemap-1.xml</loc><lastmod>2024-02-01</lastmod></sitemap>
+  <sitemap><loc>https://example.com/sitemap-2.xml</loc></sitemap>
+</sitemapindex>
+"""
+
+
+def test_entries_carry_metadata_and_alternates():
+    entries = list(iter_sitemap_entries(URLSET))
+    assert [entry.loc for entry in entries] == ['https://example.com/en/shoes', 'https://example.com/fr/shoes',
+                                                'https://example.com/en/photo.jpg']
+    first = entries[0]
+    assert (first.kind, first.lastmod, first.changefreq, first.priority) == ('url', '2024-01-31', 'weekly', '0.8')
+    assert first.alternates == (('en', 'https://example.com/en/shoes'), ('fr', 'https://example.com/fr/shoes'))
+    assert entries[1].alternates is None and entries[1].lastmod is None
+
+
+def test_image_locations_are_not_page_urls():
+    image_sitemap = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
+        xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">
+  <url>
+    <loc>https://example.com/en/product-1</loc>
+    <image:image><image:loc>https://cdn.example.com/p1.png?w=200</image:loc></image:image>
+    <image:image><image:loc>https://cdn.example.com/p1-back.jpg</image:loc></image:image>
+  </url>
+  <url>
+    <image:image><image:loc>https://cdn.example.com/p2.jpg</image:loc></image:image>
+    <loc>https://example.com/en/product-2</loc>
+    <loc>https://example.com/en/product-2-duplicate</loc>
+  </url>
+</urlset>
+"""
+    assert [entry.loc for entry in iter_sitemap_entries(image_sitemap)] == [
+        'https://example.com/en/product-1', 'https://example.com/en/product-2']
+
+
+def test_sitemaps_without_namespace():
+    plain = b"<urlset><url><loc>https://example.com/a</loc><lastmod>2024-01-01</lastmod></url></urlset>"
+    assert [(entry.loc, entry.lastmod) for entry in iter_sitemap_entries(plain)] == [
+        ('https://example.com/a', '2024-01-01')]
+
+
+def test_gzipped_sitemaps_are_decompressed():
+    assert list(iter_sitemap_entries(gzip.compress(URLSET))) == list(iter_sitemap_entries(URLSET))
+
+
+def test_index_entries_are_sub_sitemaps():
+    sub_sitemaps = []
+    assert list(iter_sitemap_urls(INDEX, SITEMAP, sub_sitemaps=sub_sitemaps)) == []
+    assert sub_sitemaps == ['https://example.com/sitemap-1.xml', 'https://example.com/sitemap-2.xml']
+
+
+def test_preferred_locale_and_filter_rules():
+    rows = list(iter_sitemap_urls(URLSET, SITEMAP, url_filter=UrlFilter()))
+    assert rows == [(SITEMAP, 'https://example.com/en/shoes')]
+
+
+def test_falls_back_to_every_url_without_preferred_locale():
+    url_filter = UrlFilter(preferred_locale='de')
+    rows = list(iter_sitemap_urls(URLSET, SITEMAP, url_filter=url_filter, with_metadata=True))
+    assert [row.url for row in rows] == ['https://example.com/en/shoes', 'https://example.com/fr/shoes']
+    assert rows[0].lastmod == '2024-01-31' and rows[0].parent_sitemap == SITEMAP
+    assert url_filter.stats.hits['extension'] == 1
+
+
+def test_malformed_xml_keeps_what_was_read():
+    truncated = URLSET[:URLSET.index(b'<url><loc>https://example.com/fr')] + b'<url><loc>'
+    rows = list(iter_sitemap_urls(truncated, SITEMAP, url_filter=UrlFilter()))
+    assert rows == [(SITEMAP, 'https://example.com/en/shoes')]
@@ -0,0 +1,104 @@
+import collections
+import io
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from src.utils import sitemap_extractor
+from src.utils.sitemap_extractor import parse_sitemap_xml, parse_sitemap_xml_concurrent
+
+
+def _index(*sitemaps):
+    entries = "".join(f"<sitemap><loc>{sitemap}</loc></sitemap>" for sitemap in sitemaps)
+    return f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>'.encode()
+
+
+def _urlset(*urls):
+    entries = "".join(f"<url><loc>{url}</loc></url>" for url in urls)
+    return f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</urlset>'.encode()
+
+
+ROOT = 'https://example.com/sitemap.xml'
+A, A1, B, FR = ('https://example.com/en-a.xml', 'https://example.com/en-a1.xml', 'https://example.com/en-b.xml',
+                'https://example.com/fr.xml')
+TREE = {
+    ROOT: _index(A, B, FR),
+    A: _index(A1, B, A),  # Lists a sibling and itself again
+    A1: _urlset('https://example.com/en/a1'),
+    B: _urlset('https://example.com/en/b1', 'https://example.com/en/b2'),
+    FR: _urlset('https://example.com/fr/1'),
+}
+
+
+class FakeSitemaps:
+    """Serves sitemap documents in place of the HTTP cache, counting fetches and overlapping fetches per host."""
+
+    def __init__(self, documents, delay=0.0):
+        self.documents = documents
+        self.delay = delay
+        self.fetches = collections.Counter()
+        self.in_flight = collections.Counter()
+        self.max_in_flight = collections.Counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def open(self, sitemap_url):
+        host = sitemap_url.split('/')[2]
+        with self._lock:
+            self.fetches[sitemap_url] += 1
+            self.in_flight[host] += 1
+            self.max_in_flight[host] = max(self.max_in_flight[host], self.in_flight[host])
+        try:
+            time.sleep(self.delay)
+            yield io.BytesIO(self.documents[sitemap_url])
+        finally:
+            with self._lock:
+                self.in_flight[host] -= 1
+
+
+@pytest.fixture
+def sitemaps(monkeypatch):
+    fake = FakeSitemaps(TREE)
+    monkeypatch.setattr(sitemap_extractor, '_open_sitemap', fake.open)
+    return fake
+
+
+@pytest.mark.parametrize('max_depth', [1, 5])
+@pytest.mark.parametrize('with_metadata', [False, True])
+def test_concurrent_traversal_matches_sequential(sitemaps, max_depth, with_metadata):
+    sequential = parse_sitemap_xml(TREE[ROOT], max_depth=max_depth, parent_sitemap=ROOT,
+                                   with_metadata=with_metadata)
+    concurrent = parse_sitemap_xml_concurrent(TREE[ROOT], max_depth=max_depth, parent_sitemap=ROOT,
+                                              with_metadata=with_metadata)
+    assert concurrent == sequential
+    expected = [(A1, 'https://example.com/en/a1'), (B, 'https://example.com/en/b1'), (B, 'https://example.com/en/b2')]
+    if max_depth == 1:
+        expected = expected[1:]  # en-a1.xml is two levels below the root
+    assert [tuple(row[:2]) for row in concurrent] == expected
+
+
+def test_every_sitemap_is_fetched_once(sitemaps):
+    visited = set()
+    parse_sitemap_xml_concurrent(TREE[ROOT], parent_sitemap=ROOT, visited_sitemaps=visited)
+    assert sitemaps.fetches == {A: 1, A1: 1, B: 1}
+    assert visited == {A, A1, B}
+
+    # Sitemaps visited earlier are not fetched again
+    sitemaps.fetches.clear()
+    assert parse_sitemap_xml_concurrent(TREE[ROOT], parent_sitemap=ROOT, visited_sitemaps={B}) == [
+        (A1, 'https://example.com/en/a1')]
+    assert sitemaps.fetches == {A: 1, A1: 1}
+
+
+def test_fetches_are_limited_per_host(monkeypatch):
+    hosts = ['https://one.example', 'https://two.example']
+    children = [f"{host}/en-{i}.xml" for host in hosts for i in range(8)]
+    documents = {child: _urlset(child.replace('.xml', '/page')) for child in children}
+    fake = FakeSitemaps(documents, delay=0.05)
+    monkeypatch.setattr(sitemap_extractor, '_open_sitemap', fake.open)
+
+    rows = parse_sitemap_xml_concurrent(_index(*children), parent_sitemap=ROOT, max_workers=8, per_host_limit=2)
+    assert [url for _, url in rows] == [child.replace('.xml', '/page') for child in children]
+    assert fake.max_in_flight == {'one.example': 2, 'two.example': 2}
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from src.utils.task_graph import TaskGraph
+
+
+def _sleep_then(value, seconds=0.2):
+    def task(*arguments):
+        time.sleep(seconds)
+        return value
+    return task
+
+
+def test_results_flow_along_dependencies():
+    graph = TaskGraph(inputs=('keywords',))
+    graph.add('query', lambda keywords: f"query for {keywords}", ['keywords'])
+    graph.add('intent', lambda keywords: f"intent of {keywords}", ['keywords'])
+    graph.add('report', lambda query, intent: (query, intent), ['query', 'intent'])
+    results = graph.run({'keywords': 'shoes'})
+    assert results['report'] == ("query for shoes", "intent of shoes")
+
+
+def test_independent_tasks_overlap():
+    graph = TaskGraph(inputs=('keywords',))
+    for name in ('a', 'b', 'c', 'd'):
+        graph.add(name, _sleep_then(name), ['keywords'])
+    graph.add('e', _sleep_then('e'), ['a', 'b', 'c', 'd'])
+    start = time.perf_counter()
+    graph.run({'keywords': 'shoes'})
+    # Critical path is two tasks, the sum of all five is 1s
+    assert time.perf_counter() - start < 0.7
+
+
+def test_unknown_dependency_is_rejected_when_added():
+    graph = TaskGraph(inputs=('keywords',))
+    with pytest.raises(ValueError):
+        graph.add('query', lambda intent: intent, ['intent'])
+
+
+def test_cycles_cannot_be_built():
+    graph = TaskGraph()
+    with pytest.raises(ValueError):
+        graph.add('a', lambda b: b, ['b'])
+    with pytest.raises(ValueError):
+        graph.add('a', lambda a: a, ['a'])
+
+
+def test_duplicate_names_are_rejected():
+    graph = TaskGraph(inputs=('keywords',))
+    graph.add('query', lambda keywords: keywords, ['keywords'])
+    with pytest.raises(ValueError):
+        graph.add('query', lambda keywords: keywords, ['keywords'])
+    with pytest.raises(ValueError):
+        graph.add('keywords', lambda: None)
+
+
+def test_missing_input_is_rejected():
+    graph = TaskGraph(inputs=('keywords', 'rows'))
+    graph.add('query', lambda keywords: keywords, ['keywords'])
+    with pytest.raises(ValueError):
+        graph.run({'keywords': 'shoes'})
+
+
+def test_failure_stops_dependants_and_is_raised():
+    ran = []
+    graph = TaskGraph(inputs=('keywords',))
+    graph.add('query', lambda keywords: 1 / 0, ['keywords'])
+    graph.add('search', lambda query: ran.append(query), ['query'])
+    with pytest.raises(ZeroDivisionError):
+        graph.run({'keywords': 'shoes'})
+    assert ran == []
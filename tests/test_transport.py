@@ -0,0 +1,55 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.utils.transport import ResponseTooLarge, Transport
+
+BODY = b"<html>" + b"x" * 100000 + b"</html>"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.mark.parametrize('incremental', [False, True])
+def test_streamed_body_is_complete(server, incremental):
+    transport = Transport(scheduler=None, dns_cache=False)
+    with transport.get(f"{server}/page", stream=True) as response:
+        assert b''.join(transport.iter_content(response, incremental=incremental)) == BODY
+
+
+def test_incremental_reads_keep_the_connection_alive(server):
+    transport = Transport(scheduler=None, dns_cache=False)
+    for _ in range(3):
+        with transport.get(f"{server}/page", stream=True) as response:
+            b''.join(transport.iter_content(response, incremental=True))
+    stats = transport.host_stats()[server.split('//')[1]]
+    assert stats['requests'] == 3
+    assert stats['connections'] == 1
+
+
+def test_size_cap(server):
+    transport = Transport(scheduler=None, dns_cache=False)
+    with pytest.raises(ResponseTooLarge):
+        transport.get(f"{server}/page", max_bytes=1000)
@@ -0,0 +1,41 @@
+from src.utils.url_filter import FilterStats, UrlFilter, extract_country_code
+
+
+def test_rules_name_the_reason_a_url_is_dropped():
+    url_filter = UrlFilter(max_slashes=5, exclude_patterns=[r"/tag/"], allowed_countries={"US"})
+    assert url_filter.classify('https://example.com/en/page') is None
+    assert url_filter.classify('https://example.com/img/photo.JPG') == 'extension'
+    assert url_filter.classify('https://example.com/a/b/c/d/e') == 'slashes'
+    assert url_filter.classify('https://example.com/tag/shoes') == 'exclude_0'
+    assert url_filter.classify('https://example.com/shoes-en-gb') == 'country'
+    assert url_filter.classify('https://example.com/shoes-en-us') is None
+
+
+def test_include_patterns():
+    url_filter = UrlFilter(include_patterns=[r"/blog/", r"/docs/"])
+    assert url_filter.classify('https://example.com/blog/post') is None
+    assert url_filter.classify('https://example.com/shop/item') == 'include'
+
+
+def test_stats_count_hits_per_rule():
+    url_filter = UrlFilter.from_rules({"exclude_patterns": [r"\?"]})
+    urls = ['https://example.com/a', 'https://example.com/b.png', 'https://example.com/c?x=1']
+    assert list(url_filter.filter(urls)) == ['https://example.com/a']
+    assert (url_filter.stats.seen, url_filter.stats.kept, url_filter.stats.dropped) == (3, 1, 2)
+    assert url_filter.stats.hits == {'extension': 1, 'exclude_0': 1}
+
+    total = FilterStats()
+    total.merge(url_filter.stats)
+    total.merge(url_filter.stats)
+    assert total.seen == 6 and total.hits['extension'] == 2
+
+
+def test_preferred_locale():
+    assert UrlFilter().is_preferred('https://example.com/en/page')
+    assert not UrlFilter().is_preferred('https://example.com/fr/page')
+    assert UrlFilter(preferred_locale=None).is_preferred('https://example.com/fr/page')
+
+
+def test_extract_country_code():
+    assert extract_country_code('https://example.com/shoes-en-us') == 'US'
+    assert extract_country_code('https://example.com/shoes') is None
@@ -0,0 +1,74 @@
+from src.utils.records import SitemapUrl
+from src.utils.url_sampler import sample_urls, stratum_key
+
+SITEMAP = 'https://example.com/sitemap.xml'
+
+
+def _records(paths):
+    return [SitemapUrl(SITEMAP, f"https://example.com{path}") for path in paths]
+
+
+def test_stratum_key_uses_section_after_locale():
+    assert stratum_key(SITEMAP, 'https://example.com/blog/post-1') == (SITEMAP, 'blog')
+    assert stratum_key(SITEMAP, 'https://example.com/en/blog/post-1') == (SITEMAP, 'blog')
+    assert stratum_key(SITEMAP, 'https://example.com/en-us/blog/post-1/') == (SITEMAP, 'blog')
+
+
+def test_stratum_key_groups_root_pages():
+    assert stratum_key(SITEMAP, 'https://example.com/about') == (SITEMAP, '')
+    assert stratum_key(SITEMAP, 'https://example.com/contact/') == (SITEMAP, '')
+    assert stratum_key(SITEMAP, 'https://example.com/') == (SITEMAP, '')
+    assert stratum_key(SITEMAP, 'https://example.com/en/about') == (SITEMAP, '')
+
+
+def test_sample_within_one_section_is_random():
+    records = _records(f"/blog/post-{i}" for i in range(1000))
+    first_pages = records[:20]
+    samples = []
+    for seed in range(5):
+        sample, report = sample_urls(records, 20, seed=seed)
+        assert len(sample) == 20
+        assert sample != first_pages
+        samples.append(sample)
+    assert len({tuple(sample) for sample in samples}) > 1
+
+
+def test_sample_is_reproducible_with_seed():
+    records = _records(f"/blog/post-{i}" for i in range(1000))
+    assert sample_urls(records, 20, seed='example.com')[0] == sample_urls(records, 20, seed='example.com')[0]
+
+
+def test_strata_outnumbering_budget_are_drawn_at_random():
+    records = _records(f"/section-{i}/page" for i in range(200))
+    first_pages = records[:20]
+    samples = set()
+    for seed in range(5):
+        sample, report = sample_urls(records, 20, seed=seed)
+        assert len(sample) == 20
+        assert sample != first_pages
+        samples.add(tuple(sample))
+    assert len(samples) > 1
+
+
+def test_every_stratum_sampled_when_budget_allows():
+    records = _records([f"/docs/page-{i}" for i in range(90)] + [f"/news/item-{i}" for i in range(10)])
+    sample, report = sample_urls(records, 20, seed=1)
+    assert len(sample) == 20
+    assert report.strata[(SITEMAP, 'docs')] == (90, 17)
+    assert report.strata[(SITEMAP, 'news')] == (10, 3)
+
+
+def test_priority_weights_the_stratum_draw():
+    records = _records(f"/section-{i}/page" for i in range(100))
+    metadata = {record.url: record._replace(priority='0.01') for record in records}
+    favoured = records[0]
+    metadata[favoured.url] = favoured._replace(priority='1.0')
+    hits = sum(favoured in sample_urls(records, 5, metadata, seed=seed)[0] for seed in range(50))
+    assert hits > 40
+
+
+def test_budget_above_total_keeps_everything():
+    records = _records(f"/blog/post-{i}" for i in range(10))
+    sample, report = sample_urls(records, 50, seed=0)
+    assert sample == records
+    assert report.coverage == 1.0